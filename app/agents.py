@@ -10,18 +10,213 @@ simple heuristic parser from `utils.py`.
 The AI is instructed to output JSON mapping habit names to minutes
 practised. This JSON is then correlated back to habit IDs based on
 the list of known habits.
+
+Requests go through one long-lived `httpx.AsyncClient`, opened by
+`open_llm_client` in the application's startup hook and closed by
+`close_llm_client` on shutdown, so TCP/TLS connections are reused across
+requests (over HTTP/2 when the `h2` package is installed). A semaphore
+caps the number of in-flight upstream calls. The pool is configured
+through environment variables:
+
+    OPENAI_BASE_URL          API root (default https://api.openai.com/v1)
+    OPENAI_TIMEOUT           per-request timeout in seconds (default 15)
+    OPENAI_MAX_CONNECTIONS   connection pool size (default 20)
+    OPENAI_MAX_CONCURRENCY   concurrent upstream calls (default 10)
+
+Successful model answers are kept in a `ParseCache` (see `app.cache`),
+configured with `LLM_CACHE_SIZE`, `LLM_CACHE_TTL` and `LLM_CACHE_PATH`.
+
+Parsing is tiered. Transcripts the local parser can read unambiguously
+(every habit named exactly with explicit minutes, see
+`utils.score_speech_text`) never reach the model; the rest go through
+the cache and then the model. `tier_counts` records which tier answered
+each request. Set `LLM_LOCAL_FIRST=0` to send everything to the model.
+
+Upstream outages are absorbed by a `CircuitBreaker` (see `app.circuit`):
+while it is open, parsing goes straight to the heuristic parser instead
+of waiting out the timeout on every request. `LLM_HEDGE_SECONDS`, if
+set, is a latency budget after which a single-summary parse returns the
+heuristic answer rather than keep waiting for the model.
+
+`parse_habits_batch_with_ai` packs several summaries into one request,
+so the system prompt and habit list are sent once rather than per note.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from typing import Dict, List
+import time
+from typing import Any, Dict, List, Optional, Set
 
 import httpx
 
+try:
+    # HTTP/2 support is optional; without `h2` the client speaks HTTP/1.1.
+    import h2  # type: ignore  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ModuleNotFoundError:
+    HTTP2_AVAILABLE = False
+
+from .cache import ParseCache
+from .circuit import CircuitBreaker
+from .metrics import LLM_LATENCY, LLM_TOKENS
 from .schemas import HabitRead
-from .utils import parse_speech_text
+from .utils import parse_speech_text, score_speech_text
+
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# Model answers for repeated transcripts.
+parse_cache = ParseCache.from_env()
+
+# Number of transcripts answered by each parsing tier.
+tier_counts: Dict[str, int] = {"local": 0, "cache": 0, "llm": 0, "fallback": 0, "breaker": 0, "hedged": 0}
+
+# Stops calling the model while it is failing or slow.
+breaker = CircuitBreaker.from_env()
+
+# Shared client and concurrency limit, set up by `open_llm_client`.
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+# Model calls abandoned by hedging that are still running.
+_abandoned: Set["asyncio.Future[Any]"] = set()
+
+
+def _timeout() -> float:
+    return float(os.getenv("OPENAI_TIMEOUT", "15"))
+
+
+async def open_llm_client() -> None:
+    """Create the shared upstream client. Safe to call more than once."""
+    global _client, _semaphore
+    if _client is not None:
+        return
+    max_connections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+    _client = httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(_timeout()),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0,
+        ),
+    )
+    _semaphore = asyncio.Semaphore(int(os.getenv("OPENAI_MAX_CONCURRENCY", "10")))
+
+
+async def close_llm_client() -> None:
+    """Close the shared upstream client and its pooled connections."""
+    global _client, _semaphore
+    for call in list(_abandoned):
+        call.cancel()
+    await asyncio.gather(*_abandoned, return_exceptions=True)
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _semaphore = None
+
+
+async def _chat_completion(api_key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a chat completion request and return the decoded response.
+
+    Uses the shared client when it is open. Outside the application (in
+    scripts or tests that never ran the startup hook) a one-off client is
+    used instead. Waiting for a concurrency slot counts against the same
+    timeout as the request itself.
+    """
+    url = os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL).rstrip("/") + "/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    if _client is None or _semaphore is None:
+        async with httpx.AsyncClient(timeout=_timeout()) as client:
+            response = await client.post(url, headers=headers, json=payload)
+            response.raise_for_status()
+            return response.json()
+    client, semaphore = _client, _semaphore
+    await asyncio.wait_for(semaphore.acquire(), timeout=_timeout())
+    try:
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        return response.json()
+    finally:
+        semaphore.release()
+
+
+SYSTEM_PROMPT = (
+    "You are an intelligent habit tracking assistant. I will give you:\n"
+    "1. A list of habits with their target minutes\n"
+    "2. Any existing progress for today (minutes already logged)\n"
+    "3. A new user summary describing recent activity\n\n"
+    
+    "Your job: Return a JSON object with habit names as keys and NEW minutes to ADD as values.\n\n"
+    
+    "INTELLIGENT RULES:\n"
+    "1. EXPLICIT MINUTES: '15 minutes', '30 mins' → use that EXACT number\n"
+    "2. COMPLETION PHRASES: 'completed', 'finished', 'done with', 'accomplished' → "
+    "calculate remaining minutes needed to reach target (target - existing)\n"
+    "3. ADDITIVE PHRASES: 'another 10 minutes', 'more 15 mins', '10 more' → add that amount\n"
+    "4. NO MENTION: If habit not mentioned → return 0\n"
+    "5. SMART MATCHING: 'workout' matches 'morning workout', 'meditate' matches 'meditation'\n"
+    "6. BE PRECISE: Don't invent or inflate numbers - use exactly what user says\n\n"
+    
+    "EXAMPLES:\n"
+    "- Existing: 20 mins meditation, New: 'completed meditation' → 10 mins (if target is 30)\n"
+    "- Existing: 0 mins workout, New: 'finished workout' → 60 mins (full target)\n"
+    "- Existing: 15 mins reading, New: 'read for 10 more minutes' → 10 mins\n"
+    "- Existing: 0 mins yoga, New: 'did 25 minutes of yoga' → 25 mins (EXACTLY 25)\n"
+    "- Existing: 10 mins deep work, New: 'deep work 20 minutes' → 20 mins (EXACTLY 20)\n\n"
+    
+    "Return ONLY the JSON object with NEW minutes to add, not totals."
+)
+
+# Appended to the system prompt when several summaries share one request.
+BATCH_INSTRUCTIONS = (
+    "\n\nBATCH MODE: Instead of one summary you get a list `summaries`, in the order "
+    "they were recorded. Treat them as successive updates: the existing progress for each "
+    "summary is the given existing progress plus the minutes you assigned to the earlier "
+    "summaries. Return ONLY {\"results\": [...]} with one JSON object per summary, in order."
+)
+
+MODEL = "gpt-3.5-turbo-0125"
+
+
+def _extract_json(content: str) -> Any:
+    """Decode the JSON object in a model answer, ignoring stray text around it."""
+    content = content.strip()
+    start = content.find("{")
+    end = content.rfind("}")
+    if start == -1 or end == -1:
+        return {}
+    return json.loads(content[start : end + 1])
+
+
+def _minutes_by_id(mapping: Dict[str, Any], habits: List[HabitRead]) -> Dict[str, int]:
+    """Correlate habit names in a model answer back to IDs."""
+    result: Dict[str, int] = {}
+    for habit in habits:
+        minutes = mapping.get(habit.name, 0)
+        try:
+            minutes_int = int(minutes)
+        except (TypeError, ValueError):
+            minutes_int = 0
+        result[habit.id] = minutes_int
+    return result
+
+
+def _user_message(habits: List[HabitRead], existing_progress: Dict[str, int], **summary: Any) -> Dict[str, str]:
+    return {
+        "role": "user",
+        "content": json.dumps({
+            "habits": [{"name": habit.name, "target_minutes": habit.target_minutes} for habit in habits],
+            "existing_progress": {habit.name: existing_progress.get(habit.id, 0) for habit in habits},
+            **summary,
+        }),
+    }
 
 
 async def parse_habits_with_ai(text: str, habits: List[HabitRead], existing_progress: Dict[str, int] = None) -> Dict[str, int]:
@@ -42,86 +237,168 @@ async def parse_habits_with_ai(text: str, habits: List[HabitRead], existing_prog
     # Fallback if no API key
     if not api_key:
         return parse_speech_text(text, habits)
-    # Build a system prompt that instructs the model to output JSON
-    habit_names = [habit.name for habit in habits]
-    habit_targets = {habit.name: habit.target_minutes for habit in habits}
-    
+
     # Handle existing progress for intelligent accumulation
     existing_progress = existing_progress or {}
-    
-    system_prompt = (
-        "You are an intelligent habit tracking assistant. I will give you:\n"
-        "1. A list of habits with their target minutes\n"
-        "2. Any existing progress for today (minutes already logged)\n"
-        "3. A new user summary describing recent activity\n\n"
-        
-        "Your job: Return a JSON object with habit names as keys and NEW minutes to ADD as values.\n\n"
-        
-        "INTELLIGENT RULES:\n"
-        "1. EXPLICIT MINUTES: '15 minutes', '30 mins' → use that EXACT number\n"
-        "2. COMPLETION PHRASES: 'completed', 'finished', 'done with', 'accomplished' → "
-        "calculate remaining minutes needed to reach target (target - existing)\n"
-        "3. ADDITIVE PHRASES: 'another 10 minutes', 'more 15 mins', '10 more' → add that amount\n"
-        "4. NO MENTION: If habit not mentioned → return 0\n"
-        "5. SMART MATCHING: 'workout' matches 'morning workout', 'meditate' matches 'meditation'\n"
-        "6. BE PRECISE: Don't invent or inflate numbers - use exactly what user says\n\n"
-        
-        "EXAMPLES:\n"
-        "- Existing: 20 mins meditation, New: 'completed meditation' → 10 mins (if target is 30)\n"
-        "- Existing: 0 mins workout, New: 'finished workout' → 60 mins (full target)\n"
-        "- Existing: 15 mins reading, New: 'read for 10 more minutes' → 10 mins\n"
-        "- Existing: 0 mins yoga, New: 'did 25 minutes of yoga' → 25 mins (EXACTLY 25)\n"
-        "- Existing: 10 mins deep work, New: 'deep work 20 minutes' → 20 mins (EXACTLY 20)\n\n"
-        
-        "Return ONLY the JSON object with NEW minutes to add, not totals."
-    )
+    if os.getenv("LLM_LOCAL_FIRST", "1") != "0":
+        local = score_speech_text(text, habits)
+        if local.confident:
+            tier_counts["local"] += 1
+            return local.minutes
+    cached = parse_cache.lookup(text, habits, existing_progress)
+    if cached is not None:
+        tier_counts["cache"] += 1
+        return cached
+
+    return await _parse_with_model(api_key, text, habits, existing_progress)
+
+
+async def _complete(api_key: str, messages: List[Dict[str, str]]) -> Any:
+    """Run a chat completion, report its outcome to the breaker and decode the JSON answer."""
+    started = time.monotonic()
+    try:
+        data = await _chat_completion(api_key, {"model": MODEL, "messages": messages, "temperature": 0})
+        # The model is instructed to return JSON but we guard against stray text.
+        answer = _extract_json(data["choices"][0]["message"]["content"])
+    except Exception:
+        elapsed = time.monotonic() - started
+        breaker.record(False, elapsed)
+        LLM_LATENCY.observe(elapsed, "error")
+        raise
+    elapsed = time.monotonic() - started
+    breaker.record(True, elapsed)
+    LLM_LATENCY.observe(elapsed, "ok")
+    usage = data.get("usage") or {}
+    for kind in ("prompt", "completion"):
+        LLM_TOKENS.inc(kind, amount=usage.get(f"{kind}_tokens") or 0)
+    return answer
+
+
+async def _ask_model(
+    api_key: str, text: str, habits: List[HabitRead], existing_progress: Dict[str, int]
+) -> Dict[str, int]:
     messages = [
-        {"role": "system", "content": system_prompt},
-        {
-            "role": "user",
-            "content": json.dumps({
-                "habits": [{"name": habit.name, "target_minutes": habit.target_minutes} for habit in habits],
-                "existing_progress": {habit.name: existing_progress.get(habit.id, 0) for habit in habits},
-                "summary": text
-            }),
-        },
+        {"role": "system", "content": SYSTEM_PROMPT},
+        _user_message(habits, existing_progress, summary=text),
     ]
+    result = _minutes_by_id(await _complete(api_key, messages), habits)
+    parse_cache.store(text, habits, existing_progress, result)
+    return result
+
+
+def _consume(call: "asyncio.Future[Any]") -> None:
+    """Retrieve the outcome of an abandoned call, so its failure is not logged as unhandled."""
+    _abandoned.discard(call)
+    if not call.cancelled():
+        call.exception()
+
+
+async def _parse_with_model(
+    api_key: str, text: str, habits: List[HabitRead], existing_progress: Dict[str, int]
+) -> Dict[str, int]:
+    """Ask the model about one summary, caching the answer or falling back to the heuristic.
+
+    While the breaker is open the model is not called at all. With a
+    hedge budget (`LLM_HEDGE_SECONDS`), a model answer that is not back
+    in time is abandoned in favour of the heuristic; the call itself
+    carries on, so its answer still reaches the cache and the breaker.
+    """
+    if not breaker.allow():
+        tier_counts["breaker"] += 1
+        return parse_speech_text(text, habits)
+    call = asyncio.ensure_future(_ask_model(api_key, text, habits, existing_progress))
+    hedge = float(os.getenv("LLM_HEDGE_SECONDS", "0"))
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "gpt-3.5-turbo-0125",
-                    "messages": messages,
-                    "temperature": 0,
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
-            content = data["choices"][0]["message"]["content"].strip()
-            # Attempt to parse JSON. The model is instructed to return JSON but
-            # we guard against stray text.
-            start = content.find("{")
-            end = content.rfind("}")
-            if start != -1 and end != -1:
-                json_str = content[start : end + 1]
-                mapping = json.loads(json_str)
-            else:
-                mapping = {}
+        if hedge > 0:
+            done, _ = await asyncio.wait({call}, timeout=hedge)
+            if not done:
+                _abandoned.add(call)
+                call.add_done_callback(_consume)
+                tier_counts["hedged"] += 1
+                return parse_speech_text(text, habits)
+        result = await call
     except Exception:
         # Fallback on any error
+        tier_counts["fallback"] += 1
         return parse_speech_text(text, habits)
-    # Correlate habit names back to IDs
-    result: Dict[str, int] = {}
-    for habit in habits:
-        minutes = mapping.get(habit.name, 0)
-        try:
-            minutes_int = int(minutes)
-        except (TypeError, ValueError):
-            minutes_int = 0
-        result[habit.id] = minutes_int
-    return result
\ No newline at end of file
+    tier_counts["llm"] += 1
+    return result
+
+
+async def parse_habits_batch_with_ai(
+    texts: List[str], habits: List[HabitRead], existing_progress: Dict[str, int] = None
+) -> List[Dict[str, int]]:
+    """
+    Parse several summaries, recorded in order, with at most one model call.
+
+    Each summary is resolved against the existing progress plus the
+    minutes of the summaries before it, as if they had been submitted one
+    by one. Summaries are answered locally or from the cache while the
+    progress they depend on is known; from the first one that needs the
+    model onwards, the rest are sent in a single request (the model needs
+    the earlier ones to resolve completion phrases in later ones), and
+    confident local answers still take precedence over the model's. On any
+    failure the remaining summaries fall back to the heuristic parser.
+
+    Returns:
+        One dictionary of habit ID -> NEW minutes to add per summary.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return [parse_speech_text(text, habits) for text in texts]
+
+    running = dict(existing_progress or {})
+    local_first = os.getenv("LLM_LOCAL_FIRST", "1") != "0"
+    locals_ = [score_speech_text(text, habits) if local_first else None for text in texts]
+    results: List[Dict[str, int]] = []
+
+    def accept(minutes: Dict[str, int]) -> None:
+        results.append(minutes)
+        for habit_id, added in minutes.items():
+            running[habit_id] = running.get(habit_id, 0) + added
+
+    for index, text in enumerate(texts):
+        local = locals_[index]
+        if local is not None and local.confident:
+            tier_counts["local"] += 1
+            accept(local.minutes)
+            continue
+        cached = parse_cache.lookup(text, habits, running)
+        if cached is None:
+            break
+        tier_counts["cache"] += 1
+        accept(cached)
+
+    start = len(results)
+    if start == len(texts):
+        return results
+    pending = texts[start:]
+    if len(pending) == 1:
+        # The batch instructions would only add tokens.
+        return results + [await _parse_with_model(api_key, pending[0], habits, running)]
+    if not breaker.allow():
+        tier_counts["breaker"] += len(pending)
+        return results + [parse_speech_text(text, habits) for text in pending]
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT + BATCH_INSTRUCTIONS},
+        _user_message(habits, running, summaries=pending),
+    ]
+    try:
+        answers = (await _complete(api_key, messages)).get("results")
+        if not isinstance(answers, list) or len(answers) != len(pending):
+            raise ValueError("batch answer does not match the number of summaries")
+        mappings = [_minutes_by_id(answer if isinstance(answer, dict) else {}, habits) for answer in answers]
+    except Exception:
+        tier_counts["fallback"] += len(pending)
+        return results + [parse_speech_text(text, habits) for text in pending]
+
+    for offset, (text, minutes) in enumerate(zip(pending, mappings)):
+        local = locals_[start + offset]
+        if local is not None and local.confident:
+            tier_counts["local"] += 1
+            accept(local.minutes)
+            continue
+        tier_counts["llm"] += 1
+        parse_cache.store(text, habits, running, minutes)
+        accept(minutes)
+    return results
@@ -0,0 +1,337 @@
+"""
+Content-hashed, precompressed serving of the frontend.
+
+`build_assets` walks `frontend/` once and produces an `AssetManifest`:
+for every file a content hash, and gzip and (when the optional `brotli`
+package is installed) brotli variants written to a build directory under
+their hash, so later builds and other workers reuse them. Each file is
+reachable under two URLs:
+
+* its plain name, e.g. `/static/scripts.js`, served with `no-cache` so
+  clients revalidate it with its ETag on every use;
+* a hashed name, e.g. `/static/scripts.3f2a9c1be0.js`, whose content can
+  never change and is served with `Cache-Control: immutable`.
+
+`index.html` is rewritten to reference the hashed names of the files it
+loads, and the service worker's `ASSETS_TO_CACHE` list and `CACHE_NAME`
+are generated from the manifest, so a deploy that changes any asset
+installs a new service worker. `serve` negotiates the encoding, answers
+`If-None-Match` with 304 and single `Range` requests with 206 (ranges are
+always served from the uncompressed file).
+
+Run `python -m app.assets` at deploy time to precompute the variants;
+otherwise the first request (or the startup hook) does it. Configuration:
+
+    ASSETS_BUILD_DIR   where compressed variants are kept (default: a
+                       habit_app_assets-<uid> directory in the temp
+                       directory, private to the user running the app)
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import stat
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+try:
+    # Brotli is optional; without it only gzip variants are produced.
+    import brotli  # type: ignore
+except ModuleNotFoundError:
+    brotli = None  # type: ignore
+
+FRONTEND_DIR = os.path.join(os.path.dirname(__file__), "..", "frontend")
+
+# Files served at the site root rather than under /static.
+ROOT_FILES = {"index.html": "/", "manifest.json": "/manifest.json", "service-worker.js": "/service-worker.js"}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Formats that are already compressed.
+_INCOMPRESSIBLE = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".gz", ".zip", ".woff", ".woff2"}
+# A variant must save at least this share of the size to be kept.
+_MIN_SAVING = 0.1
+# Brotli's best quality is slow on multi-megabyte model files.
+_BROTLI_LARGE_FILE = 1 << 20
+
+_STATIC_REFERENCE = re.compile(r'(href|src)="/static/([^"]+)"')
+_CACHE_NAME = re.compile(r"const CACHE_NAME = '[^']*';")
+_ASSETS_TO_CACHE = re.compile(r"const ASSETS_TO_CACHE = \[[^\]]*\];")
+
+
+class Variant(NamedTuple):
+    """One encoding of an asset, stored in `file`."""
+
+    file: str
+    size: int
+    etag: str
+
+
+class Asset(NamedTuple):
+    url: str
+    hashed_url: Optional[str]
+    content_type: str
+    digest: str
+    # Content-Encoding ("identity", "br", "gzip") -> variant.
+    variants: Dict[str, Variant]
+
+
+class AssetManifest:
+    """Assets by URL, plain and hashed."""
+
+    def __init__(self, assets: List[Asset]) -> None:
+        self.assets = assets
+        self._by_url: Dict[str, Tuple[Asset, bool]] = {}
+        for asset in assets:
+            self._by_url[asset.url] = (asset, False)
+            if asset.hashed_url:
+                self._by_url[asset.hashed_url] = (asset, True)
+
+    def lookup(self, url: str) -> Optional[Tuple[Asset, bool]]:
+        """The asset at `url` and whether `url` is its immutable hashed form."""
+        return self._by_url.get(url)
+
+    def hashed_url(self, url: str) -> str:
+        """The hashed URL of the asset at `url`, or `url` itself if it has none."""
+        found = self._by_url.get(url)
+        return found[0].hashed_url or url if found else url
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _hashed_name(relative: str, digest: str) -> str:
+    stem, ext = os.path.splitext(relative)
+    return f"{stem}.{digest}{ext}"
+
+
+def _content_type(name: str) -> str:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/json":
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _write_once(path: str, produce) -> int:
+    """Write `produce()` to `path` unless it already exists; return the file size.
+
+    The file is renamed into place, so concurrent builders never expose a
+    partial file.
+    """
+    if not os.path.exists(path):
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as handle:
+            handle.write(produce())
+        os.replace(temporary, path)
+    return os.path.getsize(path)
+
+
+def _make_asset(
+    url: str, hashed_url: Optional[str], name: str, data: bytes, digest: str, file: Optional[str], build_dir: str
+) -> Asset:
+    """Describe `data` and produce its compressed variants in `build_dir`."""
+    if file is None:
+        # Generated content has no source file to serve from.
+        file = os.path.join(build_dir, digest + os.path.splitext(name)[1])
+        _write_once(file, lambda: data)
+    variants = {"identity": Variant(file, len(data), f'"{digest}"')}
+    if os.path.splitext(name)[1].lower() not in _INCOMPRESSIBLE and data:
+        encoders = [("gzip", ".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            quality = 11 if len(data) <= _BROTLI_LARGE_FILE else 6
+            encoders.insert(0, ("br", ".br", lambda: brotli.compress(data, quality=quality)))
+        for encoding, suffix, compress in encoders:
+            path = os.path.join(build_dir, digest + suffix)
+            size = _write_once(path, compress)
+            if size <= len(data) * (1 - _MIN_SAVING):
+                variants[encoding] = Variant(path, size, f'"{digest}-{encoding}"')
+    return Asset(url, hashed_url, _content_type(name), digest, variants)
+
+
+def _render_index(html: str, manifest: AssetManifest) -> str:
+    return _STATIC_REFERENCE.sub(
+        lambda match: f'{match.group(1)}="{manifest.hashed_url("/static/" + match.group(2))}"', html
+    )
+
+
+def _render_service_worker(script: str, precache: List[str], version: str) -> str:
+    script = _CACHE_NAME.sub(lambda _: f"const CACHE_NAME = 'habit-tracker-cache-{version}';", script)
+    listing = json.dumps(precache, indent=2).replace('"', "'")
+    return _ASSETS_TO_CACHE.sub(lambda _: f"const ASSETS_TO_CACHE = {listing};", script)
+
+
+def _default_build_dir() -> str:
+    """A build directory in the shared temp directory that only this user can write to.
+
+    Existing variants are served as they are found, so a directory that
+    another user created (or can write to) is not used.
+    """
+    uid = os.getuid() if hasattr(os, "getuid") else None
+    path = os.path.join(tempfile.gettempdir(), "habit_app_assets" if uid is None else f"habit_app_assets-{uid}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if stat.S_ISDIR(info.st_mode) and (uid is None or info.st_uid == uid) and not info.st_mode & 0o022:
+        return path
+    return tempfile.mkdtemp(prefix="habit_app_assets-")
+
+
+def build_assets(source_dir: str = FRONTEND_DIR, build_dir: Optional[str] = None) -> AssetManifest:
+    """Hash and precompress every file under `source_dir`."""
+    build_dir = build_dir or os.getenv("ASSETS_BUILD_DIR") or _default_build_dir()
+    os.makedirs(build_dir, mode=0o700, exist_ok=True)
+    assets: List[Asset] = []
+    for directory, subdirectories, files in os.walk(source_dir):
+        subdirectories[:] = sorted(name for name in subdirectories if not name.startswith("."))
+        for name in sorted(files):
+            file = os.path.join(directory, name)
+            relative = os.path.relpath(file, source_dir).replace(os.sep, "/")
+            if name.startswith(".") or relative in ROOT_FILES:
+                continue
+            with open(file, "rb") as handle:
+                data = handle.read()
+            digest = _digest(data)
+            url = "/static/" + relative
+            assets.append(_make_asset(url, "/static/" + _hashed_name(relative, digest), name, data, digest, file, build_dir))
+    manifest = AssetManifest(assets)
+
+    # The page is rewritten to load hashed URLs; the service worker
+    # precaches the page, the manifest and the top-level static files.
+    generated: List[Asset] = []
+    precache = ["/"]
+    for relative, url in ROOT_FILES.items():
+        if relative == "service-worker.js":
+            continue
+        file = os.path.join(source_dir, relative)
+        with open(file, "rb") as handle:
+            data = handle.read()
+        if relative == "index.html":
+            data = _render_index(data.decode("utf-8"), manifest).encode("utf-8")
+            file = None
+        else:
+            precache.append(url)
+        generated.append(_make_asset(url, None, relative, data, _digest(data), file, build_dir))
+    precache += [asset.hashed_url for asset in assets if asset.url.count("/") == 2]
+    version = _digest("".join(asset.digest for asset in assets + generated).encode())
+    with open(os.path.join(source_dir, "service-worker.js"), "rb") as handle:
+        script = _render_service_worker(handle.read().decode("utf-8"), precache, version).encode("utf-8")
+    generated.append(
+        _make_asset("/service-worker.js", None, "service-worker.js", script, _digest(script), None, build_dir)
+    )
+    return AssetManifest(assets + generated)
+
+
+def _accepted_encodings(header: str) -> List[str]:
+    """Encodings from an Accept-Encoding header, excluding those with q=0."""
+    accepted = []
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.append(token.strip().lower())
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header value matches `etag` (weak comparison)."""
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """The inclusive byte range of a single-range `Range` header, or None if unsatisfiable.
+
+    Raises ValueError for headers this server does not handle (other
+    units, multiple ranges) or that are invalid (RFC 7233 §2.1: negative
+    positions, a last byte before the first), which are answered with the
+    full body.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError(header)
+    first, _, last = (part.strip() for part in spec.partition("-"))
+    if not (first or last) or any(part and not (part.isascii() and part.isdigit()) for part in (first, last)):
+        raise ValueError(header)
+    if not first:
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        raise ValueError(header)
+    if start >= size:
+        return None
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def serve(asset: Asset, immutable: bool, request: Request) -> Response:
+    """Respond with the best variant of `asset` for `request`."""
+    identity = asset.variants["identity"]
+    byte_range: Optional[Tuple[int, int]] = None
+    ranged = False
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == identity.etag):
+        try:
+            byte_range = _parse_range(range_header, identity.size)
+            ranged = True
+        except ValueError:
+            pass
+
+    variant, encoding = identity, "identity"
+    if not ranged:
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and candidate in accepted:
+                variant, encoding = asset.variants[candidate], candidate
+                break
+
+    headers = {
+        "ETag": variant.etag,
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "Vary": "Accept-Encoding",
+        "Accept-Ranges": "bytes",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if etag_matches(request.headers.get("if-none-match", ""), variant.etag):
+        return Response(status_code=304, headers=headers)
+    if ranged:
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{identity.size}"
+            return Response(status_code=416, headers=headers)
+        start, end = byte_range
+        body = b""
+        if request.method != "HEAD":
+            with open(identity.file, "rb") as handle:
+                handle.seek(start)
+                body = handle.read(end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{identity.size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return Response(body, status_code=206, media_type=asset.content_type, headers=headers)
+    return FileResponse(variant.file, media_type=asset.content_type, headers=headers)
+
+
+def main() -> int:
+    manifest = build_assets()
+    raw = sum(asset.variants["identity"].size for asset in manifest.assets)
+    best = sum(min(variant.size for variant in asset.variants.values()) for asset in manifest.assets)
+    print(f"{len(manifest.assets)} asset(s), {raw} bytes, {best} bytes with the best encoding")
+    if brotli is None:
+        print("brotli is not installed; only gzip variants were produced")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+In-process caches used by the habit tracker.
+
+`TTLCache` is a small LRU cache whose entries also expire after a fixed
+time-to-live. `ParseCache` builds on it to remember what the language
+model extracted from a transcript, so that phrases users repeat every day
+("finished meditation", "did 30 minutes of reading") do not cost an
+upstream call each time.
+
+A parse result usually depends only on the transcript and the habit list,
+but completion phrases are resolved against the minutes already logged
+("finished meditation" adds whatever is left to reach the target). Such
+results are stored symbolically as "complete" and re-resolved against the
+current progress on every hit. Other results are treated as independent
+of progress only when every minute count in them is stated in the
+transcript; the rest (a bare "meditation", or a completion phrase the
+word list misses) are cached under a key that also includes the existing
+progress.
+
+`HabitCache` holds a snapshot of the habit definitions for the database
+backed repositories, which would otherwise re-read them on every request.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .schemas import HabitRead
+from .utils import COMPLETION_WORDS, tokenize
+
+NUMBER_WORDS = {
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "fifteen", "twenty", "thirty", "forty", "fifty", "sixty",
+    "ninety", "hundred", "half", "hour", "hours",
+}
+
+# A cached parse: habit_id -> ("add", minutes) or ("complete", 0).
+SymbolicResult = Dict[str, Tuple[str, int]]
+
+
+class TTLCache:
+    """Least-recently-used cache with a per-entry time-to-live and hit/miss counters."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class HabitCache:
+    """Versioned, read-through snapshot of the habit list.
+
+    Habits are small and usually read together, so the whole list is
+    cached as one snapshot that expires after `ttl` seconds (0 disables
+    caching). `invalidate` bumps `version`; a snapshot loaded under an
+    older version is discarded by `fill`, so a reload racing with an
+    invalidation cannot reinstate stale data.
+
+    `token` is the database's version token for the habit list, read before
+    the snapshot was loaded, so a response validated by it is never built
+    from an older snapshot. It expires and is invalidated with the
+    snapshot.
+    """
+
+    def __init__(self, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self.version = 0
+        self.token: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._habits: Optional[List[HabitRead]] = None
+        self._by_id: Dict[str, HabitRead] = {}
+        self._expires = 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def fresh(self) -> bool:
+        """Whether a snapshot is loaded and has not expired."""
+        return self._habits is not None and self._clock() < self._expires
+
+    def snapshot(self) -> Optional[List[HabitRead]]:
+        """The cached habit list, or None if it must be loaded."""
+        if not self.fresh:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return list(self._habits)
+
+    def get(self, habit_id: str) -> Optional[HabitRead]:
+        """The cached habit, or None if unknown to the snapshot or the snapshot is stale."""
+        habit = self._by_id.get(habit_id) if self.fresh else None
+        if habit is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return habit
+
+    def fill(self, habits: List[HabitRead], version: int, token: Optional[str] = None) -> None:
+        """Store a list loaded while the cache was at `version` and the database at `token`."""
+        if version != self.version or self.ttl <= 0:
+            return
+        self.token = token
+        self._habits = list(habits)
+        self._by_id = {habit.id: habit for habit in habits}
+        self._expires = self._clock() + self.ttl
+
+    def add(self, habit: HabitRead, token: Optional[str] = None) -> None:
+        """Record a habit created by this process, keeping a fresh snapshot fresh.
+
+        `token` is the database's token after the creation, if no other
+        change to the habits came in between.
+        """
+        self.version += 1
+        if self.fresh:
+            if habit.id not in self._by_id:
+                self._habits.append(habit)
+                self._by_id[habit.id] = habit
+            self.token = token
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self.token = None
+        self._habits = None
+        self._by_id = {}
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def habits_fingerprint(habits: List[HabitRead]) -> str:
+    """Digest of the habit IDs, names and targets a parse was made against."""
+    payload = sorted((habit.id, habit.name, habit.target_minutes) for habit in habits)
+    return hashlib.sha1(json.dumps(payload).encode()).hexdigest()
+
+
+class _SQLiteStore:
+    """Optional persistent second level for `ParseCache`, shared by workers on one host."""
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parse_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM parse_cache WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parse_cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM parse_cache")
+
+
+class ParseCache:
+    """Cache of language-model parse results keyed on transcript and habits."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 86400.0, path: Optional[str] = None) -> None:
+        self._memory = TTLCache(max_size=max_size, ttl=ttl)
+        self._store = _SQLiteStore(path) if path else None
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ParseCache":
+        """Configure from `LLM_CACHE_SIZE`, `LLM_CACHE_TTL` and `LLM_CACHE_PATH`."""
+        return cls(
+            max_size=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+            path=os.getenv("LLM_CACHE_PATH") or None,
+        )
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._store is not None:
+            self._store.clear()
+
+    @staticmethod
+    def _keys(text: str, habits: List[HabitRead], existing_progress: Dict[str, int]) -> Tuple[str, str]:
+        """The progress-independent key and the key that also pins existing progress."""
+        base = f"{habits_fingerprint(habits)}:{normalize_transcript(text)}"
+        progress = json.dumps(sorted((habit.id, existing_progress.get(habit.id, 0)) for habit in habits))
+        return base, f"{base}:{hashlib.sha1(progress.encode()).hexdigest()}"
+
+    def _get(self, key: str) -> Optional[Any]:
+        value = self._memory.get(key)
+        if value is None and self._store is not None:
+            value = self._store.get(key)
+            if value is not None:
+                self._memory.set(key, value)
+        return value
+
+    def _set(self, key: str, value: Any) -> None:
+        self._memory.set(key, value)
+        if self._store is not None:
+            self._store.set(key, value, self.ttl)
+
+    def lookup(
+        self, text: str, habits: List[HabitRead], existing_progress: Dict[str, int]
+    ) -> Optional[Dict[str, int]]:
+        """Return the cached minutes to add for `text`, or None on a miss."""
+        base_key, progress_key = self._keys(text, habits, existing_progress)
+        symbolic = self._get(base_key)
+        if symbolic is None:
+            symbolic = self._get(progress_key)
+        if symbolic is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result: Dict[str, int] = {}
+        for habit in habits:
+            kind, minutes = symbolic.get(habit.id, ("add", 0))
+            if kind == "complete":
+                minutes = max(habit.target_minutes - existing_progress.get(habit.id, 0), 0)
+            result[habit.id] = minutes
+        return result
+
+    def store(
+        self,
+        text: str,
+        habits: List[HabitRead],
+        existing_progress: Dict[str, int],
+        result: Dict[str, int],
+    ) -> None:
+        """Remember the model's answer for `text`."""
+        base_key, progress_key = self._keys(text, habits, existing_progress)
+        symbolic = self._symbolic(text, habits, existing_progress, result)
+        if symbolic is not None:
+            self._set(base_key, symbolic)
+        else:
+            self._set(progress_key, {habit_id: ("add", minutes) for habit_id, minutes in result.items()})
+
+    @staticmethod
+    def _symbolic(
+        text: str,
+        habits: List[HabitRead],
+        existing_progress: Dict[str, int],
+        result: Dict[str, int],
+    ) -> Optional[SymbolicResult]:
+        """Express `result` independently of existing progress, or None if that is ambiguous."""
+        tokens = normalize_transcript(text).split()
+        if not COMPLETION_WORDS.intersection(tokens):
+            # Minutes the transcript states do not depend on progress; any
+            # other answer (a bare mention, an unlisted completion phrase)
+            # may have been derived from it.
+            stated = {number for number in tokenize(text).numbers if number is not None}
+            if all(minutes in stated for minutes in result.values() if minutes):
+                return {habit_id: ("add", minutes) for habit_id, minutes in result.items()}
+            return None
+        if any(token.isdigit() or token in NUMBER_WORDS for token in tokens):
+            # Mixed completion phrases and explicit numbers: can't tell which is which.
+            return None
+        symbolic: SymbolicResult = {}
+        for habit in habits:
+            minutes = result.get(habit.id, 0)
+            remaining = max(habit.target_minutes - existing_progress.get(habit.id, 0), 0)
+            if remaining == 0:
+                # A finished habit yields 0 whether or not it was mentioned.
+                return None
+            if minutes == remaining:
+                symbolic[habit.id] = ("complete", 0)
+            elif minutes == 0:
+                symbolic[habit.id] = ("add", 0)
+            else:
+                return None
+        return symbolic
@@ -0,0 +1,116 @@
+"""
+Circuit breaker for calls to an unreliable upstream.
+
+The breaker keeps the outcome of the last `window` calls. A call counts
+as bad if it failed or took longer than `slow_call_seconds`. Once at
+least `min_calls` outcomes are known and the share of bad ones reaches
+`failure_rate`, the breaker opens: callers are told not to try for
+`open_seconds` and should degrade straight away. After that a single
+probe call is let through (half-open). Its success closes the breaker,
+and its failure opens it again.
+
+Configuration (read by `CircuitBreaker.from_env`):
+
+    LLM_BREAKER_WINDOW         outcomes remembered (default 20)
+    LLM_BREAKER_MIN_CALLS      outcomes needed before tripping (default 5)
+    LLM_BREAKER_FAILURE_RATE   bad share that opens the breaker (default 0.5)
+    LLM_BREAKER_SLOW_SECONDS   calls at least this slow count as bad (default 5)
+    LLM_BREAKER_OPEN_SECONDS   how long to stay open before probing (default 30)
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from typing import Callable, Deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by error rate and latency."""
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        # Calls refused while open, and times the breaker tripped.
+        self.rejected = 0
+        self.trips = 0
+        self._clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        return cls(
+            window=int(os.getenv("LLM_BREAKER_WINDOW", "20")),
+            min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "5")),
+            failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            slow_call_seconds=float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "5")),
+            open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30")),
+        )
+
+    @property
+    def error_rate(self) -> float:
+        """Share of bad outcomes among the remembered ones."""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now. Callers granted a call must `record` it."""
+        if self.state == OPEN and self._clock() >= self._opened_at + self.open_seconds:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool, duration: float) -> None:
+        """Report the outcome of a call that `allow` let through."""
+        good = success and duration < self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if good:
+                self.reset()
+            else:
+                self._open()
+            return
+        self._outcomes.append(good)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and self.error_rate >= self.failure_rate
+        ):
+            self._open()
+
+    def reset(self) -> None:
+        """Close the breaker and forget past outcomes."""
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._probing = False
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.trips += 1
+        self._opened_at = self._clock()
+        self._outcomes.clear()
@@ -0,0 +1,291 @@
+"""
+Maintenance commands for the MongoDB backend.
+
+Run with `python -m app.cli <command>`. The connection string is taken
+from `--mongo-uri` or the `MONGO_URI` environment variable, as in the
+application itself.
+
+Commands:
+    ensure-indexes      Create the indexes the repository relies on.
+    check-query-plans   Run `explain` on every repository query and exit
+                        with status 1 if any of them scans a collection.
+    migrate-dates       Rewrite progress dates into native BSON dates (or
+                        back to ISO strings with `--to iso`), in batches,
+                        while the application keeps running.
+    rebuild-summaries   Regenerate the `daily_summary` projection from raw
+                        progress, in batches, while the application keeps
+                        running. Run it before enabling
+                        `MONGO_DAILY_SUMMARY=1`.
+    check-summaries     Compare `daily_summary` with raw progress and exit
+                        with status 1 if they disagree.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .repository import MongoRepository, ObjectId
+from .schemas import HabitRead
+from .stats import WINDOW_DAYS
+
+# Join strategies that read the foreign collection without an index.
+_UNINDEXED_LOOKUP_STRATEGIES = {"NestedLoopJoin", "HashJoin"}
+
+
+def find_collection_scans(explain: Any, allow_collscan: bool = False) -> List[str]:
+    """Return a description of every unindexed access in an explain document.
+
+    Works on both `find` and `aggregate` explain output, for the classic and
+    the slot-based execution engines. `COLLSCAN` stages are reported unless
+    `allow_collscan` is set (for queries that intentionally read a whole
+    collection); `$lookup` stages are always required to use an index on the
+    foreign collection.
+    """
+    problems: List[str] = []
+    for path, node in _walk(explain, "$"):
+        stage = node.get("stage")
+        if stage == "COLLSCAN" and not allow_collscan:
+            problems.append(f"{path}: COLLSCAN")
+        if stage == "EQ_LOOKUP" and node.get("strategy") in _UNINDEXED_LOOKUP_STRATEGIES:
+            problems.append(f"{path}: $lookup uses {node['strategy']}")
+        if "$lookup" in node and node.get("collectionScans", 0) > 0:
+            problems.append(f"{path}: $lookup performed {node['collectionScans']} collection scan(s)")
+    return problems
+
+
+def _walk(value: Any, path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    if isinstance(value, dict):
+        yield path, value
+        for key, child in value.items():
+            # Rejected plans were never executed; only the winner matters.
+            if key == "rejectedPlans":
+                continue
+            yield from _walk(child, f"{path}.{key}")
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            yield from _walk(child, f"{path}[{index}]")
+
+
+def _repository_queries(repo: MongoRepository, habit: HabitRead, day: date) -> List[Tuple[str, dict, bool]]:
+    """The queries issued by `MongoRepository`, as `(name, command, allow_collscan)`.
+
+    Writes are explained through the `find` of their filter, which selects
+    the same documents.
+    """
+    habit_id = ObjectId(habit.id)
+    ordinal = day.toordinal()
+    window_start = ordinal - WINDOW_DAYS + 1
+    keys = [(habit.id, day), (habit.id, day - timedelta(days=1))]
+    return [
+        (
+            # The habit cache reloads every habit at once.
+            "list_habits",
+            {"find": "habits", "filter": {}},
+            True,
+        ),
+        (
+            "get_habit",
+            {"find": "habits", "filter": {"_id": habit_id}},
+            False,
+        ),
+        (
+            "record_progress_bulk habits",
+            {"find": "habits", "filter": {"_id": {"$in": [habit_id]}}},
+            False,
+        ),
+        (
+            "record_progress",
+            {"find": "progress", "filter": repo._progress_key(habit.id, day)},
+            False,
+        ),
+        (
+            "record_progress_bulk summaries",
+            {"find": "progress", "filter": repo._progress_keys_query(keys)},
+            False,
+        ),
+        (
+            "check_daily_summary orphans",
+            {"find": "progress", "filter": repo._progress_keys_or(keys)},
+            False,
+        ),
+        (
+            "completed days",
+            {"find": "progress", "filter": repo._completed_days_query(habit)},
+            False,
+        ),
+        (
+            "get_progress_for_date",
+            {"aggregate": "progress", "pipeline": repo._progress_for_date_pipeline(day), "cursor": {}},
+            False,
+        ),
+        (
+            "get_progress_between",
+            {
+                "aggregate": "progress",
+                "pipeline": repo._progress_between_pipeline(day - timedelta(days=30), day),
+                "cursor": {},
+            },
+            False,
+        ),
+        (
+            # Every habit produces a bar, so reading all of `habits` is
+            # expected; the join into `progress` must still be indexed.
+            "compute_progress_bars",
+            {"aggregate": "habits", "pipeline": repo._progress_bars_pipeline(day), "cursor": {}},
+            True,
+        ),
+        (
+            "daily_summary",
+            {"find": "daily_summary", "filter": {"_id": day.isoformat()}},
+            False,
+        ),
+        (
+            "check_daily_summary summaries",
+            {"find": "daily_summary", "filter": {"_id": {"$in": [day.isoformat()]}}},
+            False,
+        ),
+        (
+            "read_version",
+            {"find": "versions", "filter": {"_id": "habits"}},
+            False,
+        ),
+        (
+            "habit_stats",
+            {"find": "habit_stats", "filter": {"_id": habit_id}},
+            False,
+        ),
+        (
+            "completion run before",
+            {
+                "find": "completion_runs",
+                "filter": {"habit_id": habit_id, "start": {"$lte": window_start}},
+                "sort": {"start": -1},
+                "limit": 1,
+            },
+            False,
+        ),
+        (
+            "completion run after",
+            {"find": "completion_runs", "filter": {"habit_id": habit_id, "start": ordinal + 1}},
+            False,
+        ),
+        (
+            "completion runs in window",
+            {
+                "find": "completion_runs",
+                "filter": {"habit_id": habit_id, "start": {"$gt": window_start, "$lte": ordinal}},
+                "sort": {"start": 1},
+            },
+            False,
+        ),
+        (
+            "longest completion run",
+            {"find": "completion_runs", "filter": {"habit_id": habit_id}, "sort": {"length": -1}, "limit": 1},
+            False,
+        ),
+    ]
+
+
+async def check_query_plans(repo: MongoRepository) -> int:
+    """Explain every repository query; return the number of offending plans.
+
+    Plans are explained with `executionStats`, so run this against a
+    database that holds some habits and progress; on empty collections the
+    joins never execute and report nothing.
+    """
+    sample = await repo._habits.find_one({})
+    if sample:
+        habit = repo._habit_from_doc(sample)
+    else:
+        habit = HabitRead(id="0" * 24, name="", time_block="", target_minutes=1)
+    day = date.today()
+    failures = 0
+    for name, command, allow_collscan in _repository_queries(repo, habit, day):
+        explain = await repo._db.command("explain", command, verbosity="executionStats")
+        problems = find_collection_scans(explain, allow_collscan=allow_collscan)
+        if problems:
+            failures += 1
+            print(f"FAIL {name}")
+            for problem in problems:
+                print(f"     {problem}")
+        else:
+            print(f"ok   {name}")
+    return failures
+
+
+async def migrate_dates(repo: MongoRepository, batch_size: int) -> int:
+    """Run the online date migration, printing progress after each batch."""
+    total = 0
+    async for converted in repo.migrate_date_storage(batch_size=batch_size):
+        total += converted
+        print(f"converted {total} progress document(s)")
+    print(f"done, {total} document(s) converted")
+    return total
+
+
+async def rebuild_summaries(repo: MongoRepository, batch_size: int) -> int:
+    """Rebuild the daily summaries, printing progress after each batch."""
+    total = 0
+    async for applied in repo.rebuild_daily_summary(batch_size=batch_size):
+        total += applied
+        print(f"applied {total} progress document(s)")
+    print(f"done, {total} document(s) applied")
+    return total
+
+
+async def check_summaries(repo: MongoRepository, batch_size: int) -> int:
+    """Print every inconsistency in the daily summaries; return how many were found."""
+    failures = 0
+    async for problem in repo.check_daily_summary(batch_size=batch_size):
+        failures += 1
+        print(f"FAIL {problem}")
+    print(f"{failures} inconsistenc{'y' if failures == 1 else 'ies'} found")
+    return failures
+
+
+async def _run(args: argparse.Namespace) -> int:
+    repo = MongoRepository(args.mongo_uri, db_name=args.db, date_storage=getattr(args, "to", "native"))
+    if args.command == "ensure-indexes":
+        await repo.ensure_indexes()
+        print("indexes ensured")
+        return 0
+    if args.command == "check-query-plans":
+        return 1 if await check_query_plans(repo) else 0
+    if args.command == "migrate-dates":
+        await migrate_dates(repo, args.batch_size)
+        return 0
+    if args.command == "rebuild-summaries":
+        await rebuild_summaries(repo, args.batch_size)
+        return 0
+    if args.command == "check-summaries":
+        return 1 if await check_summaries(repo, args.batch_size) else 0
+    raise AssertionError(args.command)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Habit tracker maintenance commands.")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI"), help="MongoDB connection string.")
+    parser.add_argument("--db", default="habit_app", help="Database name.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("ensure-indexes", help="Create the repository indexes.")
+    subparsers.add_parser("check-query-plans", help="Fail if any repository query scans a collection.")
+    migrate = subparsers.add_parser("migrate-dates", help="Convert stored progress dates in batches.")
+    migrate.add_argument("--to", choices=MongoRepository.DATE_STORAGE_MODES, default="native")
+    migrate.add_argument("--batch-size", type=int, default=500)
+    rebuild = subparsers.add_parser("rebuild-summaries", help="Regenerate daily summaries from progress.")
+    rebuild.add_argument("--batch-size", type=int, default=500)
+    check = subparsers.add_parser("check-summaries", help="Fail if daily summaries disagree with progress.")
+    check.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+    if not args.mongo_uri:
+        parser.error("a MongoDB URI is required (--mongo-uri or MONGO_URI)")
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
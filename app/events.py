@@ -0,0 +1,126 @@
+"""
+In-process publish/subscribe of progress changes for live clients.
+
+`GET /progress/stream` keeps a Server-Sent Events connection open per
+client. Each connection holds a `Subscription`: a small bounded queue of
+pre-encoded SSE messages. `Broker.publish` encodes an event once and
+offers the same string to every subscriber without waiting, so one slow
+client never holds up the others or the write that caused the event.
+
+A subscriber whose queue is full is dropped. Its pending messages are
+replaced by a single `reset` event, after which its stream ends; the
+browser's `EventSource` reconnects and the page refetches its state.
+Idle subscribers cost a queue and a waiting task each, so a worker can
+hold thousands of them.
+
+Configuration (read by `Broker.from_env`):
+
+    STREAM_MAX_PENDING   messages buffered per subscriber before it is dropped (default 32)
+    STREAM_KEEPALIVE     seconds between keep-alive comments on idle streams (default 15)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import AsyncIterator, Optional, Set
+
+# Sent to a dropped subscriber: its view is stale and must be refetched.
+RESET = "event: reset\ndata: {}\n\n"
+# SSE comment line; keeps proxies from closing an idle connection.
+KEEPALIVE = ": keepalive\n\n"
+
+
+def encode_event(event: str, data: str) -> str:
+    """Format one Server-Sent Event. `data` must not contain newlines."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """One subscriber's bounded buffer of encoded messages."""
+
+    __slots__ = ("_queue", "closed")
+
+    def __init__(self, max_pending: int) -> None:
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(max_pending)
+        self.closed = False
+
+    def _offer(self, message: str) -> bool:
+        """Queue `message` without waiting; False if the subscriber is too far behind."""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def _close(self, final: Optional[str]) -> None:
+        """End the stream, after `final` if given.
+
+        Pending messages are discarded before a `final` message (they are
+        superseded by it) or when there is no room left to end the stream.
+        """
+        self.closed = True
+        if final is not None or self._queue.full():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+        self._queue.put_nowait(final)
+
+    async def messages(self, keepalive: float) -> AsyncIterator[str]:
+        """Yield queued messages, and a keep-alive comment every `keepalive` idle seconds."""
+        while True:
+            try:
+                message = await asyncio.wait_for(self._queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+                continue
+            if message is None:
+                return
+            yield message
+            if self.closed and self._queue.empty():
+                return
+
+
+class Broker:
+    """Fan published events out to every current subscriber."""
+
+    def __init__(self, max_pending: int = 32, keepalive: float = 15.0) -> None:
+        self.max_pending = max_pending
+        self.keepalive = keepalive
+        self.published = 0
+        self.dropped = 0
+        self._subscribers: Set[Subscription] = set()
+
+    @classmethod
+    def from_env(cls) -> "Broker":
+        return cls(
+            max_pending=int(os.getenv("STREAM_MAX_PENDING", "32")),
+            keepalive=float(os.getenv("STREAM_KEEPALIVE", "15")),
+        )
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_pending)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: str, data: str) -> None:
+        """Offer an event to every subscriber, dropping those that cannot keep up."""
+        message = encode_event(event, data)
+        self.published += 1
+        slow = [subscription for subscription in self._subscribers if not subscription._offer(message)]
+        for subscription in slow:
+            self.dropped += 1
+            self._subscribers.discard(subscription)
+            subscription._close(RESET)
+
+    def close(self) -> None:
+        """End every open stream, e.g. on shutdown."""
+        for subscription in self._subscribers:
+            subscription._close(None)
+        self._subscribers.clear()
@@ -0,0 +1,56 @@
+"""
+Year heatmap of habit progress ratios, computed with NumPy.
+
+The heatmap applies the same formula as `compute_progress_bars`,
+`min(minutes / target_minutes, 1.0)`, to every day of a year at once. The
+year's progress is fetched with a single range query and scattered into
+a dense `(days, habits)` matrix of minutes, which is then divided by the
+vector of targets and clipped in two vectorised operations.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+
+try:
+    # NumPy is an optional dependency; only the heatmap endpoint needs it.
+    import numpy as np  # type: ignore
+except ModuleNotFoundError:
+    np = None  # type: ignore
+
+from .repository import HabitRepository
+from .schemas import ProgressHeatmap
+
+
+async def compute_year_heatmap(repo: HabitRepository, year: int) -> ProgressHeatmap:
+    """Return the progress ratio of every habit on every day of `year`.
+
+    Row `i` of the result is day `start + i`; column `j` is `habit_ids[j]`.
+    Days without progress have a ratio of 0.
+    """
+    if np is None:
+        raise ImportError("NumPy is required for the progress heatmap but is not installed.")
+    start = date(year, 1, 1)
+    end = date(year, 12, 31)
+    habits = await repo.list_habits()
+    entries = await repo.get_progress_between(start, end)
+
+    column = {habit.id: index for index, habit in enumerate(habits)}
+    # Progress for habits that no longer exist has no column to land in.
+    known = [entry for entry in entries if entry.habit_id in column]
+    first = start.toordinal()
+    rows = np.fromiter((entry.date.toordinal() - first for entry in known), dtype=np.intp, count=len(known))
+    cols = np.fromiter((column[entry.habit_id] for entry in known), dtype=np.intp, count=len(known))
+    values = np.fromiter((entry.minutes for entry in known), dtype=np.float64, count=len(known))
+
+    minutes = np.zeros((end.toordinal() - first + 1, len(habits)), dtype=np.float64)
+    minutes[rows, cols] = values
+    targets = np.fromiter((habit.target_minutes for habit in habits), dtype=np.float64, count=len(habits))
+    ratios = np.minimum(minutes / targets, 1.0)
+
+    return ProgressHeatmap(
+        year=year,
+        start=start,
+        habit_ids=[habit.id for habit in habits],
+        ratios=ratios.tolist(),
+    )
@@ -0,0 +1,181 @@
+"""
+Bounded job queue and request coalescing for slow, upstream-bound work.
+
+`/speech` spends most of its time waiting on the language model. During a
+burst (the evening check-in) an unbounded number of such requests would
+pile up on the upstream API. `JobQueue` runs at most `max_concurrency`
+jobs at a time, holds at most `max_queue` more, and rejects the rest with
+`QueueFull`, which carries a `Retry-After` estimate derived from recent
+job durations. Jobs keep their outcome for `result_ttl` seconds so that
+clients using the asynchronous mode can poll for it.
+
+`SingleFlight` shares one in-flight call between callers asking for the
+same key, so identical transcripts submitted together cost one model
+call.
+
+Configuration (read by `JobQueue.from_env`):
+
+    SPEECH_MAX_CONCURRENCY   jobs processed at once (default 8)
+    SPEECH_MAX_QUEUE         jobs waiting for a slot before 429 (default 100)
+    SPEECH_JOB_TTL           seconds a finished job stays pollable (default 600)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set
+
+
+class QueueFull(Exception):
+    """Raised by `JobQueue.submit` when no more work can be accepted."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Too many pending jobs, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """One unit of queued work and, once finished, its outcome."""
+
+    def __init__(self, work: Callable[[], Awaitable[Any]]) -> None:
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished_at: Optional[float] = None
+        self._work = work
+        self._done = asyncio.get_running_loop().create_future()
+
+    async def wait(self) -> Any:
+        """Wait for the job and return its result, re-raising its error.
+
+        Cancelling the waiter (e.g. the client disconnected) does not
+        cancel the job itself.
+        """
+        await asyncio.shield(self._done)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class JobQueue:
+    """Run submitted coroutines with bounded concurrency and a bounded backlog."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 100,
+        result_ttl: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.rejected = 0
+        self._clock = clock
+        self._jobs: Dict[str, Job] = {}
+        self._waiting: Deque[Job] = deque()
+        self._running = 0
+        # The loop only keeps weak references to tasks; running jobs are held here.
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        # Exponential moving average of job duration, for Retry-After.
+        self._avg_duration = 1.0
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        return cls(
+            max_concurrency=int(os.getenv("SPEECH_MAX_CONCURRENCY", "8")),
+            max_queue=int(os.getenv("SPEECH_MAX_QUEUE", "100")),
+            result_ttl=float(os.getenv("SPEECH_JOB_TTL", "600")),
+        )
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running."""
+        return self._running + len(self._waiting)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, at least 1."""
+        waves = (len(self._waiting) + 1) / self.max_concurrency
+        return max(1, math.ceil(waves * self._avg_duration))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def submit(self, work: Callable[[], Awaitable[Any]]) -> Job:
+        """Queue `work()` and return its job, or raise `QueueFull`."""
+        self._prune()
+        if self._running >= self.max_concurrency and len(self._waiting) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(self.retry_after())
+        job = Job(work)
+        self._jobs[job.id] = job
+        if self._running < self.max_concurrency:
+            self._start(job)
+        else:
+            self._waiting.append(job)
+        return job
+
+    def _start(self, job: Job) -> None:
+        self._running += 1
+        job.status = "running"
+        task = asyncio.ensure_future(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job) -> None:
+        started = self._clock()
+        try:
+            job.result = await job._work()
+            job.status = "done"
+        except Exception as exc:
+            job.error = exc
+            job.status = "failed"
+        finally:
+            job.finished_at = self._clock()
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * (job.finished_at - started)
+            job._done.set_result(None)
+            self._running -= 1
+            while self._waiting and self._running < self.max_concurrency:
+                self._start(self._waiting.popleft())
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than `result_ttl`."""
+        horizon = self._clock() - self.result_ttl
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < horizon
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution."""
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return `await fn()`, sharing the call with any caller already running it."""
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+        else:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+
+            def forget(done: "asyncio.Future[Any]") -> None:
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+
+            call.add_done_callback(forget)
+        return await asyncio.shield(call)
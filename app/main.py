@@ -4,52 +4,88 @@ Entry point for the Habit Tracker FastAPI application.
 This module defines the API endpoints for managing habits, recording
 progress, parsing speech-transcribed descriptions, and computing
 progress bars. The application automatically chooses between an
-in-memory repository for testing and a MongoDB-backed repository for
-production based on the presence of the `MONGO_URI` environment
-variable.
+in-memory repository for testing, a MongoDB-backed repository for
+production and an embedded SQLite repository for single-node
+deployments, based on the `MONGO_URI` and `SQLITE_PATH` environment
+variables.
 
 The API is designed with minimalism and ease of use in mind; the
 frontend is served as static files under the `/` path and interacts
 with the API via JavaScript fetch calls.
 """
 
+import asyncio
 import os
-from datetime import date
-from typing import List
+from datetime import date, timedelta
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Path, Query, Request
 
 # Load environment variables from .env file
 load_dotenv()
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 
 from .schemas import (
     HabitCreate,
     HabitRead,
+    HabitStats,
     ProgressCreate,
     ProgressRead,
+    ProgressBulkResult,
+    DailyProgress,
+    SpeechBatchInput,
     SpeechInput,
     ProgressBar,
+    ProgressDelta,
+    ProgressHeatmap,
+    SpeechJob,
 )
-from .repository import HabitRepository, InMemoryRepository, MongoRepository
+from .repository import HabitRepository, InMemoryRepository, MongoRepository, SQLiteRepository
 from .utils import parse_speech_text
-from .agents import parse_habits_with_ai
+from .assets import AssetManifest, build_assets, etag_matches, serve
+from . import agents
+from .agents import close_llm_client, open_llm_client, parse_habits_batch_with_ai, parse_habits_with_ai
+from .cache import habits_fingerprint, normalize_transcript
+from .events import Broker
+from .heatmap import compute_year_heatmap
+from .serialization import encode_bars, encode_daily_progress, encode_habits, encode_progress, json_response
+from .jobs import Job, JobQueue, QueueFull, SingleFlight
+from .metrics import CallbackMetric, MetricsMiddleware, SamplingProfiler, instrument_repository, registry
 
 
 def get_repository() -> HabitRepository:
-    """Factory that returns the appropriate repository implementation."""
+    """Factory that returns the appropriate repository implementation.
+
+    `MONGO_URI` selects MongoDB, otherwise `SQLITE_PATH` selects the
+    embedded SQLite backend; with neither set, data is kept in memory.
+    For MongoDB, `HABIT_CACHE_TTL` bounds how long habit definitions are
+    served from memory and `HABIT_CACHE_WATCH=1` also invalidates them
+    through a change stream (replica sets only). `MONGO_DAILY_SUMMARY=1`
+    serves the dashboard from the per-date summary documents; enable it
+    after `python -m app.cli rebuild-summaries` has backfilled them.
+    """
     mongo_uri = os.getenv("MONGO_URI")
-    print("mongo uri"+mongo_uri)
     if mongo_uri:
-        return MongoRepository(mongo_uri)
+        return MongoRepository(
+            mongo_uri,
+            date_storage=os.getenv("MONGO_DATE_STORAGE", "native"),
+            habit_cache_ttl=float(os.getenv("HABIT_CACHE_TTL", "30")),
+            watch_habits=os.getenv("HABIT_CACHE_WATCH", "0") == "1",
+            summary_reads=os.getenv("MONGO_DAILY_SUMMARY", "0") == "1",
+        )
+    sqlite_path = os.getenv("SQLITE_PATH")
+    if sqlite_path:
+        return SQLiteRepository(sqlite_path)
     return InMemoryRepository()
 
 
 app = FastAPI(title="Habit Tracker API")
 
+# Live progress updates pushed to `/progress/stream` subscribers.
+progress_events = Broker.from_env()
+
 # Allow CORS for local development; production should restrict origins
 app.add_middleware(
     CORSMiddleware,
@@ -59,12 +95,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timing for `/metrics`. `PROFILE_SLOW_REQUESTS` (seconds) also
+# samples the event loop's stack and dumps it for requests slower than
+# that; see app.metrics.
+slow_request_seconds = float(os.getenv("PROFILE_SLOW_REQUESTS", "0"))
+slow_request_profiler = SamplingProfiler.from_env() if slow_request_seconds > 0 else None
+app.add_middleware(MetricsMiddleware, slow_seconds=slow_request_seconds, profiler=slow_request_profiler)
+
 
 @app.on_event("startup")
 async def startup_event() -> None:
     """Initialize repository on startup."""
     # We attach the repository to the application state for dependency injection
-    app.state.repo = get_repository()
+    app.state.repo = instrument_repository(get_repository())
+    await app.state.repo.ensure_indexes()
+    if slow_request_profiler is not None:
+        slow_request_profiler.start()
+    await open_llm_client()
+    # Hash and compress the frontend now rather than on the first page load.
+    await asyncio.to_thread(get_assets)
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    """End live streams, stop profiling and release the repository's and the LLM client's connections."""
+    progress_events.close()
+    if slow_request_profiler is not None:
+        slow_request_profiler.stop()
+    await app.state.repo.close()
+    await close_llm_client()
 
 
 def get_repo() -> HabitRepository:
@@ -72,32 +131,46 @@ def get_repo() -> HabitRepository:
     return app.state.repo
 
 
-@app.get("/", response_class=FileResponse)
-async def serve_frontend() -> FileResponse:
+def get_assets() -> AssetManifest:
+    """The frontend asset manifest, built on first use."""
+    manifest = getattr(app.state, "assets", None)
+    if manifest is None:
+        manifest = app.state.assets = build_assets()
+    return manifest
+
+
+def _asset_response(url: str, request: Request) -> Response:
+    found = get_assets().lookup(url)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return serve(*found, request)
+
+
+@app.api_route("/", methods=["GET", "HEAD"], response_class=FileResponse)
+async def serve_frontend(request: Request) -> Response:
     """Serve the main HTML file for the frontend."""
-    frontend_path = os.path.join(os.path.dirname(__file__), "../frontend/index.html")
-    return FileResponse(frontend_path)
+    return _asset_response("/", request)
 
 
 # Serve the PWA manifest file
-@app.get("/manifest.json", response_class=FileResponse)
-async def serve_manifest() -> FileResponse:
+@app.api_route("/manifest.json", methods=["GET", "HEAD"], response_class=FileResponse)
+async def serve_manifest(request: Request) -> Response:
     """Return the web app manifest file."""
-    manifest_path = os.path.join(os.path.dirname(__file__), "../frontend/manifest.json")
-    return FileResponse(manifest_path)
+    return _asset_response("/manifest.json", request)
 
 
 # Serve the service worker script
-@app.get("/service-worker.js", response_class=FileResponse)
-async def serve_service_worker() -> FileResponse:
-    """Return the service worker for offline caching."""
-    sw_path = os.path.join(os.path.dirname(__file__), "../frontend/service-worker.js")
-    return FileResponse(sw_path, media_type="application/javascript")
+@app.api_route("/service-worker.js", methods=["GET", "HEAD"], response_class=FileResponse)
+async def serve_service_worker(request: Request) -> Response:
+    """Return the service worker for offline caching, with its precache list generated."""
+    return _asset_response("/service-worker.js", request)
 
 
-# Mount static assets (CSS/JS) relative to this file
-static_dir = os.path.join(os.path.dirname(__file__), "../frontend")
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+# Static assets (CSS/JS, the Vosk model), by plain or content-hashed name
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], response_class=FileResponse)
+async def serve_static(path: str, request: Request) -> Response:
+    """Return a static asset, precompressed and with caching headers."""
+    return _asset_response("/static/" + path, request)
 
 
 @app.post("/habits", response_model=HabitRead)
@@ -106,10 +179,42 @@ async def create_habit(habit: HabitCreate, repo: HabitRepository = Depends(get_r
     return await repo.create_habit(habit)
 
 
-@app.get("/habits", response_model=List[HabitRead])
-async def list_habits(repo: HabitRepository = Depends(get_repo)) -> List[HabitRead]:
-    """Return all habits."""
-    return await repo.list_habits()
+def _validators(version: Optional[str]) -> Dict[str, str]:
+    """ETag and Cache-Control headers for a read at repository `version`."""
+    if version is None:
+        return {}
+    # Clients may keep the response but must revalidate it before reuse.
+    return {"ETag": f'"{version}"', "Cache-Control": "no-cache"}
+
+
+def _not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """Whether the client's copy (If-None-Match) matches the ETag in `headers`."""
+    etag = headers.get("ETag")
+    if etag is None:
+        return False
+    return etag_matches(request.headers.get("if-none-match", ""), etag)
+
+
+@app.get("/habits", response_model=List[HabitRead], responses={304: {"description": "Habits unchanged"}})
+async def list_habits(request: Request, repo: HabitRepository = Depends(get_repo)) -> Response:
+    """Return all habits. Answers 304 when the client's ETag is still current."""
+    headers = _validators(await repo.read_version())
+    if _not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    return json_response(encode_habits(await repo.list_habits()), headers)
+
+
+@app.get("/habits/{habit_id}/stats", response_model=HabitStats)
+async def get_habit_stats(
+    habit_id: str,
+    as_of: Optional[date] = None,
+    repo: HabitRepository = Depends(get_repo),
+) -> HabitStats:
+    """Return current and longest streaks and 7/30-day completion rates for a habit."""
+    stats = await repo.get_habit_stats(habit_id, as_of or date.today())
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Habit with id {habit_id} not found")
+    return stats
 
 
 @app.post("/progress", response_model=ProgressRead)
@@ -118,38 +223,146 @@ async def record_progress(
 ) -> ProgressRead:
     """Record minutes practised for a habit on a given date."""
     try:
-        return await repo.record_progress(progress)
+        result = await repo.record_progress(progress)
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc))
+    await _publish_progress(repo, [result])
+    return result
 
 
-@app.get("/progress/{progress_date}", response_model=List[ProgressRead])
-async def get_progress_for_date(
-    progress_date: date, repo: HabitRepository = Depends(get_repo)
-) -> List[ProgressRead]:
-    """Get progress entries for a specific date."""
-    return await repo.get_progress_for_date(progress_date)
-
+# Upper bound on the number of entries accepted by one bulk request.
+MAX_BULK_ITEMS = 1000
 
-@app.get("/progress/bars/{progress_date}", response_model=List[ProgressBar])
-async def get_progress_bars(
-    progress_date: date, repo: HabitRepository = Depends(get_repo)
-) -> List[ProgressBar]:
-    """Compute progress ratios for all habits on a specific date."""
-    return await repo.compute_progress_bars(progress_date)
 
+@app.post("/progress/bulk", response_model=List[ProgressBulkResult])
+async def record_progress_bulk(
+    items: List[ProgressCreate], repo: HabitRepository = Depends(get_repo)
+) -> List[ProgressBulkResult]:
+    """Record many progress entries at once, e.g. when importing history.
 
-@app.post("/speech", response_model=List[ProgressRead])
-async def handle_speech_input(
-    speech: SpeechInput, repo: HabitRepository = Depends(get_repo)
-) -> List[ProgressRead]:
+    Items are applied as if posted one by one in order; each one gets its
+    own result, so an unknown habit does not fail the whole request.
     """
-    Accept transcribed speech describing daily habits and automatically
-    update progress entries for the current day. For each habit that
-    appears in the text, we attempt to extract the minutes practised
-    and record the progress. If no explicit minutes are found near
-    the habit name, we assume the user completed the full target.
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    results = await repo.record_progress_bulk(items)
+    await _publish_progress(repo, [result.progress for result in results if result.progress is not None])
+    return results
+
+
+# Upper bound on the span of a single range query (one leap year).
+MAX_RANGE_DAYS = 366
+
+
+@app.get("/progress", response_model=List[DailyProgress])
+async def get_progress_between(
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+    repo: HabitRepository = Depends(get_repo),
+) -> Response:
+    """Get progress entries for every day from `from` to `to` inclusive, grouped by day."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range may span at most {MAX_RANGE_DAYS} days")
+    by_day: Dict[date, List[ProgressRead]] = {}
+    for entry in await repo.get_progress_between(start, end):
+        by_day.setdefault(entry.date, []).append(entry)
+    days = (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+    return json_response(encode_daily_progress(days, by_day))
+
+
+async def _publish_progress(repo: HabitRepository, entries: List[ProgressRead]) -> None:
+    """Push the progress bars changed by `entries` to live subscribers."""
+    if not entries or not progress_events.subscribers:
+        return
+    targets = {habit.id: habit.target_minutes for habit in await repo.list_habits()}
+    by_day: Dict[date, List[ProgressBar]] = {}
+    for entry in entries:
+        target = targets.get(entry.habit_id)
+        if target:
+            ratio = min(entry.minutes / target, 1.0)
+            by_day.setdefault(entry.date, []).append(ProgressBar(habit_id=entry.habit_id, progress_ratio=ratio))
+    for day, bars in by_day.items():
+        progress_events.publish("progress", ProgressDelta(date=day, bars=bars).model_dump_json())
+
+
+# Declared before `/progress/{progress_date}`, which would otherwise match it.
+@app.get("/progress/stream", response_class=StreamingResponse, responses={200: {"model": ProgressDelta}})
+async def stream_progress() -> StreamingResponse:
     """
+    Push progress changes as Server-Sent Events. Each `progress` event
+    carries a `ProgressDelta` with the new bars of the habits a write
+    touched. A client that falls too far behind receives a `reset` event
+    and the stream ends; it should refetch its state and reconnect.
+    """
+    subscription = progress_events.subscribe()
+
+    async def body():
+        try:
+            async for message in subscription.messages(progress_events.keepalive):
+                yield message
+        finally:
+            progress_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get(
+    "/progress/{progress_date}",
+    response_model=List[ProgressRead],
+    responses={304: {"description": "Progress for the date unchanged"}},
+)
+async def get_progress_for_date(
+    progress_date: date, request: Request, repo: HabitRepository = Depends(get_repo)
+) -> Response:
+    """Get progress entries for a specific date. Answers 304 when the client's ETag is still current."""
+    headers = _validators(await repo.read_version(progress_date))
+    if _not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    return json_response(encode_progress(await repo.get_progress_for_date(progress_date)), headers)
+
+
+@app.get(
+    "/progress/bars/{progress_date}",
+    response_model=List[ProgressBar],
+    responses={304: {"description": "Progress bars for the date unchanged"}},
+)
+async def get_progress_bars(
+    progress_date: date, request: Request, repo: HabitRepository = Depends(get_repo)
+) -> Response:
+    """Compute progress ratios for all habits on a specific date.
+
+    Answers 304 when the client's ETag is still current.
+    """
+    headers = _validators(await repo.read_version(progress_date))
+    if _not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    return json_response(encode_bars(await repo.compute_progress_bars(progress_date)), headers)
+
+
+@app.get("/progress/heatmap/{year}", response_model=ProgressHeatmap)
+async def get_progress_heatmap(
+    year: int = Path(..., ge=1, le=9999), repo: HabitRepository = Depends(get_repo)
+) -> ProgressHeatmap:
+    """Compute progress ratios for all habits on every day of a year."""
+    try:
+        return await compute_year_heatmap(repo, year)
+    except ImportError as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+
+
+# Bounded processing of speech requests, and sharing of identical parses.
+speech_jobs = JobQueue.from_env()
+speech_parses = SingleFlight()
+
+
+async def _process_speech(text: str, repo: HabitRepository) -> List[ProgressRead]:
+    """Parse a transcript and add the minutes it mentions to today's progress."""
     # Determine today's date in the user's timezone. The specification
     # mentions Asia/Kolkata, but for generality we use date.today() here.
     today = date.today()
@@ -159,22 +372,176 @@ async def handle_speech_input(
     existing_progress_list = await repo.get_progress_for_date(today)
     existing_progress = {entry.habit_id: entry.minutes for entry in existing_progress_list}
     
-    # Use the AI parser with existing progress for intelligent accumulation
-    minutes_map = await parse_habits_with_ai(speech.text, habits, existing_progress)
+    # Use the AI parser with existing progress for intelligent accumulation.
+    # Identical transcripts parsed at the same time share one model call;
+    # each request still applies its own increments below.
+    key = (habits_fingerprint(habits), normalize_transcript(text), tuple(sorted(existing_progress.items())))
+    minutes_map = await speech_parses.do(key, lambda: parse_habits_with_ai(text, habits, existing_progress))
+    return await _add_minutes(repo, today, minutes_map)
+
+
+async def _add_minutes(repo: HabitRepository, today: date, minutes_map: Dict[str, int]) -> List[ProgressRead]:
+    """Add parsed minutes to today's progress and return the updated entries."""
     results: List[ProgressRead] = []
-    
     for habit_id, new_minutes in minutes_map.items():
         if new_minutes > 0:  # Only process if AI detected activity
-            # AI returns NEW minutes to add, we need to accumulate with existing
-            current_minutes = existing_progress.get(habit_id, 0)
-            total_minutes = current_minutes + new_minutes
-            
-            
-            # Create progress entry with total accumulated minutes
-            progress = ProgressCreate(habit_id=habit_id, date=today, minutes=total_minutes)
+            # AI returns NEW minutes to add; the repository adds them to the
+            # stored total atomically, so concurrent submissions both count.
             try:
-                result = await repo.record_progress(progress)
+                result = await repo.increment_progress(habit_id, today, new_minutes)
                 results.append(result)
             except ValueError:
                 continue
-    return results
\ No newline at end of file
+    await _publish_progress(repo, results)
+    return results
+
+
+async def _process_speech_batch(texts: List[str], repo: HabitRepository) -> List[List[ProgressRead]]:
+    """Parse transcripts together and apply their minutes in recording order."""
+    today = date.today()
+    habits = await repo.list_habits()
+    existing_progress = {entry.habit_id: entry.minutes for entry in await repo.get_progress_for_date(today)}
+    minutes_maps = await parse_habits_batch_with_ai(texts, habits, existing_progress)
+    return [await _add_minutes(repo, today, minutes_map) for minutes_map in minutes_maps]
+
+
+def _speech_job(job: Job) -> SpeechJob:
+    return SpeechJob(
+        id=job.id,
+        status=job.status,
+        result=job.result if job.status == "done" else None,
+        error=str(job.error) if job.error is not None else None,
+    )
+
+
+@app.post(
+    "/speech",
+    response_model=List[ProgressRead],
+    responses={202: {"model": SpeechJob}, 429: {"description": "Too many pending speech requests"}},
+)
+async def handle_speech_input(
+    speech: SpeechInput,
+    run_async: bool = Query(False, alias="async"),
+    repo: HabitRepository = Depends(get_repo),
+):
+    """
+    Accept transcribed speech describing daily habits and automatically
+    update progress entries for the current day. For each habit that
+    appears in the text, we attempt to extract the minutes practised
+    and record the progress. If no explicit minutes are found near
+    the habit name, we assume the user completed the full target.
+
+    Requests go through a bounded queue; when it is full the response is
+    429 with a `Retry-After` header. With `?async=1` the request returns
+    202 and a job ID straight away, to be polled at `/speech/jobs/{id}`.
+    """
+    try:
+        job = speech_jobs.submit(lambda: _process_speech(speech.text, repo))
+    except QueueFull as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+    if run_async:
+        return JSONResponse(status_code=202, content=_speech_job(job).model_dump(mode="json"))
+    return await job.wait()
+
+
+# Upper bound on the number of transcripts parsed by one batch request.
+MAX_BATCH_TRANSCRIPTS = 50
+
+
+@app.post(
+    "/speech/batch",
+    response_model=List[List[ProgressRead]],
+    responses={429: {"description": "Too many pending speech requests"}},
+)
+async def handle_speech_batch(
+    batch: SpeechBatchInput, repo: HabitRepository = Depends(get_repo)
+) -> List[List[ProgressRead]]:
+    """
+    Parse several queued voice notes with a single model call, e.g. when an
+    offline client comes back online. Notes are applied in order, each one
+    as if it had been posted to `/speech` on its own; the response holds
+    the entries updated by each note.
+    """
+    if len(batch.texts) > MAX_BATCH_TRANSCRIPTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_TRANSCRIPTS} transcripts per request")
+    try:
+        job = speech_jobs.submit(lambda: _process_speech_batch(batch.texts, repo))
+    except QueueFull as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+    return await job.wait()
+
+
+@app.get("/speech/jobs/{job_id}", response_model=SpeechJob)
+async def get_speech_job(job_id: str) -> SpeechJob:
+    """Return the state of an asynchronous speech request and, once done, its result."""
+    job = speech_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Speech job {job_id} not found")
+    return _speech_job(job)
+
+
+def _cache_counts() -> Dict[tuple, float]:
+    counts = {
+        ("parse", "hit"): agents.parse_cache.hits,
+        ("parse", "miss"): agents.parse_cache.misses,
+    }
+    habit_cache = getattr(getattr(app.state, "repo", None), "habit_cache", None)
+    if habit_cache is not None:
+        counts[("habits", "hit")] = habit_cache.hits
+        counts[("habits", "miss")] = habit_cache.misses
+    return counts
+
+
+def _cache_hit_ratios() -> Dict[tuple, float]:
+    ratios = {("parse",): agents.parse_cache.hit_ratio}
+    habit_cache = getattr(getattr(app.state, "repo", None), "habit_cache", None)
+    if habit_cache is not None:
+        ratios[("habits",)] = habit_cache.hit_ratio
+    return ratios
+
+
+# Values kept by other components, read when `/metrics` is scraped.
+for _metric in (
+    CallbackMetric(
+        "speech_parse_tier_total",
+        "Speech summaries answered by each parse tier; fallback, breaker and hedged are LLM fallbacks.",
+        lambda: {(tier,): count for tier, count in agents.tier_counts.items()},
+        ("tier",),
+        kind="counter",
+    ),
+    CallbackMetric("cache_requests_total", "Cache lookups by outcome.", _cache_counts, ("cache", "result"), kind="counter"),
+    CallbackMetric("cache_hit_ratio", "Share of cache lookups that hit.", _cache_hit_ratios, ("cache",)),
+    CallbackMetric(
+        "llm_breaker_open",
+        "1 while the LLM circuit breaker refuses calls, 0.5 while half-open.",
+        lambda: {(): {"closed": 0, "half_open": 0.5, "open": 1}[agents.breaker.state]},
+    ),
+    CallbackMetric("llm_breaker_trips_total", "Times the LLM breaker opened.", lambda: {(): agents.breaker.trips}, kind="counter"),
+    CallbackMetric(
+        "llm_breaker_rejected_total", "LLM calls refused by the breaker.", lambda: {(): agents.breaker.rejected}, kind="counter"
+    ),
+    CallbackMetric("speech_jobs_pending", "Speech jobs queued or running.", lambda: {(): speech_jobs.pending}),
+    CallbackMetric(
+        "speech_jobs_rejected_total", "Speech jobs refused with 429.", lambda: {(): speech_jobs.rejected}, kind="counter"
+    ),
+    CallbackMetric(
+        "speech_parses_coalesced_total",
+        "Speech parses that shared an identical in-flight parse.",
+        lambda: {(): speech_parses.coalesced},
+        kind="counter",
+    ),
+    CallbackMetric("progress_stream_subscribers", "Open /progress/stream connections.", lambda: {(): progress_events.subscribers}),
+    CallbackMetric(
+        "progress_stream_dropped_total",
+        "Stream subscribers reset for falling behind.",
+        lambda: {(): progress_events.dropped},
+        kind="counter",
+    ),
+):
+    registry.register(_metric)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Process metrics in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
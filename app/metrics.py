@@ -0,0 +1,361 @@
+"""
+Process metrics in the Prometheus text format, and a slow-request profiler.
+
+Metrics are plain counters and histograms keyed by label values. They
+take no locks: they are only updated from the event loop thread (the
+SQLite worker threads are timed from the coroutine awaiting them), and
+a single dictionary update is atomic under the GIL anyway. Values that
+already live elsewhere, such as cache hit counts, parse-tier counts and
+breaker state, are not copied on the hot path; `CallbackMetric` reads
+them when `/metrics` is scraped.
+
+What is recorded:
+
+    http_request_duration_seconds          per method, route and status, until the response starts
+    habit_repository_call_duration_seconds per repository method (see `instrument_repository`)
+    habit_repository_calls_per_request     repository calls made while serving one request, per route
+    llm_request_duration_seconds           per outcome, for every chat completion
+    llm_tokens_total                       prompt and completion tokens reported by the API
+
+Sampling profiler (opt-in): with `PROFILE_SLOW_REQUESTS` set to a number
+of seconds, a background thread samples the event loop thread's stack
+every `PROFILE_INTERVAL` seconds (default 0.005) into a ring buffer.
+When a request takes at least the threshold, the samples taken while it
+ran are written to `PROFILE_DIR` (default: the temp directory) as a
+`.folded` file, one `frame;frame;frame count` line per distinct stack,
+which `flamegraph.pl` and speedscope read directly. The loop serves
+other requests concurrently, so a dump shows everything the loop did
+during the slow request, not only that request's work.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cache hit to an LLM timeout.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram per combination of label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (non-cumulative, last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                extra = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, extra)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class CallbackMetric:
+    """Counter or gauge whose values are read from `collect()` at scrape time.
+
+    `collect` returns `{label values: value}`; use `()` as the key for an
+    unlabelled metric.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Dict[Tuple[str, ...], float]],
+        labelnames: Tuple[str, ...] = (),
+        kind: str = "gauge",
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self._collect = collect
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._collect().items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric: Any) -> Any:
+        """Add `metric`, replacing any earlier one of the same name."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # A failing callback must not break the whole scrape.
+                logger.exception("Collecting metric %s failed", metric.name)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time until the response starts, per route.",
+        ("method", "route", "status"),
+    )
+)
+REPOSITORY_LATENCY = registry.register(
+    Histogram(
+        "habit_repository_call_duration_seconds",
+        "Duration of repository method calls.",
+        ("backend", "method"),
+    )
+)
+REPOSITORY_CALLS_PER_REQUEST = registry.register(
+    Histogram(
+        "habit_repository_calls_per_request",
+        "Repository method calls made while serving one request; growth with data size suggests N+1 queries.",
+        ("route",),
+        buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+    )
+)
+LLM_LATENCY = registry.register(
+    Histogram("llm_request_duration_seconds", "Duration of chat completion calls.", ("outcome",))
+)
+LLM_TOKENS = registry.register(Counter("llm_tokens_total", "Tokens reported by the LLM API.", ("kind",)))
+
+# Repository calls made by the current request, if one is being measured.
+_request_calls: "contextvars.ContextVar[Optional[List[int]]]" = contextvars.ContextVar(
+    "request_calls", default=None
+)
+
+
+def instrument_repository(repo: Any) -> Any:
+    """Time every public coroutine method of `repo`, in place, and return it.
+
+    Methods are wrapped on the instance, so calls the repository makes to
+    its own methods are counted too.
+    """
+    backend = type(repo).__name__
+    for name in dir(type(repo)):
+        if not name.startswith("_") and inspect.iscoroutinefunction(getattr(type(repo), name)):
+            setattr(repo, name, _timed(getattr(repo, name), backend, name))
+    return repo
+
+
+def _timed(method: Callable, backend: str, name: str) -> Callable:
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        calls = _request_calls.get()
+        if calls is not None:
+            calls[0] += 1
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            REPOSITORY_LATENCY.observe(time.perf_counter() - start, backend, name)
+
+    return wrapper
+
+
+class SamplingProfiler:
+    """Samples one thread's stack into a ring buffer and dumps windows of it."""
+
+    def __init__(self, interval: float = 0.005, keep_seconds: float = 120.0, directory: Optional[str] = None) -> None:
+        self.interval = interval
+        self.directory = directory or tempfile.gettempdir()
+        self._samples: Deque[Tuple[float, str]] = deque(maxlen=max(1, int(keep_seconds / interval)))
+        self._target: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "SamplingProfiler":
+        return cls(
+            interval=float(os.getenv("PROFILE_INTERVAL", "0.005")),
+            directory=os.getenv("PROFILE_DIR"),
+        )
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        """Start sampling `thread_id` (default: the calling thread)."""
+        if self._thread is not None:
+            return
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self._samples.append((time.perf_counter(), _folded_stack(frame)))
+
+    def dump(self, start: float, end: float, label: str) -> Optional[str]:
+        """Write the samples taken between `start` and `end` (perf_counter) as folded stacks."""
+        stacks = _Tally(stack for taken, stack in list(self._samples) if start <= taken <= end)
+        if not stacks:
+            return None
+        name = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_") or "request"
+        path = os.path.join(self.directory, f"slow-{time.strftime('%Y%m%d-%H%M%S')}-{int(end * 1000) % 1000:03d}-{name}.folded")
+        with open(path, "w") as handle:
+            for stack, count in stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        return path
+
+
+def _folded_stack(frame: Any) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request and its repository calls.
+
+    Requests slower than `slow_seconds` are logged and, when a profiler is
+    running, their samples are dumped.
+    """
+
+    def __init__(self, app: Any, slow_seconds: float = 0.0, profiler: Optional[SamplingProfiler] = None) -> None:
+        self.app = app
+        self.slow_seconds = slow_seconds
+        self.profiler = profiler
+        self._routes: Optional[Dict[Any, str]] = None
+
+    def _route(self, scope: Dict[str, Any]) -> str:
+        if self._routes is None:
+            router = scope.get("router")
+            routes = getattr(router, "routes", ())
+            self._routes = {getattr(route, "endpoint", None): route.path for route in routes if hasattr(route, "path")}
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        calls = [0]
+        token = _request_calls.set(calls)
+        recorded = False
+
+        def record(status: int) -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            elapsed = time.perf_counter() - start
+            route = self._route(scope)
+            REQUEST_LATENCY.observe(elapsed, scope["method"], route, str(status))
+            REPOSITORY_CALLS_PER_REQUEST.observe(calls[0], route)
+            if self.slow_seconds and elapsed >= self.slow_seconds:
+                path = self.profiler.dump(start, start + elapsed, f"{scope['method']} {route}") if self.profiler else None
+                logger.warning(
+                    "Slow request %s %s took %.3fs%s",
+                    scope["method"], scope["path"], elapsed, f", profile written to {path}" if path else "",
+                )
+
+        async def send_timed(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        except Exception:
+            record(500)
+            raise
+        finally:
+            _request_calls.reset(token)
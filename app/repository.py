@@ -3,27 +3,59 @@ Repositories abstract the persistence layer from the application logic.
 
 This module defines base repository interfaces for managing habits and
 progress entries as well as concrete implementations for in-memory
-storage (used for testing) and MongoDB (used in production). Having a
+storage (used for testing), MongoDB (used in production) and SQLite
+(for single-node deployments without a database server). Having a
 repository layer allows us to swap out the storage backend without
 changing the API logic.
 """
 
 from __future__ import annotations
 
-from datetime import date
-from typing import List, Dict, Optional
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, Iterator, List, Dict, Optional, Tuple, Union
+import asyncio
+import logging
 import os
+import sqlite3
+import threading
+import uuid
 
 try:
     # Motor is an optional dependency. When running tests without a MongoDB
     # backend, this import may fail. We import lazily in MongoRepository
     from motor.motor_asyncio import AsyncIOMotorClient  # type: ignore
     from bson import ObjectId  # type: ignore
+    from pymongo import ASCENDING, DeleteOne, ReturnDocument, UpdateOne  # type: ignore
+    from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError  # type: ignore
 except ModuleNotFoundError:
     AsyncIOMotorClient = None  # type: ignore
     ObjectId = None  # type: ignore
+    ASCENDING = 1
+    DeleteOne = None  # type: ignore
+    UpdateOne = None  # type: ignore
+    ReturnDocument = None  # type: ignore
+    BulkWriteError = None  # type: ignore
+    DuplicateKeyError = None  # type: ignore
+    PyMongoError = None  # type: ignore
 
-from .schemas import HabitCreate, HabitRead, ProgressCreate, ProgressRead, ProgressBar
+DUPLICATE_KEY_ERROR = 11000
+
+from .schemas import (
+    HabitCreate,
+    HabitRead,
+    HabitStats,
+    ProgressBar,
+    ProgressBulkResult,
+    ProgressCreate,
+    ProgressRead,
+)
+from .cache import HabitCache
+from .stats import WINDOW_DAYS, CompletionRuns, run_changes, window_stats
+
+logger = logging.getLogger(__name__)
 
 
 class HabitRepository:
@@ -41,24 +73,122 @@ class HabitRepository:
     async def record_progress(self, progress: ProgressCreate) -> ProgressRead:
         raise NotImplementedError
 
+    async def increment_progress(self, habit_id: str, date: date, delta: int) -> ProgressRead:
+        """Atomically add `delta` minutes to a habit's progress on `date`.
+
+        Creates the entry if needed and returns it with the new total, so
+        concurrent callers never overwrite each other's minutes.
+        """
+        raise NotImplementedError
+
+    async def record_progress_bulk(self, items: List[ProgressCreate]) -> List[ProgressBulkResult]:
+        """Record many entries, reporting success or failure per item.
+
+        Items are applied as if posted one by one in order, so a later item
+        for the same habit and day wins. Backends with a batch write path
+        override this default, which simply loops over `record_progress`.
+        """
+        results: List[ProgressBulkResult] = []
+        for index, item in enumerate(items):
+            try:
+                results.append(ProgressBulkResult(index=index, progress=await self.record_progress(item)))
+            except ValueError as exc:
+                results.append(ProgressBulkResult(index=index, error=str(exc)))
+        return results
+
     async def get_progress_for_date(self, date: date) -> List[ProgressRead]:
         raise NotImplementedError
 
+    async def get_progress_between(self, start: date, end: date) -> List[ProgressRead]:
+        """Return progress entries dated `start` to `end` inclusive, ordered by date."""
+        raise NotImplementedError
+
     async def compute_progress_bars(self, date: date) -> List[ProgressBar]:
         raise NotImplementedError
 
+    async def get_habit_stats(self, habit_id: str, today: date) -> Optional[HabitStats]:
+        """Return streak and completion statistics as of `today`, or None for an unknown habit."""
+        raise NotImplementedError
+
+    async def read_version(self, date: Optional[date] = None) -> Optional[str]:
+        """Return a token that changes with the habit list and, given `date`, that day's progress.
+
+        Reads that depend only on those can be validated against the token
+        (e.g. as an HTTP ETag) without running them. Tokens are read before
+        the data and bumped after every write, so a token never vouches for
+        data older than the write it was taken after. None means the
+        backend does not track versions.
+        """
+        return None
+
+    async def ensure_indexes(self) -> None:
+        """Create any indexes the backend relies on. Must be idempotent."""
+        return None
+
+    async def close(self) -> None:
+        """Release connections and worker threads held by the backend."""
+        return None
+
+
+class _ProgressColumn:
+    """Array-backed progress history of one habit.
+
+    Day ordinals and minutes are stored in two parallel, day-sorted
+    `array`s (12 bytes per entry) instead of one `ProgressRead` per entry.
+    The mapping-style methods take `date` keys and return minutes.
+    """
+
+    __slots__ = ("_days", "_minutes")
+
+    def __init__(self) -> None:
+        self._days = array("i")
+        self._minutes = array("q")
+
+    def _find(self, ordinal: int) -> int:
+        index = bisect_left(self._days, ordinal)
+        if index < len(self._days) and self._days[index] == ordinal:
+            return index
+        return -1
+
+    def get(self, day: date, default: Optional[int] = None) -> Optional[int]:
+        index = self._find(day.toordinal())
+        return self._minutes[index] if index != -1 else default
+
+    def __setitem__(self, day: date, minutes: int) -> None:
+        ordinal = day.toordinal()
+        # History is mostly written in date order, which makes this an append.
+        if not self._days or ordinal > self._days[-1]:
+            self._days.append(ordinal)
+            self._minutes.append(minutes)
+            return
+        index = bisect_left(self._days, ordinal)
+        if index < len(self._days) and self._days[index] == ordinal:
+            self._minutes[index] = minutes
+        else:
+            self._days.insert(index, ordinal)
+            self._minutes.insert(index, minutes)
+
 
 class InMemoryRepository(HabitRepository):
     """Simple in-memory repository for tests and local development.
 
     Habits are stored in a dictionary keyed by their generated ID. Progress
-    entries are stored in a nested dictionary keyed by habit_id and date.
+    is stored compactly: one `_ProgressColumn` per habit holding only day
+    ordinals and minutes, plus a secondary index from day ordinal to the
+    habits with an entry on that day. `ProgressRead` objects are built
+    only when they are returned.
     """
 
     def __init__(self) -> None:
         self._habits: Dict[str, HabitRead] = {}
-        self._progress: Dict[str, Dict[date, ProgressRead]] = {}
+        self._progress: Dict[str, _ProgressColumn] = {}
+        self._habits_by_day: Dict[int, List[str]] = {}
+        self._completion_runs: Dict[str, CompletionRuns] = {}
         self._id_counter = 0
+        # Write counters: key 0 for the habit list, day ordinals for progress.
+        # The epoch tells this instance's tokens apart from a previous run's.
+        self._versions: Dict[int, int] = {}
+        self._epoch = uuid.uuid4().hex[:8]
 
     async def create_habit(self, habit: HabitCreate) -> HabitRead:
         self._id_counter += 1
@@ -70,6 +200,7 @@ class InMemoryRepository(HabitRepository):
             target_minutes=habit.target_minutes,
         )
         self._habits[habit_id] = habit_read
+        self._versions[0] = self._versions.get(0, 0) + 1
         return habit_read
 
     async def list_habits(self) -> List[HabitRead]:
@@ -78,36 +209,74 @@ class InMemoryRepository(HabitRepository):
     async def get_habit(self, habit_id: str) -> Optional[HabitRead]:
         return self._habits.get(habit_id)
 
-    async def record_progress(self, progress: ProgressCreate) -> ProgressRead:
-        habit = self._habits.get(progress.habit_id)
+    def _store(self, habit_id: str, date: date, minutes: int) -> ProgressRead:
+        # Synchronous on purpose: nothing can interleave with a write.
+        habit = self._habits.get(habit_id)
         if not habit:
-            raise ValueError(f"Habit with id {progress.habit_id} not found")
-        completed = progress.minutes >= habit.target_minutes
-        progress_entry = ProgressRead(
-            habit_id=progress.habit_id,
-            date=progress.date,
-            minutes=progress.minutes,
-            completed=completed,
+            raise ValueError(f"Habit with id {habit_id} not found")
+        completed = minutes >= habit.target_minutes
+        self._progress.setdefault(habit_id, _ProgressColumn())[date] = minutes
+        habit_ids = self._habits_by_day.setdefault(date.toordinal(), [])
+        if habit_id not in habit_ids:
+            habit_ids.append(habit_id)
+        self._completion_runs.setdefault(habit_id, CompletionRuns()).set(date.toordinal(), completed)
+        self._versions[date.toordinal()] = self._versions.get(date.toordinal(), 0) + 1
+        return ProgressRead(habit_id=habit_id, date=date, minutes=minutes, completed=completed)
+
+    async def record_progress(self, progress: ProgressCreate) -> ProgressRead:
+        return self._store(progress.habit_id, progress.date, progress.minutes)
+
+    async def increment_progress(self, habit_id: str, date: date, delta: int) -> ProgressRead:
+        column = self._progress.get(habit_id)
+        current = column.get(date, 0) if column is not None else 0
+        return self._store(habit_id, date, current + delta)
+
+    def _minutes_on(self, date: date) -> Iterator[Tuple[str, int]]:
+        """Yield `(habit_id, minutes)` for every entry on `date`."""
+        for habit_id in self._habits_by_day.get(date.toordinal(), ()):
+            # The index is append-only; the column is the source of truth.
+            minutes = self._progress[habit_id].get(date)
+            if minutes is not None:
+                yield habit_id, minutes
+
+    def _progress_read(self, habit_id: str, date: date, minutes: int) -> ProgressRead:
+        return ProgressRead(
+            habit_id=habit_id,
+            date=date,
+            minutes=minutes,
+            completed=minutes >= self._habits[habit_id].target_minutes,
         )
-        self._progress.setdefault(progress.habit_id, {})[progress.date] = progress_entry
-        return progress_entry
 
     async def get_progress_for_date(self, date: date) -> List[ProgressRead]:
+        return [self._progress_read(habit_id, date, minutes) for habit_id, minutes in self._minutes_on(date)]
+
+    async def get_progress_between(self, start: date, end: date) -> List[ProgressRead]:
         results: List[ProgressRead] = []
-        for habit_id, records in self._progress.items():
-            if date in records:
-                results.append(records[date])
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            if ordinal in self._habits_by_day:
+                results.extend(await self.get_progress_for_date(date.fromordinal(ordinal)))
         return results
 
     async def compute_progress_bars(self, date: date) -> List[ProgressBar]:
+        minutes_by_habit = dict(self._minutes_on(date))
         bars: List[ProgressBar] = []
         for habit_id, habit in self._habits.items():
-            progress_entry = self._progress.get(habit_id, {}).get(date)
-            minutes = progress_entry.minutes if progress_entry else 0
+            minutes = minutes_by_habit.get(habit_id, 0)
             ratio = min(minutes / habit.target_minutes, 1.0)
             bars.append(ProgressBar(habit_id=habit_id, progress_ratio=ratio))
         return bars
 
+    async def get_habit_stats(self, habit_id: str, today: date) -> Optional[HabitStats]:
+        if habit_id not in self._habits:
+            return None
+        return self._completion_runs.get(habit_id, CompletionRuns()).stats(habit_id, today)
+
+    async def read_version(self, date: Optional[date] = None) -> Optional[str]:
+        token = f"{self._epoch}.{self._versions.get(0, 0)}"
+        if date is not None:
+            token += f".{self._versions.get(date.toordinal(), 0)}"
+        return token
+
 
 class MongoRepository(HabitRepository):
     """MongoDB-backed repository for production use.
@@ -116,68 +285,290 @@ class MongoRepository(HabitRepository):
     repository expects a MongoDB database with two collections: `habits`
     and `progress`. Each habit document stores name, time block, and
     target minutes. Progress documents reference a habit via
-    `habit_id`, store the date as ISO string, and the minutes practised.
+    `habit_id`, store the date, and the minutes practised. The streak
+    statistics are kept in `completion_runs`, one document per run of
+    completed days (see `app.stats`), updated when a write flips a day's
+    completion. `habit_stats` holds per-habit bookkeeping: whether the
+    runs have been built from progress yet, and a short lease that writers
+    of the same habit take turns on.
+
+    Dates are written according to `date_storage`: `"native"` stores a BSON
+    date (midnight UTC), `"iso"` the legacy ISO-8601 string. Reads accept
+    both encodings, so a database can be converted with
+    `migrate_date_storage` while the application keeps serving requests.
+
+    Habit definitions are served from a `HabitCache`, refreshed after
+    `habit_cache_ttl` seconds, on `create_habit`, when a habit unknown to
+    the snapshot turns up, and (with `watch_habits`) on every change
+    reported by a change stream on `habits`. The `habits` version token is
+    cached with the snapshot, so validating a cached habit list costs no
+    round trip.
+
+    Every write also maintains `daily_summary`: one document per date
+    (`_id` is the ISO date) mapping each habit ID to its minutes, ratio and
+    completed flag. Each progress document carries a write counter `v`
+    that is copied into the summary, and a summary entry is only replaced
+    by one with an equal or higher counter, so concurrent writers cannot
+    leave an older value behind. The same update advances the date's
+    write counter (`epoch`, `n`) on the summary document, which versions
+    the date's ETags. With `summary_reads`, the per-date progress list and
+    the progress bars are served from the summary with a single key lookup;
+    enable it once `rebuild_daily_summary` has backfilled the dates written
+    before the projection existed.
     """
 
-    def __init__(self, mongo_uri: str, db_name: str = "habit_app") -> None:
+    DATE_STORAGE_MODES = ("native", "iso")
+
+    def __init__(
+        self,
+        mongo_uri: str,
+        db_name: str = "habit_app",
+        date_storage: str = "native",
+        habit_cache_ttl: float = 30.0,
+        watch_habits: bool = False,
+        summary_reads: bool = False,
+    ) -> None:
         # Delay import of motor until initialisation time to avoid optional dependency issues.
         if AsyncIOMotorClient is None or ObjectId is None:
             raise ImportError(
                 "Motor is required for MongoRepository but is not installed."
             )
+        if date_storage not in self.DATE_STORAGE_MODES:
+            raise ValueError(f"Unknown date storage mode {date_storage!r}")
+        self._date_storage = date_storage
         self._client = AsyncIOMotorClient(mongo_uri)
         self._db = self._client[db_name]
         self._habits = self._db["habits"]
         self._progress = self._db["progress"]
+        self._habit_stats = self._db["habit_stats"]
+        self._completion_runs = self._db["completion_runs"]
+        self._daily_summary = self._db["daily_summary"]
+        self._versions = self._db["versions"]
+        self._summary_reads = summary_reads
+        self.habit_cache = HabitCache(ttl=habit_cache_ttl)
+        self._watch_habits = watch_habits
+        self._habit_watch: Optional[asyncio.Task] = None
+
+    async def close(self) -> None:
+        if self._habit_watch is not None:
+            self._habit_watch.cancel()
+        self._client.close()
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes used by the repository queries.
+
+        `create_index` is a no-op when an identical index already exists, so
+        this is safe to run on every startup. The unique `(habit_id, date)`
+        index backs the upsert in `record_progress` and guarantees one
+        document per habit and day; the `date` index serves the per-day
+        reads. The `completion_runs` indexes find the runs around a day and
+        the longest run without reading the others.
+        """
+        await self._progress.create_index(
+            [("habit_id", ASCENDING), ("date", ASCENDING)],
+            name="habit_id_date_unique",
+            unique=True,
+        )
+        await self._progress.create_index([("date", ASCENDING)], name="date")
+        await self._completion_runs.create_index(
+            [("habit_id", ASCENDING), ("start", ASCENDING)], name="habit_id_start_unique", unique=True
+        )
+        await self._completion_runs.create_index([("habit_id", ASCENDING), ("length", ASCENDING)], name="habit_id_length")
+
+    def _encode_date(self, date: date, date_storage: Optional[str] = None) -> Union[datetime, str]:
+        """Return the stored representation of `date`."""
+        if (date_storage or self._date_storage) == "iso":
+            return date.isoformat()
+        return datetime(date.year, date.month, date.day)
+
+    @staticmethod
+    def _decode_date(value: Union[datetime, str]) -> date:
+        """Inverse of `_encode_date` for either storage mode."""
+        if isinstance(value, datetime):
+            return value.date()
+        return date.fromisoformat(value)
+
+    def _date_match(self, date: date) -> dict:
+        """Match `date` in either encoding; both are served by the `date` indexes."""
+        return {"$in": [self._encode_date(date, mode) for mode in self.DATE_STORAGE_MODES]}
+
+    def _progress_key(self, habit_id: str, date: date) -> dict:
+        """Filter addressing the single progress document of a habit and day."""
+        return {"habit_id": ObjectId(habit_id), "date": self._date_match(date)}
+
+    async def migrate_date_storage(self, batch_size: int = 500) -> AsyncIterator[int]:
+        """Rewrite progress dates into the configured encoding, in batches.
+
+        Documents are visited in `_id` order and each update is guarded on the
+        old value, so the migration can run online: writes made concurrently
+        by `record_progress` (which always use the configured encoding) are
+        left untouched. If a document already exists in the new encoding for
+        the same habit and day, it is the more recent write and the legacy
+        duplicate is removed. Yields the number of documents converted per
+        batch.
+        """
+        legacy_type = "date" if self._date_storage == "iso" else "string"
+        last_id = None
+        while True:
+            query: dict = {"date": {"$type": legacy_type}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await (
+                self._progress.find(query, {"date": 1}).sort("_id", ASCENDING).to_list(batch_size)
+            )
+            if not batch:
+                return
+            last_id = batch[-1]["_id"]
+            requests = [
+                UpdateOne(
+                    {"_id": doc["_id"], "date": doc["date"]},
+                    {"$set": {"date": self._encode_date(self._decode_date(doc["date"]))}},
+                )
+                for doc in batch
+            ]
+            try:
+                result = await self._progress.bulk_write(requests, ordered=False)
+                converted = result.modified_count
+            except BulkWriteError as exc:
+                duplicates = [
+                    batch[error["index"]]["_id"]
+                    for error in exc.details["writeErrors"]
+                    if error["code"] == DUPLICATE_KEY_ERROR
+                ]
+                if len(duplicates) != len(exc.details["writeErrors"]):
+                    raise
+                await self._progress.delete_many({"_id": {"$in": duplicates}})
+                converted = exc.details["nModified"] + len(duplicates)
+            yield converted
 
     async def create_habit(self, habit: HabitCreate) -> HabitRead:
-        print("habit method called")
+        logger.debug("Creating habit %r", habit.name)
         doc = habit.dict()
         result = await self._habits.insert_one(doc)
         habit_id = str(result.inserted_id)
-        return HabitRead(id=habit_id, **doc)
+        created = HabitRead(id=habit_id, **doc)
+        counter = await self._bump_version("habits")
+        previous = self._counter_token(dict(counter, n=counter["n"] - 1)) if counter["n"] > 1 else "0"
+        if self.habit_cache.token == previous:
+            # No other change since the snapshot: it stays complete.
+            self.habit_cache.add(created, self._counter_token(counter))
+        else:
+            self.habit_cache.invalidate()
+        return created
+
+    @staticmethod
+    def _habit_from_doc(doc: dict) -> HabitRead:
+        return HabitRead(
+            id=str(doc["_id"]),
+            name=doc["name"],
+            time_block=doc["time_block"],
+            target_minutes=doc["target_minutes"],
+        )
+
+    async def _load_habits(self) -> List[HabitRead]:
+        """Read every habit from the database and refresh the cache with them."""
+        if self._watch_habits and self._habit_watch is None:
+            self._habit_watch = asyncio.ensure_future(self._watch_habit_changes())
+        # The token is read first, so the snapshot is at least as new as it.
+        token = await self._read_habits_token()
+        version = self.habit_cache.version
+        habits = [self._habit_from_doc(doc) async for doc in self._habits.find({})]
+        self.habit_cache.fill(habits, version, token)
+        return habits
+
+    async def _watch_habit_changes(self) -> None:
+        """Invalidate the habit cache whenever another process changes `habits`.
+
+        Change streams need a replica set; without one the cache silently
+        relies on its TTL alone.
+        """
+        try:
+            async with self._habits.watch() as stream:
+                async for _ in stream:
+                    self.habit_cache.invalidate()
+        except PyMongoError as exc:
+            logger.warning("habit change stream unavailable, relying on cache TTL: %s", exc)
+        finally:
+            self.habit_cache.invalidate()
 
     async def list_habits(self) -> List[HabitRead]:
-        cursor = self._habits.find({})
-        habits: List[HabitRead] = []
-        async for doc in cursor:
-            doc_id = str(doc.get("_id"))
-            habits.append(
-                HabitRead(
-                    id=doc_id,
-                    name=doc["name"],
-                    time_block=doc["time_block"],
-                    target_minutes=doc["target_minutes"],
-                )
-            )
+        habits = self.habit_cache.snapshot()
+        if habits is None:
+            habits = await self._load_habits()
         return habits
 
     async def get_habit(self, habit_id: str) -> Optional[HabitRead]:
+        habit = self.habit_cache.get(habit_id)
+        if habit is not None:
+            return habit
+        if not ObjectId.is_valid(habit_id):
+            return None
+        if self.habit_cache.ttl > 0 and not self.habit_cache.fresh:
+            # Reload the whole list: one query that also serves the next reads.
+            return next((habit for habit in await self._load_habits() if habit.id == habit_id), None)
+        # Not in a fresh snapshot: possibly created by another worker since.
         doc = await self._habits.find_one({"_id": ObjectId(habit_id)})
         if not doc:
             return None
-        return HabitRead(
-            id=str(doc["_id"]),
-            name=doc["name"],
-            time_block=doc["time_block"],
-            target_minutes=doc["target_minutes"],
+        self.habit_cache.invalidate()
+        return self._habit_from_doc(doc)
+
+    def _progress_upsert(self, progress: ProgressCreate) -> Tuple[dict, dict]:
+        """Filter and update that upsert one progress entry."""
+        # Matching either date encoding means a legacy document is rewritten
+        # in place rather than duplicated.
+        return (
+            self._progress_key(progress.habit_id, progress.date),
+            {
+                "$set": {
+                    "habit_id": ObjectId(progress.habit_id),
+                    "date": self._encode_date(progress.date),
+                    "minutes": progress.minutes,
+                },
+                "$inc": {"v": 1},
+            },
         )
 
+    async def _upsert_progress(self, query: dict, update: dict, return_document) -> Optional[dict]:
+        """`find_one_and_update` with upsert on one progress document, returning minutes and `v`.
+
+        Two first writes for the same habit and day both try to insert, and
+        the server only retries the loser itself for equality filters; ours
+        matches either date encoding with `$in`. The loser retries once and
+        then updates the winner's document.
+        """
+        for attempt in range(2):
+            try:
+                return await self._progress.find_one_and_update(
+                    query,
+                    update,
+                    projection={"_id": 0, "minutes": 1, "v": 1},
+                    upsert=True,
+                    return_document=return_document,
+                )
+            except DuplicateKeyError:
+                if attempt:
+                    raise
+        return None
+
     async def record_progress(self, progress: ProgressCreate) -> ProgressRead:
+        # With the habit cached this is two round trips: the upsert, then
+        # the summary write, which also advances the date's version token.
+        # A write that flips the day's completion updates the runs alongside.
         habit = await self.get_habit(progress.habit_id)
         if not habit:
             raise ValueError(f"Habit with id {progress.habit_id} not found")
-        doc = {
-            "habit_id": ObjectId(progress.habit_id),
-            "date": progress.date.isoformat(),
-            "minutes": progress.minutes,
-        }
-        await self._progress.update_one(
-            {"habit_id": doc["habit_id"], "date": doc["date"]},
-            {"$set": doc},
-            upsert=True,
-        )
+        before = await self._upsert_progress(*self._progress_upsert(progress), ReturnDocument.BEFORE)
         completed = progress.minutes >= habit.target_minutes
+        was_completed = before is not None and before["minutes"] >= habit.target_minutes
+        # `$inc` is atomic, so our write is the one right after `before`.
+        version = (before or {}).get("v", 0) + 1
+        await asyncio.gather(
+            self._update_summary(habit, progress.date, progress.minutes, version),
+            self._track_completion(habit, [progress.date.toordinal()])
+            if completed != was_completed
+            else asyncio.sleep(0),
+        )
         return ProgressRead(
             habit_id=progress.habit_id,
             date=progress.date,
@@ -185,32 +576,986 @@ class MongoRepository(HabitRepository):
             completed=completed,
         )
 
+    async def increment_progress(self, habit_id: str, date: date, delta: int) -> ProgressRead:
+        habit = await self.get_habit(habit_id)
+        if not habit:
+            raise ValueError(f"Habit with id {habit_id} not found")
+        doc = await self._upsert_progress(
+            self._progress_key(habit_id, date),
+            {
+                "$inc": {"minutes": delta, "v": 1},
+                "$set": {"habit_id": ObjectId(habit_id), "date": self._encode_date(date)},
+            },
+            ReturnDocument.AFTER,
+        )
+        completed = doc["minutes"] >= habit.target_minutes
+        await asyncio.gather(
+            self._update_summary(habit, date, doc["minutes"], doc["v"]),
+            self._track_completion(habit, [date.toordinal()])
+            if completed != (doc["minutes"] - delta >= habit.target_minutes)
+            else asyncio.sleep(0),
+        )
+        return ProgressRead(habit_id=habit_id, date=date, minutes=doc["minutes"], completed=completed)
+
+    async def record_progress_bulk(self, items: List[ProgressCreate]) -> List[ProgressBulkResult]:
+        # Habits missing from the cache are validated with one `$in` query.
+        habits: Dict[str, HabitRead] = {habit.id: habit for habit in await self.list_habits()}
+        object_ids = {
+            ObjectId(item.habit_id)
+            for item in items
+            if item.habit_id not in habits and ObjectId.is_valid(item.habit_id)
+        }
+        if object_ids:
+            async for doc in self._habits.find({"_id": {"$in": list(object_ids)}}):
+                habit = self._habit_from_doc(doc)
+                habits[habit.id] = habit
+                self.habit_cache.invalidate()
+
+        # Only the last item per habit and day is written: the unordered
+        # bulk write gives no ordering guarantee between duplicates.
+        latest: Dict[Tuple[str, date], int] = {}
+        for index, item in enumerate(items):
+            if item.habit_id in habits:
+                latest[(item.habit_id, item.date)] = index
+        writes = sorted(latest.values())
+        failed: Dict[Tuple[str, date], str] = {}
+        pending = writes
+        # As in `_upsert_progress`, an upsert that lost the insert race to a
+        # concurrent first write is retried once and then updates its document.
+        for attempt in range(2):
+            if not pending:
+                break
+            requests = [UpdateOne(*self._progress_upsert(items[index]), upsert=True) for index in pending]
+            try:
+                await self._progress.bulk_write(requests, ordered=False)
+                break
+            except BulkWriteError as exc:
+                retry = []
+                for error in exc.details["writeErrors"]:
+                    index = pending[error["index"]]
+                    if error["code"] == DUPLICATE_KEY_ERROR and not attempt:
+                        retry.append(index)
+                        continue
+                    item = items[index]
+                    failed[(item.habit_id, item.date)] = error["errmsg"]
+                pending = retry
+
+        # The previous minutes are unknown here, so every written day is
+        # checked; a long import rebuilds the habit's runs once instead.
+        changes: Dict[str, List[int]] = {}
+        written: List[Tuple[str, date]] = []
+        for index in writes:
+            item = items[index]
+            if (item.habit_id, item.date) not in failed:
+                written.append((item.habit_id, item.date))
+                changes.setdefault(item.habit_id, []).append(item.date.toordinal())
+        await asyncio.gather(
+            self._refresh_summaries(habits, written),
+            *(self._track_completion(habits[habit_id], days) for habit_id, days in changes.items()),
+        )
+
+        results: List[ProgressBulkResult] = []
+        for index, item in enumerate(items):
+            habit = habits.get(item.habit_id)
+            if habit is None:
+                error = f"Habit with id {item.habit_id} not found"
+            else:
+                error = failed.get((item.habit_id, item.date))
+            if error:
+                results.append(ProgressBulkResult(index=index, error=error))
+                continue
+            progress = ProgressRead(
+                habit_id=item.habit_id,
+                date=item.date,
+                minutes=item.minutes,
+                completed=item.minutes >= habit.target_minutes,
+            )
+            results.append(ProgressBulkResult(index=index, progress=progress))
+        return results
+
+    async def _bump_version(self, key: str) -> dict:
+        """Advance the write counter of `key` in `versions` and return it."""
+        # A first write racing another upsert of the same key collides on `_id`.
+        for attempt in range(2):
+            try:
+                return await self._versions.find_one_and_update(
+                    {"_id": key},
+                    {"$inc": {"n": 1}, "$setOnInsert": {"epoch": ObjectId()}},
+                    projection={"_id": 0, "epoch": 1, "n": 1},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+            except DuplicateKeyError:
+                if attempt:
+                    raise
+
+    @staticmethod
+    def _counter_token(counter: Optional[dict]) -> str:
+        """Token of a write counter (`epoch`, `n`); "0" before its first write."""
+        # The epoch keeps a recreated counter from repeating old tokens.
+        return f"{counter['epoch']}{counter['n']}" if counter and "n" in counter else "0"
+
+    async def _read_habits_token(self) -> str:
+        return self._counter_token(await self._versions.find_one({"_id": "habits"}))
+
+    async def _habits_token(self) -> str:
+        """The token of the habit list `list_habits` answers from next.
+
+        With the cache enabled that is the snapshot's own token, loading
+        the snapshot if needed, so the habits in a response are never
+        older than the token validating it.
+        """
+        if self.habit_cache.ttl > 0:
+            if not self.habit_cache.fresh:
+                await self._load_habits()
+            token = self.habit_cache.token if self.habit_cache.fresh else None
+            if token is not None:
+                return token
+        return await self._read_habits_token()
+
+    async def read_version(self, date: Optional[date] = None) -> Optional[str]:
+        # A date's counter lives on its summary document, advanced by the
+        # same update that writes the summary entry.
+        habits, summary = await asyncio.gather(
+            self._habits_token(),
+            self._daily_summary.find_one({"_id": date.isoformat()}, {"epoch": 1, "n": 1})
+            if date is not None
+            else asyncio.sleep(0),
+        )
+        return habits if date is None else f"{habits}.{self._counter_token(summary)}"
+
+    @staticmethod
+    def _summary_update(habit: HabitRead, date: date, minutes: int, version: int) -> Tuple[dict, dict]:
+        """Filter and update setting one habit's entry in a day's summary.
+
+        The filter skips the update when the entry already holds a newer
+        write; the upsert then collides on `_id` and the caller ignores it.
+        The update also advances the day's write counter, which is what
+        `read_version` reports for the date; a skipped update needs no
+        advance, since the newer write made one.
+        """
+        field = f"habits.{habit.id}"
+        return (
+            {"_id": date.isoformat(), f"{field}.v": {"$not": {"$gt": version}}},
+            {
+                "$set": {
+                    field: {
+                        "minutes": minutes,
+                        "ratio": min(minutes / habit.target_minutes, 1.0),
+                        "completed": minutes >= habit.target_minutes,
+                        "v": version,
+                    }
+                },
+                "$inc": {"n": 1},
+                "$setOnInsert": {"epoch": ObjectId()},
+            },
+        )
+
+    async def _update_summary(self, habit: HabitRead, date: date, minutes: int, version: int) -> None:
+        # Two writers creating the same day's document race on `_id`; the
+        # second attempt finds the document and either applies or is stale.
+        for _ in range(2):
+            try:
+                await self._daily_summary.update_one(
+                    *self._summary_update(habit, date, minutes, version), upsert=True
+                )
+                return
+            except DuplicateKeyError:
+                continue
+
+    async def _apply_summary_updates(self, requests: List[Tuple[HabitRead, date, int, int]]) -> None:
+        """Apply many summary entries with one unordered bulk write."""
+        if not requests:
+            return
+        try:
+            await self._daily_summary.bulk_write(
+                [UpdateOne(*self._summary_update(*request), upsert=True) for request in requests],
+                ordered=False,
+            )
+        except BulkWriteError as exc:
+            errors = exc.details["writeErrors"]
+            if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            await asyncio.gather(*(self._update_summary(*requests[error["index"]]) for error in errors))
+
+    def _progress_keys_query(self, keys: List[Tuple[str, date]]) -> dict:
+        """Filter covering the progress documents of the given (habit, day) pairs.
+
+        One `$in` per field keeps it a single index scan; it may also match
+        other pairs of the same habits and days, which callers skip.
+        """
+        dates = [encoded for day in {day for _, day in keys} for encoded in self._date_match(day)["$in"]]
+        return {"habit_id": {"$in": list({ObjectId(habit_id) for habit_id, _ in keys})}, "date": {"$in": dates}}
+
+    async def _refresh_summaries(self, habits: Dict[str, HabitRead], keys: List[Tuple[str, date]]) -> None:
+        """Copy the stored state of the given (habit, day) progress documents into the summary."""
+        if not keys:
+            return
+        wanted = set(keys)
+        requests = []
+        projection = {"_id": 0, "habit_id": 1, "date": 1, "minutes": 1, "v": 1}
+        async for doc in self._progress.find(self._progress_keys_query(keys), projection):
+            key = (str(doc["habit_id"]), self._decode_date(doc["date"]))
+            if key in wanted:
+                requests.append((habits[key[0]], key[1], doc["minutes"], doc.get("v", 0)))
+        await self._apply_summary_updates(requests)
+
+    async def _summary_entries(self, date: date) -> Dict[str, dict]:
+        doc = await self._daily_summary.find_one({"_id": date.isoformat()})
+        return doc["habits"] if doc else {}
+
+    async def rebuild_daily_summary(self, batch_size: int = 500) -> AsyncIterator[int]:
+        """Regenerate `daily_summary` from `progress`, streaming in batches.
+
+        Safe to run while the application is writing: entries are only
+        replaced by data at least as recent, by the same rule as live
+        writes. Progress for unknown habits is skipped. Yields the number
+        of progress documents applied per batch.
+        """
+        habits = {habit.id: habit for habit in await self._load_habits()}
+        batch: List[Tuple[HabitRead, date, int, int]] = []
+        cursor = self._progress.find({}, {"_id": 0, "habit_id": 1, "date": 1, "minutes": 1, "v": 1})
+        async for doc in cursor.batch_size(batch_size):
+            habit = habits.get(str(doc["habit_id"]))
+            if habit is None:
+                continue
+            batch.append((habit, self._decode_date(doc["date"]), doc["minutes"], doc.get("v", 0)))
+            if len(batch) >= batch_size:
+                await self._apply_summary_updates(batch)
+                yield len(batch)
+                batch = []
+        if batch:
+            await self._apply_summary_updates(batch)
+            yield len(batch)
+
+    def _progress_keys_or(self, keys: List[Tuple[str, date]]) -> dict:
+        """Filter matching exactly the given (habit, day) pairs, one index lookup each."""
+        return {"$or": [self._progress_key(habit_id, day) for habit_id, day in keys]}
+
+    async def check_daily_summary(self, batch_size: int = 500) -> AsyncIterator[str]:
+        """Yield a description of every difference between `daily_summary` and `progress`.
+
+        Progress is streamed in batches and compared with the summaries of
+        the dates it touches; summaries are then streamed to find entries
+        that no longer have a progress document behind them.
+        """
+        habits = {habit.id: habit for habit in await self._load_habits()}
+
+        async def compare(batch: List[dict]) -> AsyncIterator[str]:
+            days = sorted({self._decode_date(doc["date"]).isoformat() for doc in batch})
+            summaries = {
+                doc["_id"]: doc["habits"]
+                async for doc in self._daily_summary.find({"_id": {"$in": days}})
+            }
+            for doc in batch:
+                habit_id, day = str(doc["habit_id"]), self._decode_date(doc["date"])
+                habit = habits[habit_id]
+                expected = {
+                    "minutes": doc["minutes"],
+                    "ratio": min(doc["minutes"] / habit.target_minutes, 1.0),
+                    "completed": doc["minutes"] >= habit.target_minutes,
+                }
+                entry = summaries.get(day.isoformat(), {}).get(habit_id)
+                if entry is None:
+                    yield f"{day} {habit_id}: missing from daily_summary"
+                elif {key: entry.get(key) for key in expected} != expected:
+                    yield f"{day} {habit_id}: summary {entry} != progress {expected}"
+
+        batch: List[dict] = []
+        cursor = self._progress.find({}, {"_id": 0, "habit_id": 1, "date": 1, "minutes": 1})
+        async for doc in cursor.batch_size(batch_size):
+            if str(doc["habit_id"]) not in habits:
+                continue
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                async for problem in compare(batch):
+                    yield problem
+                batch = []
+        if batch:
+            async for problem in compare(batch):
+                yield problem
+
+        async def orphans(keys: List[Tuple[str, date]]) -> AsyncIterator[str]:
+            query = self._progress_keys_or(keys)
+            found = {
+                (str(doc["habit_id"]), self._decode_date(doc["date"]))
+                async for doc in self._progress.find(query, {"_id": 0, "habit_id": 1, "date": 1})
+            }
+            for habit_id, day in keys:
+                if (habit_id, day) not in found:
+                    yield f"{day} {habit_id}: in daily_summary but has no progress"
+
+        keys: List[Tuple[str, date]] = []
+        async for doc in self._daily_summary.find({}).batch_size(batch_size):
+            day = date.fromisoformat(doc["_id"])
+            for habit_id in doc["habits"]:
+                if not ObjectId.is_valid(habit_id):
+                    yield f"{day} {habit_id}: in daily_summary but not a habit ID"
+                    continue
+                keys.append((habit_id, day))
+            if len(keys) >= batch_size:
+                async for problem in orphans(keys):
+                    yield problem
+                keys = []
+        if keys:
+            async for problem in orphans(keys):
+                yield problem
+
+    # Attempts, with exponential backoff, at a habit's statistics lease.
+    _STATS_RETRIES = 5
+    # How long a writer may hold the lease before another may take it over.
+    _STATS_LEASE_SECONDS = 10.0
+    # Changed days a writer patches into the runs one by one; beyond this
+    # it rebuilds them from progress with one query.
+    _STATS_PATCH_DAYS = 16
+
+    def _completed_days_query(self, habit: HabitRead) -> dict:
+        return {"habit_id": ObjectId(habit.id), "minutes": {"$gte": habit.target_minutes}}
+
+    async def _completion_runs_from_progress(self, habit: HabitRead) -> CompletionRuns:
+        """Derive the habit's runs from its whole progress history."""
+        runs = CompletionRuns()
+        async for entry in self._progress.find(self._completed_days_query(habit), {"_id": 0, "date": 1}):
+            runs.add(self._decode_date(entry["date"]).toordinal())
+        return runs
+
+    async def _acquire_stats_lease(self, habit_id: str) -> Optional[dict]:
+        """Take the lease on the habit's `habit_stats` document and return it; None if it stays taken."""
+        for attempt in range(self._STATS_RETRIES):
+            now = datetime.now(timezone.utc)
+            try:
+                # A held lease fails the filter, and the upsert then collides on `_id`.
+                return await self._habit_stats.find_one_and_update(
+                    {
+                        "_id": ObjectId(habit_id),
+                        "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lt": now}}],
+                    },
+                    {
+                        "$set": {
+                            "lease": ObjectId(),
+                            "lease_until": now + timedelta(seconds=self._STATS_LEASE_SECONDS),
+                        }
+                    },
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+            except DuplicateKeyError:
+                await asyncio.sleep(0.01 * 2**attempt)
+        return None
+
+    async def _release_stats_lease(self, lease: dict) -> None:
+        await self._habit_stats.update_one(
+            {"_id": lease["_id"], "lease": lease["lease"]}, {"$unset": {"lease": "", "lease_until": ""}}
+        )
+
+    async def _rebuild_completion_runs(self, habit: HabitRead, lease: dict) -> None:
+        """Replace the habit's stored runs with ones derived from progress; the lease must be held.
+
+        The runs are only marked ready if no writer gave up on the lease
+        meanwhile, since its change may be missing from what was read.
+        """
+        habit_id = ObjectId(habit.id)
+        runs = await self._completion_runs_from_progress(habit)
+        await self._completion_runs.delete_many({"habit_id": habit_id})
+        if runs.to_list():
+            await self._completion_runs.insert_many(
+                [
+                    {"habit_id": habit_id, "start": start, "end": end, "length": end - start + 1}
+                    for start, end in runs.to_list()
+                ]
+            )
+        await self._habit_stats.update_one({"_id": habit_id, "stale": lease.get("stale")}, {"$set": {"ready": True}})
+
+    async def _apply_run_change(self, habit_id: str, day: int, completed: bool) -> None:
+        """Mark one day (un)completed by rewriting at most the runs next to it."""
+        key = ObjectId(habit_id)
+        projection = {"_id": 0, "start": 1, "end": 1}
+        before = await self._completion_runs.find_one(
+            {"habit_id": key, "start": {"$lte": day}}, projection, sort=[("start", -1)]
+        )
+        after = None
+        if completed:
+            after = await self._completion_runs.find_one({"habit_id": key, "start": day + 1}, projection)
+        deleted, written = run_changes(
+            day,
+            completed,
+            (before["start"], before["end"]) if before else None,
+            (after["start"], after["end"]) if after else None,
+        )
+        requests = [DeleteOne({"habit_id": key, "start": start}) for start in deleted]
+        requests += [
+            UpdateOne({"habit_id": key, "start": start}, {"$set": {"end": end, "length": end - start + 1}}, upsert=True)
+            for start, end in written
+        ]
+        if requests:
+            await self._completion_runs.bulk_write(requests)
+
+    async def _track_completion(self, habit: HabitRead, days: Iterable[int]) -> None:
+        """Bring the habit's stored runs up to date for the given day ordinals.
+
+        Writers of one habit take turns through its lease and apply the
+        completion state stored when they hold it, not the one their own
+        write produced, so the last writer leaves the runs matching
+        progress whatever order the lease was taken in. More than
+        `_STATS_PATCH_DAYS` days rebuild the runs in one pass instead. A
+        writer that cannot get the lease marks the runs stale rather than
+        failing a progress write that is already stored; stale runs are
+        rebuilt on next use.
+        """
+        days = sorted(set(days))
+        lease = await self._acquire_stats_lease(habit.id)
+        if lease is None:
+            logger.warning("statistics of habit %s are contended; they will be rebuilt from progress", habit.id)
+            await self._habit_stats.update_one(
+                {"_id": ObjectId(habit.id)}, {"$set": {"ready": False}, "$inc": {"stale": 1}}
+            )
+            return
+        try:
+            if lease.get("ready") and len(days) <= self._STATS_PATCH_DAYS:
+                query = self._progress_keys_query([(habit.id, date.fromordinal(day)) for day in days])
+                completed = {
+                    self._decode_date(doc["date"]).toordinal()
+                    async for doc in self._progress.find(query, {"_id": 0, "date": 1, "minutes": 1})
+                    if doc["minutes"] >= habit.target_minutes
+                }
+                for day in days:
+                    await self._apply_run_change(habit.id, day, day in completed)
+            else:
+                # Runs never built, stale, or too many days to patch: the
+                # progress just written is included.
+                await self._rebuild_completion_runs(habit, lease)
+        finally:
+            await self._release_stats_lease(lease)
+
+    async def get_habit_stats(self, habit_id: str, today: date) -> Optional[HabitStats]:
+        habit = await self.get_habit(habit_id)
+        if not habit:
+            return None
+        key = ObjectId(habit_id)
+        doc = await self._habit_stats.find_one({"_id": key}, {"ready": 1})
+        if not (doc and doc.get("ready")):
+            lease = await self._acquire_stats_lease(habit_id)
+            if lease is None:
+                # Someone else is writing the runs: answer without storing.
+                return (await self._completion_runs_from_progress(habit)).stats(habit_id, today)
+            try:
+                if not lease.get("ready"):
+                    await self._rebuild_completion_runs(habit, lease)
+            finally:
+                await self._release_stats_lease(lease)
+        ordinal = today.toordinal()
+        window_start = ordinal - WINDOW_DAYS + 1
+        projection = {"_id": 0, "start": 1, "end": 1}
+        before, inside, longest = await asyncio.gather(
+            self._completion_runs.find_one(
+                {"habit_id": key, "start": {"$lte": window_start}}, projection, sort=[("start", -1)]
+            ),
+            self._completion_runs.find(
+                {"habit_id": key, "start": {"$gt": window_start, "$lte": ordinal}}, projection
+            ).sort("start", ASCENDING).to_list(None),
+            self._completion_runs.find_one({"habit_id": key}, {"_id": 0, "length": 1}, sort=[("length", -1)]),
+        )
+        runs = [(before["start"], before["end"])] if before else []
+        runs += [(doc["start"], doc["end"]) for doc in inside]
+        return window_stats(habit_id, today, runs, longest["length"] if longest else 0)
+
+    def _progress_pipeline(self, match: dict) -> List[dict]:
+        """Aggregation pipeline returning matching progress with habit targets.
+
+        Each progress document is joined to its habit through `$lookup` so
+        the `completed` flag can be derived without a lookup per row.
+        """
+        return [
+            {"$match": match},
+            {
+                "$lookup": {
+                    "from": "habits",
+                    "localField": "habit_id",
+                    "foreignField": "_id",
+                    "pipeline": [{"$project": {"_id": 0, "target_minutes": 1}}],
+                    "as": "habit",
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "habit_id": 1,
+                    "date": 1,
+                    "minutes": 1,
+                    "target_minutes": {"$arrayElemAt": ["$habit.target_minutes", 0]},
+                }
+            },
+        ]
+
+    def _progress_for_date_pipeline(self, date: date) -> List[dict]:
+        return self._progress_pipeline({"date": self._date_match(date)})
+
+    def _progress_between_pipeline(self, start: date, end: date) -> List[dict]:
+        # BSON compares values of different types by type first, so each
+        # encoding needs its own range; both branches use the `date` index.
+        ranges = [
+            {"date": {"$gte": self._encode_date(start, mode), "$lte": self._encode_date(end, mode)}}
+            for mode in self.DATE_STORAGE_MODES
+        ]
+        return self._progress_pipeline({"$or": ranges})
+
+    async def _iter_progress(self, pipeline: List[dict]) -> AsyncIterator[ProgressRead]:
+        cursor = self._progress.aggregate(pipeline)
+        async for doc in cursor:
+            # Orphaned progress (habit deleted) keeps the previous semantics of
+            # comparing against a zero target.
+            target_minutes = doc.get("target_minutes") or 0
+            yield ProgressRead(
+                habit_id=str(doc["habit_id"]),
+                date=self._decode_date(doc["date"]),
+                minutes=doc["minutes"],
+                completed=doc["minutes"] >= target_minutes,
+            )
+
     async def get_progress_for_date(self, date: date) -> List[ProgressRead]:
-        iso = date.isoformat()
-        cursor = self._progress.find({"date": iso})
-        results: List[ProgressRead] = []
+        if self._summary_reads:
+            return [
+                ProgressRead(habit_id=habit_id, date=date, minutes=entry["minutes"], completed=entry["completed"])
+                for habit_id, entry in (await self._summary_entries(date)).items()
+            ]
+        return [entry async for entry in self._iter_progress(self._progress_for_date_pipeline(date))]
+
+    async def get_progress_between(self, start: date, end: date) -> List[ProgressRead]:
+        entries = [
+            entry async for entry in self._iter_progress(self._progress_between_pipeline(start, end))
+        ]
+        # Sorting happens here rather than on the server: while a date
+        # migration is in progress the two encodings do not sort together.
+        entries.sort(key=lambda entry: entry.date)
+        return entries
+
+    def _progress_bars_pipeline(self, date: date) -> List[dict]:
+        """Aggregation pipeline joining every habit to its progress on `date`.
+
+        The pipeline runs against the `habits` collection so habits without
+        an entry for the day still produce a bar (with zero minutes). The
+        `$lookup` is keyed on `habit_id` and restricted to the requested
+        date, so the whole computation is a single server-side query. The
+        combined `localField`/`pipeline` form of `$lookup` needs MongoDB 5.0+.
+        """
+        return [
+            {
+                "$lookup": {
+                    "from": "progress",
+                    "localField": "_id",
+                    "foreignField": "habit_id",
+                    "pipeline": [
+                        {"$match": {"date": self._date_match(date)}},
+                        {"$project": {"_id": 0, "minutes": 1}},
+                    ],
+                    "as": "entries",
+                }
+            },
+            {
+                "$project": {
+                    "progress_ratio": {
+                        "$min": [
+                            {"$divide": [{"$sum": "$entries.minutes"}, "$target_minutes"]},
+                            1.0,
+                        ]
+                    },
+                }
+            },
+        ]
+
+    async def compute_progress_bars(self, date: date) -> List[ProgressBar]:
+        if self._summary_reads:
+            habits, entries = await asyncio.gather(self.list_habits(), self._summary_entries(date))
+            return [
+                ProgressBar(habit_id=habit.id, progress_ratio=entries[habit.id]["ratio"] if habit.id in entries else 0.0)
+                for habit in habits
+            ]
+        cursor = self._habits.aggregate(self._progress_bars_pipeline(date))
+        bars: List[ProgressBar] = []
         async for doc in cursor:
-            habit_id = str(doc["habit_id"])
-            habit = await self.get_habit(habit_id)
-            completed = doc["minutes"] >= (habit.target_minutes if habit else 0)
-            results.append(
-                ProgressRead(
-                    habit_id=habit_id,
-                    date=date,
-                    minutes=doc["minutes"],
-                    completed=completed,
-                )
+            bars.append(
+                ProgressBar(habit_id=str(doc["_id"]), progress_ratio=doc["progress_ratio"])
             )
+        return bars
+
+
+class SQLiteRepository(HabitRepository):
+    """Durable embedded repository backed by the standard-library `sqlite3`.
+
+    Intended for single-node deployments that should survive restarts
+    without running a MongoDB server. The database runs in WAL mode so
+    readers never block the writer. `sqlite3` is blocking, so every call
+    runs on a small thread pool, each worker thread holding its own
+    connection; statements use constant SQL text so the per-connection
+    statement cache reuses their prepared form.
+
+    Dates are stored as integer day ordinals. The `progress` table is
+    clustered on `(habit_id, day)` and has a covering `(day, habit_id,
+    minutes)` index for per-day and range reads. The streak statistics
+    keep one `completion_runs` row per run of completed days, indexed by
+    first day and by length, and are updated in the same transaction as
+    the progress row, as are the write counters in
+    `versions` (scope 0 for the habit list, the day ordinal for progress,
+    and -1 for a random epoch chosen when the database is created).
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            time_block TEXT NOT NULL,
+            target_minutes INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS progress (
+            habit_id INTEGER NOT NULL REFERENCES habits(id),
+            day INTEGER NOT NULL,
+            minutes INTEGER NOT NULL,
+            PRIMARY KEY (habit_id, day)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS progress_day ON progress (day, habit_id, minutes);
+        CREATE TABLE IF NOT EXISTS completion_runs (
+            habit_id INTEGER NOT NULL REFERENCES habits(id),
+            first_day INTEGER NOT NULL,
+            last_day INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            PRIMARY KEY (habit_id, first_day)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS completion_runs_length ON completion_runs (habit_id, length);
+        -- Habits whose runs have been derived from their progress.
+        CREATE TABLE IF NOT EXISTS completion_runs_built (
+            habit_id INTEGER PRIMARY KEY REFERENCES habits(id)
+        );
+        CREATE TABLE IF NOT EXISTS versions (
+            scope INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO versions (scope, version) VALUES (-1, abs(random() % 4294967296));
+    """
+
+    _SELECT_HABIT = "SELECT id, name, time_block, target_minutes FROM habits WHERE id = ?"
+    _UPSERT_PROGRESS = (
+        "INSERT INTO progress (habit_id, day, minutes) VALUES (?, ?, ?) "
+        "ON CONFLICT (habit_id, day) DO UPDATE SET minutes = excluded.minutes"
+    )
+    _INCREMENT_PROGRESS = (
+        "INSERT INTO progress (habit_id, day, minutes) VALUES (?, ?, ?) "
+        "ON CONFLICT (habit_id, day) DO UPDATE SET minutes = minutes + excluded.minutes "
+        "RETURNING minutes"
+    )
+    _BUMP_VERSION = (
+        "INSERT INTO versions (scope, version) VALUES (?, 1) "
+        "ON CONFLICT (scope) DO UPDATE SET version = version + 1"
+    )
+    _SELECT_PROGRESS = (
+        "SELECT p.habit_id, p.day, p.minutes, p.minutes >= COALESCE(h.target_minutes, 0) "
+        "FROM progress p LEFT JOIN habits h ON h.id = p.habit_id "
+    )
+    _RUNS_BUILT = "SELECT 1 FROM completion_runs_built WHERE habit_id = ?"
+    _RUN_BEFORE = (
+        "SELECT first_day, last_day FROM completion_runs "
+        "WHERE habit_id = ? AND first_day <= ? ORDER BY first_day DESC LIMIT 1"
+    )
+    _RUN_STARTING = "SELECT first_day, last_day FROM completion_runs WHERE habit_id = ? AND first_day = ?"
+    _WRITE_RUN = "INSERT OR REPLACE INTO completion_runs (habit_id, first_day, last_day, length) VALUES (?, ?, ?, ?)"
+    _DELETE_RUN = "DELETE FROM completion_runs WHERE habit_id = ? AND first_day = ?"
+    # Runs starting in the window, and the last one starting before it.
+    _WINDOW_RUNS = (
+        "SELECT first_day, last_day FROM completion_runs WHERE habit_id = ? AND first_day <= ? AND first_day >= "
+        "COALESCE((SELECT first_day FROM completion_runs WHERE habit_id = ? AND first_day <= ? "
+        "ORDER BY first_day DESC LIMIT 1), ?) "
+        "ORDER BY first_day"
+    )
+    _LONGEST_RUN = "SELECT length FROM completion_runs WHERE habit_id = ? ORDER BY length DESC LIMIT 1"
+
+    def __init__(self, path: str, max_workers: int = 4) -> None:
+        self._path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sqlite")
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(self._SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; write methods open explicit transactions.
+            conn = sqlite3.connect(self._path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA busy_timeout = 5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def _run(self, fn, *args):
+        """Run `fn(connection, *args)` on the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(self._connection(), *args))
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, fn, *args):
+        """Run `fn(conn, *args)` inside an immediate (write-locking) transaction."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    @staticmethod
+    def _row_id(habit_id: str) -> Optional[int]:
+        """The row ID spelled by `habit_id`, or None unless it is one we issued.
+
+        Only the canonical decimal form within SQLite's integer range is
+        accepted, so "01" or " 1" are not aliases of habit 1.
+        """
+        if not (habit_id.isascii() and habit_id.isdigit()) or str(int(habit_id)) != habit_id:
+            return None
+        row_id = int(habit_id)
+        return row_id if row_id < 2**63 else None
+
+    @staticmethod
+    def _habit_from_row(row: tuple) -> HabitRead:
+        return HabitRead(id=str(row[0]), name=row[1], time_block=row[2], target_minutes=row[3])
+
+    @staticmethod
+    def _progress_from_row(row: tuple) -> ProgressRead:
+        return ProgressRead(
+            habit_id=str(row[0]), date=date.fromordinal(row[1]), minutes=row[2], completed=bool(row[3])
+        )
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    async def create_habit(self, habit: HabitCreate) -> HabitRead:
+        def insert(conn: sqlite3.Connection) -> int:
+            cursor = conn.execute(
+                "INSERT INTO habits (name, time_block, target_minutes) VALUES (?, ?, ?)",
+                (habit.name, habit.time_block, habit.target_minutes),
+            )
+            conn.execute(self._BUMP_VERSION, (0,))
+            return cursor.lastrowid
+
+        habit_id = await self._run(self._write, insert)
+        return HabitRead(
+            id=str(habit_id),
+            name=habit.name,
+            time_block=habit.time_block,
+            target_minutes=habit.target_minutes,
+        )
+
+    async def list_habits(self) -> List[HabitRead]:
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "SELECT id, name, time_block, target_minutes FROM habits ORDER BY id"
+            ).fetchall()
+        )
+        return [self._habit_from_row(row) for row in rows]
+
+    async def get_habit(self, habit_id: str) -> Optional[HabitRead]:
+        row_id = self._row_id(habit_id)
+        if row_id is None:
+            return None
+        row = await self._run(lambda conn: conn.execute(self._SELECT_HABIT, (row_id,)).fetchone())
+        return self._habit_from_row(row) if row else None
+
+    def _build_completion_runs(self, conn: sqlite3.Connection, habit_id: int, target_minutes: int) -> None:
+        """Derive the habit's runs from its progress; for habits recorded before runs were stored."""
+        runs = CompletionRuns()
+        for (day,) in conn.execute(
+            "SELECT day FROM progress WHERE habit_id = ? AND minutes >= ? ORDER BY day", (habit_id, target_minutes)
+        ):
+            runs.add(day)
+        conn.execute("DELETE FROM completion_runs WHERE habit_id = ?", (habit_id,))
+        conn.executemany(
+            self._WRITE_RUN, [(habit_id, start, end, end - start + 1) for start, end in runs.to_list()]
+        )
+        conn.execute("INSERT OR IGNORE INTO completion_runs_built (habit_id) VALUES (?)", (habit_id,))
+
+    def _apply_completion(
+        self, conn: sqlite3.Connection, habit_id: int, target_minutes: int, changes: Dict[int, bool]
+    ) -> None:
+        if not conn.execute(self._RUNS_BUILT, (habit_id,)).fetchone():
+            # The progress rows just written are included.
+            self._build_completion_runs(conn, habit_id, target_minutes)
+            return
+        for day, completed in changes.items():
+            before = conn.execute(self._RUN_BEFORE, (habit_id, day)).fetchone()
+            after = conn.execute(self._RUN_STARTING, (habit_id, day + 1)).fetchone() if completed else None
+            deleted, written = run_changes(day, completed, before, after)
+            conn.executemany(self._DELETE_RUN, [(habit_id, start) for start in deleted])
+            conn.executemany(self._WRITE_RUN, [(habit_id, start, end, end - start + 1) for start, end in written])
+
+    def _read_stats(self, conn: sqlite3.Connection, habit: HabitRead, today: date) -> HabitStats:
+        habit_id = int(habit.id)
+        if not conn.execute(self._RUNS_BUILT, (habit_id,)).fetchone():
+            self._write(conn, self._build_completion_runs, habit_id, habit.target_minutes)
+        ordinal = today.toordinal()
+        window_start = ordinal - WINDOW_DAYS + 1
+        # One read transaction, so both queries see the same runs.
+        conn.execute("BEGIN")
+        try:
+            runs = conn.execute(
+                self._WINDOW_RUNS, (habit_id, ordinal, habit_id, window_start, window_start)
+            ).fetchall()
+            longest = conn.execute(self._LONGEST_RUN, (habit_id,)).fetchone()
+        finally:
+            conn.execute("COMMIT")
+        return window_stats(habit.id, today, runs, longest[0] if longest else 0)
+
+    def _store_progress(self, conn: sqlite3.Connection, habit_id: int, day: int, minutes: int) -> Optional[bool]:
+        """Upsert one progress row and its completion run; None if the habit is unknown."""
+        row = conn.execute(self._SELECT_HABIT, (habit_id,)).fetchone()
+        if not row:
+            return None
+        target_minutes = row[3]
+        conn.execute(self._UPSERT_PROGRESS, (habit_id, day, minutes))
+        conn.execute(self._BUMP_VERSION, (day,))
+        completed = minutes >= target_minutes
+        self._apply_completion(conn, habit_id, target_minutes, {day: completed})
+        return completed
+
+    def _increment_progress(
+        self, conn: sqlite3.Connection, habit_id: int, day: int, delta: int
+    ) -> Optional[Tuple[int, bool]]:
+        """Add `delta` to one progress row; return `(minutes, completed)`, None if the habit is unknown."""
+        row = conn.execute(self._SELECT_HABIT, (habit_id,)).fetchone()
+        if not row:
+            return None
+        target_minutes = row[3]
+        (minutes,) = conn.execute(self._INCREMENT_PROGRESS, (habit_id, day, delta)).fetchone()
+        conn.execute(self._BUMP_VERSION, (day,))
+        completed = minutes >= target_minutes
+        self._apply_completion(conn, habit_id, target_minutes, {day: completed})
+        return minutes, completed
+
+    # Stay well below SQLite's limit on bound parameters per statement.
+    _IN_CHUNK = 500
+
+    def _store_progress_bulk(self, conn: sqlite3.Connection, rows: List[Tuple[int, int, int]]) -> Dict[int, int]:
+        """Upsert `(habit_id, day, minutes)` rows of known habits; return their targets."""
+        habit_ids = sorted({row[0] for row in rows})
+        targets: Dict[int, int] = {}
+        for offset in range(0, len(habit_ids), self._IN_CHUNK):
+            chunk = habit_ids[offset : offset + self._IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            targets.update(
+                conn.execute(f"SELECT id, target_minutes FROM habits WHERE id IN ({placeholders})", chunk)
+            )
+        known = [row for row in rows if row[0] in targets]
+        conn.executemany(self._UPSERT_PROGRESS, known)
+        conn.executemany(self._BUMP_VERSION, [(day,) for day in sorted({row[1] for row in known})])
+        changes: Dict[int, Dict[int, bool]] = {}
+        for habit_id, day, minutes in known:
+            changes.setdefault(habit_id, {})[day] = minutes >= targets[habit_id]
+        for habit_id, days in changes.items():
+            self._apply_completion(conn, habit_id, targets[habit_id], days)
+        return targets
+
+    async def record_progress(self, progress: ProgressCreate) -> ProgressRead:
+        row_id = self._row_id(progress.habit_id)
+        completed = None
+        if row_id is not None:
+            completed = await self._run(
+                self._write, self._store_progress, row_id, progress.date.toordinal(), progress.minutes
+            )
+        if completed is None:
+            raise ValueError(f"Habit with id {progress.habit_id} not found")
+        return ProgressRead(
+            habit_id=progress.habit_id,
+            date=progress.date,
+            minutes=progress.minutes,
+            completed=completed,
+        )
+
+    async def increment_progress(self, habit_id: str, date: date, delta: int) -> ProgressRead:
+        row_id = self._row_id(habit_id)
+        result = None
+        if row_id is not None:
+            result = await self._run(self._write, self._increment_progress, row_id, date.toordinal(), delta)
+        if result is None:
+            raise ValueError(f"Habit with id {habit_id} not found")
+        minutes, completed = result
+        return ProgressRead(habit_id=habit_id, date=date, minutes=minutes, completed=completed)
+
+    async def record_progress_bulk(self, items: List[ProgressCreate]) -> List[ProgressBulkResult]:
+        row_ids = [self._row_id(item.habit_id) for item in items]
+        rows = [
+            (row_id, item.date.toordinal(), item.minutes)
+            for row_id, item in zip(row_ids, items)
+            if row_id is not None
+        ]
+        # One transaction; executemany applies rows in order, so later
+        # items for the same habit and day win.
+        targets = await self._run(self._write, self._store_progress_bulk, rows) if rows else {}
+        results: List[ProgressBulkResult] = []
+        for index, (row_id, item) in enumerate(zip(row_ids, items)):
+            if row_id not in targets:
+                results.append(ProgressBulkResult(index=index, error=f"Habit with id {item.habit_id} not found"))
+                continue
+            progress = ProgressRead(
+                habit_id=item.habit_id,
+                date=item.date,
+                minutes=item.minutes,
+                completed=item.minutes >= targets[row_id],
+            )
+            results.append(ProgressBulkResult(index=index, progress=progress))
         return results
 
+    async def get_progress_for_date(self, date: date) -> List[ProgressRead]:
+        rows = await self._run(
+            lambda conn: conn.execute(
+                self._SELECT_PROGRESS + "WHERE p.day = ? ORDER BY p.habit_id", (date.toordinal(),)
+            ).fetchall()
+        )
+        return [self._progress_from_row(row) for row in rows]
+
+    async def get_progress_between(self, start: date, end: date) -> List[ProgressRead]:
+        rows = await self._run(
+            lambda conn: conn.execute(
+                self._SELECT_PROGRESS + "WHERE p.day BETWEEN ? AND ? ORDER BY p.day, p.habit_id",
+                (start.toordinal(), end.toordinal()),
+            ).fetchall()
+        )
+        return [self._progress_from_row(row) for row in rows]
+
     async def compute_progress_bars(self, date: date) -> List[ProgressBar]:
-        habits = await self.list_habits()
-        bars: List[ProgressBar] = []
-        for habit in habits:
-            record = await self._progress.find_one(
-                {"habit_id": ObjectId(habit.id), "date": date.isoformat()}
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "SELECT h.id, MIN(COALESCE(p.minutes, 0) * 1.0 / h.target_minutes, 1.0) "
+                "FROM habits h LEFT JOIN progress p ON p.habit_id = h.id AND p.day = ? "
+                "ORDER BY h.id",
+                (date.toordinal(),),
+            ).fetchall()
+        )
+        return [ProgressBar(habit_id=str(habit_id), progress_ratio=ratio) for habit_id, ratio in rows]
+
+    async def get_habit_stats(self, habit_id: str, today: date) -> Optional[HabitStats]:
+        habit = await self.get_habit(habit_id)
+        if not habit:
+            return None
+        return await self._run(self._read_stats, habit, today)
+
+    async def read_version(self, date: Optional[date] = None) -> Optional[str]:
+        scopes = (-1, 0, date.toordinal() if date is not None else 0)
+        versions = dict(
+            await self._run(
+                lambda conn: conn.execute(
+                    "SELECT scope, version FROM versions WHERE scope IN (?, ?, ?)", scopes
+                ).fetchall()
             )
-            minutes = record["minutes"] if record else 0
-            ratio = min(minutes / habit.target_minutes, 1.0)
-            bars.append(ProgressBar(habit_id=habit.id, progress_ratio=ratio))
-        return bars
\ No newline at end of file
+        )
+        token = f"{versions[-1]:x}.{versions.get(0, 0)}"
+        if date is not None:
+            token += f".{versions.get(scopes[2], 0)}"
+        return token
@@ -66,16 +66,76 @@ class ProgressRead(BaseModel):
     completed: bool
 
 
+class DailyProgress(BaseModel):
+    """Progress entries recorded on a single day, used by range queries."""
+
+    date: dt_date
+    entries: List[ProgressRead]
+
+
+class ProgressBulkResult(BaseModel):
+    """Outcome of one item of a bulk progress request."""
+
+    index: int = Field(..., description="Position of the item in the request.")
+    progress: Optional[ProgressRead] = Field(None, description="The stored entry, if the write succeeded.")
+    error: Optional[str] = Field(None, description="Why the item was rejected, if it failed.")
+
+
 class SpeechInput(BaseModel):
     """Schema for sending speech-transcribed text to the AI parser."""
 
     text: str = Field(..., description="Transcribed speech describing daily habits.")
 
 
+class SpeechBatchInput(BaseModel):
+    """Several transcripts, in the order they were recorded, parsed together."""
+
+    texts: List[str] = Field(..., description="Transcribed voice notes, oldest first.")
+
+
+class SpeechJob(BaseModel):
+    """State of a `/speech` request submitted in asynchronous mode."""
+
+    id: str
+    status: str = Field(..., description="One of 'queued', 'running', 'done' or 'failed'.")
+    result: Optional[List[ProgressRead]] = Field(None, description="Progress entries updated, once done.")
+    error: Optional[str] = Field(None, description="Why the job failed, if it did.")
+
+
 class ProgressBar(BaseModel):
     """Schema representing progress for a habit relative to its target."""
 
     habit_id: str
     progress_ratio: float = Field(
         ..., description="Progress ratio between 0 and 1 indicating completion level."
-    )
\ No newline at end of file
+    )
+
+
+class ProgressDelta(BaseModel):
+    """Progress bars changed by a write, as pushed on `/progress/stream`."""
+
+    date: dt_date
+    bars: List[ProgressBar] = Field(..., description="New ratio of each habit whose progress changed.")
+
+
+class HabitStats(BaseModel):
+    """Streak and completion-rate statistics for a single habit."""
+
+    habit_id: str
+    current_streak: int = Field(
+        ..., description="Consecutive completed days ending today (or yesterday, if today is not yet complete)."
+    )
+    longest_streak: int = Field(..., description="Longest run of consecutive completed days ever recorded.")
+    completion_rate_7d: float = Field(..., description="Share of the last 7 days (including today) completed.")
+    completion_rate_30d: float = Field(..., description="Share of the last 30 days (including today) completed.")
+
+
+class ProgressHeatmap(BaseModel):
+    """Progress ratios for every habit on every day of a year."""
+
+    year: int
+    start: dt_date = Field(..., description="Date of the first row (January 1st).")
+    habit_ids: List[str] = Field(..., description="Habit ID of each column.")
+    ratios: List[List[float]] = Field(
+        ..., description="One row per day of the year, one ratio between 0 and 1 per habit."
+    )
@@ -0,0 +1,67 @@
+"""
+Direct JSON encoding of trusted repository results for the list endpoints.
+
+FastAPI validates every returned value against the endpoint's
+`response_model`, converts it to JSON-compatible Python data and then
+encodes that with `json.dumps`. The repositories already return
+validated `HabitRead`, `ProgressRead` and `ProgressBar` instances, so
+for large lists most of that work is wasted. The encoders here skip the
+validation and produce the same bytes:
+
+* lists without floats are written straight from the model instances by
+  pydantic-core's JSON serializer, which formats strings, integers,
+  booleans and dates exactly like the standard path;
+* floats are the exception: pydantic-core writes them in positional
+  notation where Python's `repr` switches to an exponent (`0.00001`
+  rather than `1e-05`, below 1e-4). Progress ratios lie in [0, 1], so
+  bars are written by pydantic-core unless one of them is a non-zero
+  ratio below 1e-4; then they are shaped into dicts and encoded with
+  the `json.dumps` settings `JSONResponse` uses.
+
+The endpoints keep their `response_model` for the OpenAPI schema.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+from .schemas import DailyProgress, HabitRead, ProgressBar, ProgressRead
+
+_HABITS = TypeAdapter(List[HabitRead])
+_PROGRESS = TypeAdapter(List[ProgressRead])
+_DAILY_PROGRESS = TypeAdapter(List[DailyProgress])
+_BARS = TypeAdapter(List[ProgressBar])
+# Smallest magnitude Python's float repr writes without an exponent.
+_POSITIONAL_FLOATS = 1e-4
+
+
+def encode_habits(habits: List[HabitRead]) -> bytes:
+    return _HABITS.dump_json(habits)
+
+
+def encode_progress(entries: List[ProgressRead]) -> bytes:
+    return _PROGRESS.dump_json(entries)
+
+
+def encode_daily_progress(days: Iterable[date], by_day: Dict[date, List[ProgressRead]]) -> bytes:
+    """`DailyProgress` for each of `days`, holding that day's entries."""
+    return _DAILY_PROGRESS.dump_json(
+        [DailyProgress.model_construct(date=day, entries=by_day.get(day, [])) for day in days]
+    )
+
+
+def encode_bars(bars: List[ProgressBar]) -> bytes:
+    if all(bar.progress_ratio == 0 or _POSITIONAL_FLOATS <= bar.progress_ratio <= 1 for bar in bars):
+        return _BARS.dump_json(bars)
+    rows = [{"habit_id": bar.habit_id, "progress_ratio": bar.progress_ratio} for bar in bars]
+    return json.dumps(rows, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Wrap an encoded body the way `JSONResponse` would."""
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,192 @@
+"""
+Incrementally maintained streak and completion-rate statistics.
+
+A habit's completed days are kept as a sorted list of runs of consecutive
+days (day ordinals, inclusive on both ends). Marking a day complete or
+incomplete touches at most the run containing it and its two neighbours,
+so writes never rescan the habit's history. Reads locate today's run
+with a binary search and sum the handful of runs that overlap the
+7- and 30-day windows, so their cost does not grow with years of data.
+
+Persistent backends store one record per run, indexed on `(habit, start)`
+and `(habit, length)`. `run_changes` turns a completion change into
+writes to at most the two runs around the changed day, and `window_stats`
+answers from the runs overlapping the last `WINDOW_DAYS` days plus the
+longest length, so neither loads the habit's whole history.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .schemas import HabitStats
+
+
+# Days covered by the longest rolling completion rate.
+WINDOW_DAYS = 30
+
+# A run of completed days: (first day, last day) as ordinals.
+Run = Tuple[int, int]
+
+
+class CompletionRuns:
+    """Sorted, non-adjacent runs of completed days for a single habit."""
+
+    __slots__ = ("_starts", "_ends", "_lengths", "_longest")
+
+    def __init__(self, runs: Sequence[Sequence[int]] = ()) -> None:
+        self._starts: List[int] = [start for start, _ in runs]
+        self._ends: List[int] = [end for _, end in runs]
+        # Multiset of run lengths, so the longest streak survives splits.
+        self._lengths: Dict[int, int] = {}
+        self._longest = 0
+        for start, end in zip(self._starts, self._ends):
+            self._add_length(end - start + 1)
+
+    def to_list(self) -> List[List[int]]:
+        return [[start, end] for start, end in zip(self._starts, self._ends)]
+
+    def _add_length(self, length: int) -> None:
+        self._lengths[length] = self._lengths.get(length, 0) + 1
+        self._longest = max(self._longest, length)
+
+    def _remove_length(self, length: int) -> None:
+        remaining = self._lengths[length] - 1
+        if remaining:
+            self._lengths[length] = remaining
+            return
+        del self._lengths[length]
+        if length == self._longest:
+            self._longest = max(self._lengths, default=0)
+
+    def _run_index(self, day: int) -> int:
+        """Index of the run containing `day`, or -1."""
+        index = bisect_right(self._starts, day) - 1
+        if index >= 0 and self._ends[index] >= day:
+            return index
+        return -1
+
+    def __contains__(self, day: int) -> bool:
+        return self._run_index(day) != -1
+
+    def set(self, day: int, completed: bool) -> None:
+        """Record whether the habit was completed on the given day ordinal."""
+        if completed:
+            self.add(day)
+        else:
+            self.discard(day)
+
+    def add(self, day: int) -> None:
+        if day in self:
+            return
+        index = bisect_right(self._starts, day)
+        joins_left = index > 0 and self._ends[index - 1] == day - 1
+        joins_right = index < len(self._starts) and self._starts[index] == day + 1
+        if joins_left and joins_right:
+            self._remove_length(self._ends[index - 1] - self._starts[index - 1] + 1)
+            self._remove_length(self._ends[index] - self._starts[index] + 1)
+            self._ends[index - 1] = self._ends[index]
+            del self._starts[index], self._ends[index]
+            index -= 1
+        elif joins_left:
+            index -= 1
+            self._remove_length(self._ends[index] - self._starts[index] + 1)
+            self._ends[index] = day
+        elif joins_right:
+            self._remove_length(self._ends[index] - self._starts[index] + 1)
+            self._starts[index] = day
+        else:
+            self._starts.insert(index, day)
+            self._ends.insert(index, day)
+        self._add_length(self._ends[index] - self._starts[index] + 1)
+
+    def discard(self, day: int) -> None:
+        index = self._run_index(day)
+        if index == -1:
+            return
+        start, end = self._starts[index], self._ends[index]
+        self._remove_length(end - start + 1)
+        del self._starts[index], self._ends[index]
+        # Re-insert whatever is left on either side of the removed day.
+        for piece_start, piece_end in ((day + 1, end), (start, day - 1)):
+            if piece_start <= piece_end:
+                self._starts.insert(index, piece_start)
+                self._ends.insert(index, piece_end)
+                self._add_length(piece_end - piece_start + 1)
+
+    @property
+    def longest_streak(self) -> int:
+        return self._longest
+
+    def current_streak(self, today: int) -> int:
+        """Length of the streak ending today, or yesterday if today is still open."""
+        for day in (today, today - 1):
+            index = self._run_index(day)
+            if index != -1:
+                return day - self._starts[index] + 1
+        return 0
+
+    def completed_between(self, first: int, last: int) -> int:
+        """Number of completed days in `[first, last]`."""
+        index = max(bisect_right(self._starts, first) - 1, 0)
+        total = 0
+        while index < len(self._starts) and self._starts[index] <= last:
+            overlap = min(self._ends[index], last) - max(self._starts[index], first) + 1
+            if overlap > 0:
+                total += overlap
+            index += 1
+        return total
+
+    def stats(self, habit_id: str, today: date) -> HabitStats:
+        return _stats(self, habit_id, today, self.longest_streak)
+
+
+def _stats(runs: CompletionRuns, habit_id: str, today: date, longest_streak: int) -> HabitStats:
+    ordinal = today.toordinal()
+    return HabitStats(
+        habit_id=habit_id,
+        current_streak=runs.current_streak(ordinal),
+        longest_streak=longest_streak,
+        completion_rate_7d=runs.completed_between(ordinal - 6, ordinal) / 7,
+        completion_rate_30d=runs.completed_between(ordinal - WINDOW_DAYS + 1, ordinal) / WINDOW_DAYS,
+    )
+
+
+def window_stats(habit_id: str, today: date, runs: Sequence[Run], longest_streak: int) -> HabitStats:
+    """Statistics from the runs overlapping the `WINDOW_DAYS` days up to `today`.
+
+    `runs` may include any other runs starting before `today`; the
+    longest streak is passed in as stored.
+    """
+    return _stats(CompletionRuns(runs), habit_id, today, longest_streak)
+
+
+def run_changes(day: int, completed: bool, before: Optional[Run], after: Optional[Run]) -> Tuple[List[int], List[Run]]:
+    """Runs to delete (by first day) and to write so that `day` is `completed`.
+
+    `before` is the run with the latest start not after `day` and `after`
+    the run starting the day after it, if any. A written run replaces any
+    stored run with the same first day; no deleted start is also written.
+    """
+    inside = before is not None and before[1] >= day
+    if completed:
+        if inside:
+            return [], []
+        joins_before = before is not None and before[1] == day - 1
+        if joins_before and after is not None:
+            return [after[0]], [(before[0], after[1])]
+        if joins_before:
+            return [], [(before[0], day)]
+        if after is not None:
+            return [after[0]], [(day, after[1])]
+        return [], [(day, day)]
+    if not inside:
+        return [], []
+    start, end = before
+    deleted = [] if start < day else [start]
+    written = [(start, day - 1)] if start < day else []
+    if day < end:
+        written.append((day + 1, end))
+    return deleted, written
@@ -11,11 +11,223 @@ sophisticated AI model in the future.
 """
 
 import re
-from typing import Dict, List
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 from .schemas import HabitRead
 
 
+# Tokens that may appear in a transcript without naming an activity. The
+# confidence scorer treats anything else that is not part of a habit
+# name or a duration as a possible unrecognised mention.
+FILLER_WORDS = {
+    "a", "about", "after", "again", "also", "an", "and", "another", "around", "at", "before",
+    "but", "by", "did", "do", "doing", "for", "from", "got", "had", "have", "i", "i've",
+    "in", "it", "just", "me", "min", "mins", "minute", "minutes", "more", "my", "of", "on",
+    "practiced", "practised", "some", "spent", "then", "this", "today", "tonight", "was",
+    "went", "with", "yesterday",
+}
+COMPLETION_WORDS = {"complete", "completed", "finish", "finished", "done", "accomplished"}
+MINUTE_UNITS = {"min", "mins", "minute", "minutes"}
+
+_SUFFIXES = ("ations", "ation", "ating", "ated", "ates", "ate", "ings", "ing", "ed", "es", "s")
+_EDGE_PUNCTUATION = re.compile(r"^[^a-z0-9]+|[^a-z0-9]+$")
+_LEADING_NUMBER = re.compile(r"(\d+)(?:min|mins|minutes)?")
+_EXPLICIT_NUMBER = re.compile(r"\d+(?:min|mins|minute|minutes)")
+_UNIT_WORDS = {
+    word: value
+    for value, word in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen "
+        "fifteen sixteen seventeen eighteen nineteen".split()
+    )
+}
+_TENS_WORDS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+
+
+class HabitMention(NamedTuple):
+    """A habit name found in a transcript and the duration attached to it."""
+
+    habit: HabitRead
+    start: int
+    end: int
+    exact: bool
+    minutes: Optional[int]
+    number_index: Optional[int]
+
+
+class LocalParse(NamedTuple):
+    """Result of the local parser together with whether it can be trusted."""
+
+    minutes: Dict[str, int]
+    confident: bool
+
+
+class Transcript(NamedTuple):
+    """A transcript split into words, with stems and numbers worked out once.
+
+    `numbers[i]` is the value of a number starting at word `i` (digits,
+    "15mins", "twenty", "twenty five", "twenty-five") and `number_ends[i]`
+    the index just past it.
+    """
+
+    words: List[str]
+    stems: List[str]
+    numbers: List[Optional[int]]
+    number_ends: List[int]
+
+
+@lru_cache(maxsize=8192)
+def stem(word: str) -> str:
+    """Strip one common suffix, so "meditate", "meditating" and "meditation" agree."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            # running -> runn -> run
+            if word[-1] == word[-2] and word[-1] not in "aeiouls":
+                word = word[:-1]
+            break
+    return word
+
+
+def _words(text: str) -> List[str]:
+    return [_analyse(token)[0] for token in re.split(r"\s+", text.lower())]
+
+
+def _spelled_number(word: str) -> Optional[int]:
+    if word in _UNIT_WORDS:
+        return _UNIT_WORDS[word]
+    if word in _TENS_WORDS:
+        return _TENS_WORDS[word]
+    tens, _, unit = word.partition("-")
+    if tens in _TENS_WORDS and 0 < _UNIT_WORDS.get(unit, 0) < 10:
+        return _TENS_WORDS[tens] + _UNIT_WORDS[unit]
+    return None
+
+
+@lru_cache(maxsize=16384)
+def _analyse(token: str) -> Tuple[str, str, Optional[int]]:
+    """Word, stem and numeric value of one whitespace-delimited token."""
+    word = _EDGE_PUNCTUATION.sub("", token)
+    match = _LEADING_NUMBER.match(word)
+    return word, stem(word), int(match.group(1)) if match else _spelled_number(word)
+
+
+def tokenize(text: str) -> Transcript:
+    """Split `text` on whitespace, keeping word positions for the proximity rules."""
+    words, stems, numbers = map(list, zip(*map(_analyse, re.split(r"\s+", text.lower()))))
+    number_ends = list(range(1, len(words) + 1))
+    for index in range(len(words) - 1):
+        if words[index] in _TENS_WORDS and numbers[index] is not None:
+            unit = _UNIT_WORDS.get(words[index + 1], 0)
+            if 0 < unit < 10:
+                # "twenty five" is one number, not two.
+                numbers[index] += unit
+                numbers[index + 1] = None
+                number_ends[index] = index + 2
+    return Transcript(words, stems, numbers, number_ends)
+
+
+class HabitMatcher:
+    """Aho-Corasick automaton over the stemmed words of habit names.
+
+    Finds the first occurrence of every name in one pass over the
+    transcript, whatever the number of habits. Build it through
+    `habit_matcher`, which caches one automaton per list of names.
+    """
+
+    def __init__(self, names: Sequence[str]) -> None:
+        self.names: List[List[str]] = [[word for word in _words(name) if word] for name in names]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Name indices recognised on reaching each state, failure chain included.
+        self._out: List[List[int]] = [[]]
+        for index, name in enumerate(self.names):
+            if not name:
+                continue
+            state = 0
+            for symbol in map(stem, name):
+                following = self._goto[state].get(symbol)
+                if following is None:
+                    following = len(self._goto)
+                    self._goto[state][symbol] = following
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = following
+            self._out[state].append(index)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(symbol, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def first_occurrences(self, transcript: Transcript) -> Dict[int, Tuple[int, int]]:
+        """Map each name index found to the `(start, end)` word span of its first occurrence.
+
+        Empty words (bare punctuation) are skipped, so "reading - writing"
+        still matches "reading writing", but spans refer to the original
+        word positions.
+        """
+        goto, fail, out, names = self._goto, self._fail, self._out, self.names
+        words = transcript.words
+        found: Dict[int, Tuple[int, int]] = {}
+        state = 0
+        for position, symbol in enumerate(transcript.stems):
+            if not state and symbol not in goto[0]:
+                continue
+            if not symbol:
+                continue
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            for index in out[state]:
+                if index not in found:
+                    start = position
+                    for _ in range(len(names[index]) - 1):
+                        start -= 1
+                        while not words[start]:
+                            start -= 1
+                    found[index] = (start, position + 1)
+                    if len(found) == len(names):
+                        return found
+        return found
+
+
+@lru_cache(maxsize=64)
+def habit_matcher(names: Tuple[str, ...]) -> HabitMatcher:
+    return HabitMatcher(names)
+
+
+def _find_mentions(transcript: Transcript, habits: List[HabitRead]) -> List[HabitMention]:
+    """Locate the first mention of each habit and the number nearest to it.
+
+    For every habit, the first occurrence of its name (exact or stemmed)
+    is used. A number within 5 words after the name wins; otherwise the
+    closest number within 5 words before it is used.
+    """
+    matcher = habit_matcher(tuple(habit.name for habit in habits))
+    numbers = transcript.numbers
+    mentions: List[HabitMention] = []
+    for index, (start, end) in sorted(matcher.first_occurrences(transcript).items()):
+        exact = [word for word in transcript.words[start:end] if word] == matcher.names[index]
+        number_index = None
+        candidates = list(range(end, min(end + 5, len(numbers))))
+        candidates += list(range(start - 1, max(start - 5, 0) - 1, -1))
+        for candidate in candidates:
+            if numbers[candidate] is not None:
+                number_index = candidate
+                break
+        minutes = numbers[number_index] if number_index is not None else None
+        mentions.append(HabitMention(habits[index], start, end, exact, minutes, number_index))
+    return mentions
+
+
 def parse_speech_text(text: str, habits: List[HabitRead]) -> Dict[str, int]:
     """
     Parse a natural language description of habit completion and return a
@@ -28,6 +240,10 @@ def parse_speech_text(text: str, habits: List[HabitRead]) -> Dict[str, int]:
     is found near the habit name, the function assumes the habit was
     completed fully and uses the habit's target_minutes as the value.
 
+    Names are matched on stemmed words ("meditate" finds "meditation")
+    by a `HabitMatcher` shared by all calls with the same habit names,
+    and numbers may be spelled out ("twenty five minutes").
+
     Args:
         text: The free-form description of the day's activities.
         habits: List of habits with IDs and target durations.
@@ -36,48 +252,51 @@ def parse_speech_text(text: str, habits: List[HabitRead]) -> Dict[str, int]:
         A dict mapping habit IDs to minutes practised.
     """
     result: Dict[str, int] = {}
-    lower_text = text.lower()
-    tokens = re.split(r"\s+", lower_text)
-
-    # Precompute mapping of habit name tokens to HabitRead for quick lookup.
-    # We'll split habit names into tokens and search for those tokens in the text.
-    for habit in habits:
-        name_tokens = habit.name.lower().split()
-        # Find all occurrences of the first token in the tokens list
-        for idx, token in enumerate(tokens):
-            if token == name_tokens[0]:
-                # check subsequent tokens for match
-                end_idx = idx + len(name_tokens)
-                if tokens[idx:end_idx] == name_tokens:
-                    # Look for a number within 5 tokens after the matched phrase
-                    window_tokens = tokens[end_idx : end_idx + 5]
-                    minutes = None
-                    for t in window_tokens:
-                        if t.isdigit():
-                            minutes = int(t)
-                            break
-                        # also handle patterns like '15mins' or '15minutes'
-                        m = re.match(r"(\d+)(?:min|mins|minutes)?", t)
-                        if m:
-                            minutes = int(m.group(1))
-                            break
-                    # If not found ahead, look backwards up to 5 tokens
-                    if minutes is None:
-                        window_tokens_back = tokens[max(idx - 5, 0) : idx]
-                        for t_back in reversed(window_tokens_back):
-                            if t_back.isdigit():
-                                minutes = int(t_back)
-                                break
-                            m_back = re.match(r"(\d+)(?:min|mins|minutes)?", t_back)
-                            if m_back:
-                                minutes = int(m_back.group(1))
-                                break
-                    # If no explicit minutes found, default to target minutes
-                    if minutes is None:
-                        minutes = habit.target_minutes
-                    # Store the result for this habit
-                    result[habit.id] = minutes
-                    # Once matched, break out to avoid duplicate updates
-                    break
-
-    return result
\ No newline at end of file
+    for mention in _find_mentions(tokenize(text), habits):
+        # If no explicit minutes found, default to target minutes
+        minutes = mention.minutes if mention.minutes is not None else mention.habit.target_minutes
+        result[mention.habit.id] = minutes
+    return result
+
+
+def score_speech_text(text: str, habits: List[HabitRead]) -> LocalParse:
+    """
+    Run the local parser and decide whether its answer is unambiguous.
+
+    The parse is confident only when every habit mention carries its own
+    explicit duration (a number followed by, or suffixed with, a minute
+    unit) that no other mention also claims, there are no completion
+    phrases (whose meaning depends on progress already logged), and every
+    remaining word is filler. Anything else, for example "meditate" for a
+    habit named "meditation", should be escalated to the language model.
+
+    Returns:
+        The minutes to add for every habit (0 when not mentioned) and the
+        confidence verdict.
+    """
+    transcript = tokenize(text)
+    words = transcript.words
+    mentions = _find_mentions(transcript, habits)
+    minutes = {habit.id: 0 for habit in habits}
+    for mention in mentions:
+        minutes[mention.habit.id] = (
+            mention.minutes if mention.minutes is not None else mention.habit.target_minutes
+        )
+    if not mentions or COMPLETION_WORDS.intersection(words):
+        return LocalParse(minutes, False)
+    used = set()
+    for mention in mentions:
+        index = mention.number_index
+        if not mention.exact or index is None or index in used:
+            # A stemmed name, no duration, or a duration shared with another habit.
+            return LocalParse(minutes, False)
+        end = transcript.number_ends[index]
+        explicit = _EXPLICIT_NUMBER.fullmatch(words[index]) is not None or (
+            end < len(words) and words[end] in MINUTE_UNITS
+        )
+        if not explicit:
+            return LocalParse(minutes, False)
+        used.update(range(mention.start, mention.end))
+        used.update(range(index, end))
+    leftovers = [word for index, word in enumerate(words) if word and index not in used]
+    return LocalParse(minutes, all(word in FILLER_WORDS for word in leftovers))
@@ -0,0 +1 @@
+"""Performance benchmarks for the habit tracker. Run each module with `python -m`."""
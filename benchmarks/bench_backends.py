@@ -0,0 +1,95 @@
+"""
+Local latency of the repository backends.
+
+Times record_progress, get_progress_for_date, get_progress_between (30
+days) and compute_progress_bars against the in-memory and SQLite
+backends, and against MongoDB when `MONGO_URI` points at a local mongod.
+
+Usage:
+    python -m benchmarks.bench_backends --habits 50 --days 90
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+from app.repository import HabitRepository, InMemoryRepository, MongoRepository, SQLiteRepository
+from app.schemas import HabitCreate, ProgressCreate
+
+FIRST_DAY = date(2024, 1, 1)
+
+
+async def seed(repo: HabitRepository, habits: int, days: int) -> List[str]:
+    ids = []
+    for i in range(habits):
+        habit = await repo.create_habit(HabitCreate(name=f"habit {i}", time_block="morning", target_minutes=30))
+        ids.append(habit.id)
+        for offset in range(days):
+            await repo.record_progress(
+                ProgressCreate(habit_id=habit.id, date=FIRST_DAY + timedelta(days=offset), minutes=(i + offset) % 45)
+            )
+    return ids
+
+
+async def measure(fn, rounds: int) -> float:
+    """Median latency of `fn` in milliseconds."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def run(label: str, repo: HabitRepository, args: argparse.Namespace) -> Dict[str, float]:
+    ids = await seed(repo, args.habits, args.days)
+    probe = FIRST_DAY + timedelta(days=args.days // 2)
+    counter = iter(range(10**9))
+    results = {
+        "record_progress": await measure(
+            lambda: repo.record_progress(ProgressCreate(habit_id=ids[next(counter) % len(ids)], date=probe, minutes=5)),
+            args.rounds,
+        ),
+        "progress_for_date": await measure(lambda: repo.get_progress_for_date(probe), args.rounds),
+        "progress_30_days": await measure(
+            lambda: repo.get_progress_between(probe, probe + timedelta(days=29)), args.rounds
+        ),
+        "progress_bars": await measure(lambda: repo.compute_progress_bars(probe), args.rounds),
+    }
+    print(f"{label:<8}" + "".join(f"{value:>18.3f}" for value in results.values()))
+    await repo.close()
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--habits", type=int, default=50)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"median ms, {args.habits} habits x {args.days} days")
+    print(f"{'backend':<8}" + "".join(f"{name:>18}" for name in (
+        "record_progress", "progress_for_date", "progress_30_days", "progress_bars"
+    )))
+    await run("memory", InMemoryRepository(), args)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        await run("sqlite", SQLiteRepository(os.path.join(tmpdir, "bench.db")), args)
+    mongo_uri = os.getenv("MONGO_URI")
+    if mongo_uri:
+        repo = MongoRepository(mongo_uri, db_name="habit_app_bench")
+        await repo._client.drop_database("habit_app_bench")
+        await repo.ensure_indexes()
+        await run("mongo", repo, args)
+        await MongoRepository(mongo_uri)._client.drop_database("habit_app_bench")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
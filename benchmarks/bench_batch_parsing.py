@@ -0,0 +1,86 @@
+"""
+Tokens and latency per transcript: one call per note versus one batched call.
+
+Replays a day's voice notes through `parse_habits_with_ai` one by one
+(carrying the accumulated progress forward, as `/speech` does) and
+through `parse_habits_batch_with_ai` in a single request, against the
+mock LLM server. The local tier and the cache are disabled so that every
+note needs the model. The mock server's token estimate is the same
+for both runs, so the difference is the system prompt and habit list
+that the per-note calls repeat.
+
+Usage:
+    python -m benchmarks.bench_batch_parsing --notes 1 5 20 --latency 0.4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+from app import agents
+from app.cache import ParseCache
+from app.schemas import HabitRead
+from benchmarks.mock_llm import MockLLMServer
+
+HABITS = [
+    HabitRead(id=str(i), name=name, time_block="any", target_minutes=30)
+    for i, name in enumerate(["meditation", "reading", "deep work", "yoga", "journaling", "walk"])
+]
+NOTES = [
+    "did some reading on the train 10",
+    "quick meditation session 5",
+    "deep work block before lunch 50",
+    "evening yoga 20",
+    "wrote in my journal, journaling 10",
+    "walk after dinner 25",
+]
+
+
+def notes(count: int) -> List[str]:
+    return [f"{NOTES[i % len(NOTES)]} (note {i})" for i in range(count)]
+
+
+async def one_by_one(texts: List[str]) -> List[Dict[str, int]]:
+    progress: Dict[str, int] = {}
+    results = []
+    for text in texts:
+        result = await agents.parse_habits_with_ai(text, HABITS, progress)
+        for habit_id, minutes in result.items():
+            progress[habit_id] = progress.get(habit_id, 0) + minutes
+        results.append(result)
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--notes", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--latency", type=float, default=0.4, help="Mock model latency in seconds.")
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["LLM_LOCAL_FIRST"] = "0"
+    agents.parse_cache = ParseCache(ttl=0)
+    with MockLLMServer(latency=args.latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        await agents.open_llm_client()
+        print(f"{'notes':>5} {'mode':<10} {'calls':>5} {'tokens/note':>11} {'ms/note':>8}")
+        for count in args.notes:
+            texts = notes(count)
+            outcomes = []
+            for label, fn in (("per note", one_by_one), ("batched", agents.parse_habits_batch_with_ai)):
+                server.reset_counters()
+                start = time.perf_counter()
+                outcomes.append(await (fn(texts) if fn is one_by_one else fn(texts, HABITS, {})))
+                elapsed = (time.perf_counter() - start) * 1000
+                tokens = server.prompt_tokens + server.completion_tokens
+                print(f"{count:>5} {label:<10} {server.requests:>5} {tokens / count:>11.0f} {elapsed / count:>8.1f}")
+            assert outcomes[0] == outcomes[1], "batched answers differ from per-note answers"
+        await agents.close_llm_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Throughput of POST /progress/bulk against one POST /progress per entry.
+
+Imports the same history through the HTTP layer (in-process, via
+`httpx.ASGITransport`) both ways and reports entries per second for the
+in-memory and SQLite backends, and for MongoDB when `MONGO_URI` is set.
+
+Usage:
+    python -m benchmarks.bench_bulk_progress --entries 5000 --batch 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable, List
+
+import httpx
+
+from app.main import app, get_repo
+from app.repository import HabitRepository, InMemoryRepository, MongoRepository, SQLiteRepository
+
+
+async def import_history(
+    make_repo: Callable[[], HabitRepository], entries: int, batch: int, bulk: bool
+) -> float:
+    """Import `entries` progress rows into a fresh repository; return entries/s."""
+    repo = make_repo()
+    if isinstance(repo, MongoRepository):
+        await repo._client.drop_database("habit_app_bench")
+        await repo.ensure_indexes()
+    app.dependency_overrides[get_repo] = lambda: repo
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        habit_ids: List[str] = []
+        for i in range(10):
+            resp = await client.post("/habits", json={"name": f"habit {i}", "time_block": "morning", "target_minutes": 30})
+            habit_ids.append(resp.json()["id"])
+        first = date(2020, 1, 1)
+        items = [
+            {
+                "habit_id": habit_ids[i % len(habit_ids)],
+                "date": (first + timedelta(days=i // len(habit_ids))).isoformat(),
+                "minutes": i % 50,
+            }
+            for i in range(entries)
+        ]
+        start = time.perf_counter()
+        if bulk:
+            for offset in range(0, entries, batch):
+                resp = await client.post("/progress/bulk", json=items[offset : offset + batch])
+                resp.raise_for_status()
+        else:
+            for item in items:
+                resp = await client.post("/progress", json=item)
+                resp.raise_for_status()
+        elapsed = time.perf_counter() - start
+    app.dependency_overrides.clear()
+    await repo.close()
+    return entries / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    counter = iter(range(10**6))
+    backends = {
+        "memory": InMemoryRepository,
+        "sqlite": lambda: SQLiteRepository(os.path.join(tmpdir.name, f"bench-{next(counter)}.db")),
+    }
+    mongo_uri = os.getenv("MONGO_URI")
+    if mongo_uri:
+        backends["mongo"] = lambda: MongoRepository(mongo_uri, db_name="habit_app_bench")
+
+    print(f"entries/s importing {args.entries} entries (bulk batches of {args.batch})")
+    print(f"{'backend':<8} {'single':>10} {'bulk':>10} {'speedup':>8}")
+    for label, make_repo in backends.items():
+        single = await import_history(make_repo, args.entries, args.batch, bulk=False)
+        bulk = await import_history(make_repo, args.entries, args.batch, bulk=True)
+        print(f"{label:<8} {single:>10.0f} {bulk:>10.0f} {bulk / single:>7.1f}x")
+    tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
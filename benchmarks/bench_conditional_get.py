@@ -0,0 +1,80 @@
+"""
+Server CPU and bytes saved by conditional GETs on the dashboard reads.
+
+Runs the application in process against an embedded repository seeded
+with `--habits` habits, then issues `--requests` GETs of `/habits`,
+`/progress/{date}` and `/progress/bars/{date}`, first unconditionally and
+then with the ETag of the previous response in `If-None-Match`, and
+reports the process CPU time and response body bytes per request. The
+CPU time includes the in-process client, which costs the same in both
+runs, so the difference between them is what the server saved.
+
+The embedded backends answer the version check locally. With MongoDB,
+checking `/habits` while the habit cache is fresh costs no round trip.
+The token is cached with the snapshot. A per-date check adds one
+`daily_summary` key lookup before the body is read. A cache miss first
+reads the `habits` counter and then the habits.
+
+Usage:
+    python -m benchmarks.bench_conditional_get --habits 200 --requests 500
+    python -m benchmarks.bench_conditional_get --backend sqlite
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+import httpx
+
+from app import main
+from app.repository import InMemoryRepository, SQLiteRepository
+from app.schemas import HabitCreate, ProgressCreate
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int, conditional: bool) -> None:
+    etag = (await client.get(path)).headers["etag"]
+    headers = {"If-None-Match": etag} if conditional else {}
+    body_bytes = 0
+    start = time.process_time()
+    for _ in range(requests):
+        resp = await client.get(path, headers=headers)
+        body_bytes += len(resp.content)
+    cpu = (time.process_time() - start) / requests
+    label = "304" if conditional else "200"
+    print(f"{path:<28} {label}  {cpu * 1e6:8.0f} us CPU/request  {body_bytes // requests:7d} bytes/request")
+
+
+async def run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.backend == "sqlite":
+            repo = SQLiteRepository(os.path.join(tmpdir, "bench.db"))
+        else:
+            repo = InMemoryRepository()
+        day = date.today()
+        for i in range(args.habits):
+            habit = await repo.create_habit(HabitCreate(name=f"habit {i}", time_block="morning", target_minutes=30))
+            await repo.record_progress(ProgressCreate(habit_id=habit.id, date=day, minutes=i % 45))
+        main.app.dependency_overrides[main.get_repo] = lambda: repo
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path in ("/habits", f"/progress/{day.isoformat()}", f"/progress/bars/{day.isoformat()}"):
+                for conditional in (False, True):
+                    await measure(client, path, args.requests, conditional)
+        await repo.close()
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--habits", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,87 @@
+"""
+Benchmark the NumPy year heatmap against 365 calls to compute_progress_bars.
+
+Both paths produce the same ratios; the heatmap reads the year with one
+range query and computes every ratio with vectorised division and
+clipping. Runs against the in-memory repository by default, or against
+MongoDB when `MONGO_URI` is set.
+
+Usage:
+    python -m benchmarks.bench_heatmap --habits 10 50 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import date, timedelta
+from typing import List
+
+from app.heatmap import compute_year_heatmap
+from app.repository import HabitRepository, InMemoryRepository, MongoRepository
+from app.schemas import HabitCreate, ProgressCreate
+
+YEAR = 2023
+
+
+async def build_repository(habit_count: int, fill: float) -> HabitRepository:
+    mongo_uri = os.getenv("MONGO_URI")
+    if mongo_uri:
+        repo: HabitRepository = MongoRepository(mongo_uri, db_name="habit_app_bench")
+        await repo._client.drop_database("habit_app_bench")
+        await repo.ensure_indexes()
+    else:
+        repo = InMemoryRepository()
+    rng = random.Random(habit_count)
+    start = date(YEAR, 1, 1)
+    for i in range(habit_count):
+        habit = await repo.create_habit(HabitCreate(name=f"habit {i}", time_block="morning", target_minutes=30))
+        for offset in range(365):
+            if rng.random() < fill:
+                await repo.record_progress(
+                    ProgressCreate(habit_id=habit.id, date=start + timedelta(days=offset), minutes=rng.randint(0, 60))
+                )
+    return repo
+
+
+async def bars_for_year(repo: HabitRepository) -> List[List[float]]:
+    start = date(YEAR, 1, 1)
+    rows = []
+    for offset in range(365):
+        bars = await repo.compute_progress_bars(start + timedelta(days=offset))
+        rows.append([bar.progress_ratio for bar in bars])
+    return rows
+
+
+async def time_call(fn, rounds: int):
+    result = await fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = await fn()
+    return (time.perf_counter() - start) / rounds, result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--habits", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--fill", type=float, default=0.7, help="Share of days with progress.")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'habits':>6} {'365 x bars':>12} {'heatmap':>10} {'speedup':>8}")
+    for habit_count in args.habits:
+        repo = await build_repository(habit_count, args.fill)
+        loop_time, rows = await time_call(lambda: bars_for_year(repo), args.rounds)
+        heatmap_time, heatmap = await time_call(lambda: compute_year_heatmap(repo, YEAR), args.rounds)
+        assert heatmap.ratios == rows, "heatmap differs from compute_progress_bars"
+        print(
+            f"{habit_count:>6} {loop_time * 1000:>10.1f}ms {heatmap_time * 1000:>8.1f}ms "
+            f"{loop_time / heatmap_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Memory and latency benchmark for InMemoryRepository at staging scale.
+
+Loads 100 habits x 5 years of daily progress into the current
+repository and into the previous layout (one `ProgressRead` per entry in
+nested dicts, no date index), then reports the memory held by the
+progress data and the latency of the read paths.
+
+Usage:
+    python -m benchmarks.bench_inmemory --habits 100 --years 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Dict, List
+
+from app.repository import InMemoryRepository
+from app.schemas import HabitCreate, ProgressBar, ProgressCreate, ProgressRead
+
+
+class LegacyInMemoryRepository(InMemoryRepository):
+    """The previous progress layout, kept here for comparison."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._legacy: Dict[str, Dict[date, ProgressRead]] = {}
+
+    async def record_progress(self, progress: ProgressCreate) -> ProgressRead:
+        habit = self._habits[progress.habit_id]
+        entry = ProgressRead(
+            habit_id=progress.habit_id,
+            date=progress.date,
+            minutes=progress.minutes,
+            completed=progress.minutes >= habit.target_minutes,
+        )
+        self._legacy.setdefault(progress.habit_id, {})[progress.date] = entry
+        return entry
+
+    async def get_progress_for_date(self, date: date) -> List[ProgressRead]:
+        return [records[date] for records in self._legacy.values() if date in records]
+
+    async def get_progress_between(self, start: date, end: date) -> List[ProgressRead]:
+        results: List[ProgressRead] = []
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            results.extend(await self.get_progress_for_date(date.fromordinal(ordinal)))
+        return results
+
+    async def compute_progress_bars(self, date: date) -> List[ProgressBar]:
+        bars: List[ProgressBar] = []
+        for habit_id, habit in self._habits.items():
+            entry = self._legacy.get(habit_id, {}).get(date)
+            minutes = entry.minutes if entry else 0
+            bars.append(ProgressBar(habit_id=habit_id, progress_ratio=min(minutes / habit.target_minutes, 1.0)))
+        return bars
+
+
+async def load(repo: InMemoryRepository, habits: int, days: int, first: date) -> int:
+    """Fill `repo` and return the bytes allocated while recording progress."""
+    ids = [
+        (await repo.create_habit(HabitCreate(name=f"habit {i}", time_block="morning", target_minutes=30))).id
+        for i in range(habits)
+    ]
+    # Build the requests up front so they are not counted as stored data.
+    requests = [
+        ProgressCreate(habit_id=habit_id, date=first + timedelta(days=offset), minutes=(offset * 7 + i) % 60)
+        for offset in range(days)
+        for i, habit_id in enumerate(ids)
+    ]
+    gc.collect()
+    tracemalloc.start()
+    for request in requests:
+        await repo.record_progress(request)
+    # Completion runs are not part of the layout under comparison.
+    repo._completion_runs.clear()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+async def latency(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--habits", type=int, default=100)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    days = args.years * 365
+    first = date(2020, 1, 1)
+    probe = first + timedelta(days=days // 2)
+    print(f"{args.habits} habits x {days} days = {args.habits * days} entries")
+    print(f"{'layout':<8} {'memory':>10} {'per day':>10} {'bars':>10} {'30 days':>10}")
+    for label, repo in (("legacy", LegacyInMemoryRepository()), ("compact", InMemoryRepository())):
+        memory = await load(repo, args.habits, days, first)
+        per_day = await latency(lambda: repo.get_progress_for_date(probe), args.rounds)
+        bars = await latency(lambda: repo.compute_progress_bars(probe), args.rounds)
+        month = await latency(lambda: repo.get_progress_between(probe, probe + timedelta(days=29)), args.rounds // 10)
+        print(f"{label:<8} {memory / 2**20:>8.1f}MB {per_day:>8.3f}ms {bars:>8.3f}ms {month:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
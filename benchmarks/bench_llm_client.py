@@ -0,0 +1,79 @@
+"""
+Latency of parse_habits_with_ai with a pooled client versus one client per call.
+
+Starts the local mock LLM server and times `parse_habits_with_ai` both
+with the shared client closed (every call builds its own
+`httpx.AsyncClient`, as the code used to) and with the shared pool
+opened by `open_llm_client`. Runs sequential calls and a concurrent
+burst. The mock server speaks plain HTTP, so the TLS handshake that the
+pool also saves against the real API is not part of these numbers.
+
+Usage:
+    python -m benchmarks.bench_llm_client --calls 200 --burst 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+from app import agents
+from app.schemas import HabitRead
+from benchmarks.mock_llm import MockLLMServer
+
+HABITS = [
+    HabitRead(id="1", name="meditation", time_block="morning", target_minutes=15),
+    HabitRead(id="2", name="reading", time_block="evening", target_minutes=30),
+]
+
+
+async def one_call() -> float:
+    # Measure the upstream call itself, not the cache.
+    agents.parse_cache.clear()
+    start = time.perf_counter()
+    await agents.parse_habits_with_ai("meditation 10 minutes and reading 20 minutes", HABITS, {})
+    return (time.perf_counter() - start) * 1000
+
+
+async def sequential(calls: int) -> List[float]:
+    return [await one_call() for _ in range(calls)]
+
+
+async def burst(size: int) -> List[float]:
+    return list(await asyncio.gather(*(one_call() for _ in range(size))))
+
+
+def summary(label: str, samples: List[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} median {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock server latency in seconds.")
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["LLM_LOCAL_FIRST"] = "0"
+    with MockLLMServer(latency=args.latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        await agents.close_llm_client()
+        await one_call()
+        summary("client per call, sequential", await sequential(args.calls))
+        summary("client per call, burst", await burst(args.burst))
+        await agents.open_llm_client()
+        await one_call()
+        summary("pooled client, sequential", await sequential(args.calls))
+        summary("pooled client, burst", await burst(args.burst))
+        await agents.close_llm_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
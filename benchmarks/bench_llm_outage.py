@@ -0,0 +1,96 @@
+"""
+Tail latency of speech parsing while the LLM is down or slow.
+
+Runs waves of concurrent `parse_habits_with_ai` calls against the mock
+LLM server in three scenarios and prints latency percentiles:
+
+* outage, no breaker: every call hangs until the client timeout, then
+  falls back to the heuristic parser;
+* outage, breaker: after a few failures the breaker opens and calls go
+  straight to the heuristic parser, with one probe per cooldown;
+* slow upstream, hedged: the model answers, but after the hedge budget.
+
+Usage:
+    python -m benchmarks.bench_llm_outage --timeout 1.0 --waves 10 --wave-size 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from typing import List
+
+from app import agents
+from app.circuit import CircuitBreaker
+from app.schemas import HabitRead
+from benchmarks.mock_llm import MockLLMServer
+
+HABITS = [
+    HabitRead(id="1", name="meditation", time_block="morning", target_minutes=15),
+    HabitRead(id="2", name="reading", time_block="evening", target_minutes=30),
+]
+
+
+async def call(n: int) -> float:
+    start = time.perf_counter()
+    # Inflected names keep the local tier out of the way.
+    await agents.parse_habits_with_ai(f"meditated and read a little ({n})", HABITS, {})
+    return (time.perf_counter() - start) * 1000
+
+
+async def waves(count: int, size: int) -> List[float]:
+    samples: List[float] = []
+    for wave in range(count):
+        samples += await asyncio.gather(*(call(wave * size + i) for i in range(size)))
+    return samples
+
+
+def report(label: str, samples: List[float]) -> None:
+    samples = sorted(samples)
+
+    def pct(p: float) -> float:
+        return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+    print(f"{label:<22} p50 {pct(0.5):8.1f} ms  p95 {pct(0.95):8.1f} ms  p99 {pct(0.99):8.1f} ms")
+
+
+async def scenario(label: str, server: MockLLMServer, breaker: CircuitBreaker, args: argparse.Namespace) -> None:
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    agents.breaker = breaker
+    agents.parse_cache.clear()
+    await agents.open_llm_client()
+    report(label, await waves(args.waves, args.wave_size))
+    await agents.close_llm_client()
+    print(f"{'':<22} upstream requests {server.requests}, breaker trips {breaker.trips}, tiers {agents.tier_counts}")
+    for tier in agents.tier_counts:
+        agents.tier_counts[tier] = 0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--timeout", type=float, default=1.0, help="Client timeout in seconds.")
+    parser.add_argument("--waves", type=int, default=10)
+    parser.add_argument("--wave-size", type=int, default=10)
+    parser.add_argument("--hedge", type=float, default=0.2, help="Hedge budget in seconds.")
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_TIMEOUT"] = str(args.timeout)
+    never_trips = CircuitBreaker(min_calls=10**9)
+    with MockLLMServer(latency=args.timeout * 2, fail=True) as server:
+        await scenario("outage, no breaker", server, never_trips, args)
+    with MockLLMServer(latency=args.timeout * 2, fail=True) as server:
+        await scenario("outage, breaker", server, CircuitBreaker(open_seconds=args.timeout * 3), args)
+    # Slow but within the client timeout.
+    slow = min(args.hedge * 3, args.timeout * 0.8)
+    with MockLLMServer(latency=slow) as server:
+        await scenario("slow, not hedged", server, CircuitBreaker(slow_call_seconds=60), args)
+    os.environ["LLM_HEDGE_SECONDS"] = str(args.hedge)
+    with MockLLMServer(latency=slow) as server:
+        await scenario("slow, hedged", server, CircuitBreaker(slow_call_seconds=60), args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Per-call overhead of the request and repository instrumentation.
+
+Times `--calls` invocations of a trivial ASGI app with and without
+`MetricsMiddleware` around it, and of `InMemoryRepository.list_habits`
+(with `--habits` habits) with and without `instrument_repository`, and
+reports the added microseconds per call. With `--profile` the sampling
+profiler runs during the middleware timing, to show its cost on the
+event loop thread.
+
+Usage:
+    python -m benchmarks.bench_metrics --calls 100000
+    python -m benchmarks.bench_metrics --profile
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.metrics import MetricsMiddleware, SamplingProfiler, instrument_repository
+from app.repository import InMemoryRepository
+from app.schemas import HabitCreate
+
+_SCOPE = {"type": "http", "method": "GET", "path": "/bench"}
+
+
+async def _endpoint(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _send(message) -> None:
+    pass
+
+
+async def time_calls(call, calls: int) -> float:
+    """Microseconds per `await call()`."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        await call()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def run(args: argparse.Namespace) -> None:
+    profiler = SamplingProfiler() if args.profile else None
+    middleware = MetricsMiddleware(_endpoint, slow_seconds=1.0 if profiler else 0.0, profiler=profiler)
+    if profiler:
+        profiler.start()
+    bare = await time_calls(lambda: _endpoint(_SCOPE, None, _send), args.calls)
+    wrapped = await time_calls(lambda: middleware(dict(_SCOPE), None, _send), args.calls)
+    if profiler:
+        profiler.stop()
+    print(f"request middleware{' + profiler' if profiler else ''}: {bare:6.2f} -> {wrapped:6.2f} us/call (+{wrapped - bare:.2f})")
+
+    plain, timed = InMemoryRepository(), instrument_repository(InMemoryRepository())
+    for repo in (plain, timed):
+        for i in range(args.habits):
+            await repo.create_habit(HabitCreate(name=f"habit {i}", time_block="any", target_minutes=30))
+    before = await time_calls(plain.list_habits, args.calls)
+    after = await time_calls(timed.list_habits, args.calls)
+    print(f"repository list_habits ({args.habits} habits): {before:6.2f} -> {after:6.2f} us/call (+{after - before:.2f})")
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=50000)
+    parser.add_argument("--habits", type=int, default=20)
+    parser.add_argument("--profile", action="store_true", help="Run the sampling profiler meanwhile.")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,110 @@
+"""
+Benchmark `MongoRepository.compute_progress_bars` against the legacy loop.
+
+The legacy implementation listed every habit and then issued one
+`find_one` per habit on the `progress` collection (N+1 round trips). The
+aggregation path runs a single aggregation, and with `summary_reads`
+the bars come from cached habits plus one `daily_summary` lookup. This
+script seeds a scratch database on a local mongod, times every path and
+counts the commands each one sends to the server.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_progress_bars
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import date
+from typing import List
+
+from pymongo import monitoring
+
+from app.repository import MongoRepository
+from app.schemas import HabitCreate, ProgressBar, ProgressCreate
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Count commands sent to the server, grouped by command name."""
+
+    def __init__(self) -> None:
+        self.counts: dict = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self.counts[event.command_name] = self.counts.get(event.command_name, 0) + 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+    def reset(self) -> None:
+        self.counts = {}
+
+
+async def legacy_progress_bars(repo: MongoRepository, day: date) -> List[ProgressBar]:
+    """The pre-aggregation implementation, kept here for comparison."""
+    habits = await repo.list_habits()
+    bars: List[ProgressBar] = []
+    for habit in habits:
+        record = await repo._progress.find_one(
+            repo._progress_key(habit.id, day)
+        )
+        minutes = record["minutes"] if record else 0
+        ratio = min(minutes / habit.target_minutes, 1.0)
+        bars.append(ProgressBar(habit_id=habit.id, progress_ratio=ratio))
+    return bars
+
+
+async def timed(label: str, fn, rounds: int, counter: CommandCounter) -> List[ProgressBar]:
+    result = await fn()  # warm-up
+    counter.reset()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = await fn()
+    elapsed = (time.perf_counter() - start) / rounds
+    commands = {name: count // rounds for name, count in counter.counts.items()}
+    print(f"{label:<12} {elapsed * 1000:8.2f} ms/call  commands/call={commands}")
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--habits", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    monitoring.register(counter)
+    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    day = date.today()
+
+    for habit_count in args.habits:
+        repo = MongoRepository(mongo_uri, db_name="habit_app_bench")
+        await repo._client.drop_database("habit_app_bench")
+        for i in range(habit_count):
+            habit = await repo.create_habit(
+                HabitCreate(name=f"habit {i}", time_block="morning", target_minutes=30)
+            )
+            if i % 2 == 0:
+                await repo.record_progress(
+                    ProgressCreate(habit_id=habit.id, date=day, minutes=i % 45)
+                )
+
+        print(f"-- {habit_count} habits")
+        legacy = await timed("legacy loop", lambda: legacy_progress_bars(repo, day), args.rounds, counter)
+        current = await timed("aggregation", lambda: repo.compute_progress_bars(day), args.rounds, counter)
+        assert legacy == current, "aggregation result differs from legacy loop"
+        summary_repo = MongoRepository(mongo_uri, db_name="habit_app_bench", summary_reads=True)
+        summary = await timed("summary", lambda: summary_repo.compute_progress_bars(day), args.rounds, counter)
+        assert legacy == summary, "summary result differs from legacy loop"
+
+        await repo._client.drop_database("habit_app_bench")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
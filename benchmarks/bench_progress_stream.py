@@ -0,0 +1,169 @@
+"""
+Fan-out latency and memory per connection of `GET /progress/stream`.
+
+Starts the application under uvicorn in this process (in-memory
+repository), opens `--connections` Server-Sent Events streams over real
+sockets, then records progress `--writes` times. For every write it
+measures the time from sending `POST /progress` until each stream has
+received the resulting event, and reports percentiles over all of them.
+
+Memory is measured with `tracemalloc`, so it covers Python allocations
+only: first for bare broker subscriptions with a waiting reader each
+(the cost of an idle subscriber), then for the open HTTP streams. The
+second figure includes both the server and the client side of each
+connection, since both live in this process.
+
+Usage:
+    python -m benchmarks.bench_progress_stream --connections 2000 --writes 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import resource
+import socket
+import statistics
+import time
+import tracemalloc
+from datetime import date
+from typing import List
+
+import httpx
+import uvicorn
+
+from app import main
+from app.events import Broker
+from app.repository import InMemoryRepository
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def broker_memory(subscribers: int) -> float:
+    """Bytes allocated per idle subscription with a reader waiting on it."""
+    broker = Broker()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    readers = [
+        asyncio.ensure_future(_drain(broker.subscribe(), broker.keepalive)) for _ in range(subscribers)
+    ]
+    await asyncio.sleep(0.1)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    broker.close()
+    await asyncio.gather(*readers)
+    return (after - before) / subscribers
+
+
+async def _drain(subscription, keepalive: float) -> None:
+    async for _ in subscription.messages(keepalive):
+        pass
+
+
+class Stream:
+    """A raw SSE connection that timestamps each `progress` event it reads."""
+
+    def __init__(self) -> None:
+        self.received: List[float] = []
+        self._reader: asyncio.StreamReader = None
+        self._writer: asyncio.StreamWriter = None
+
+    async def connect(self, port: int) -> None:
+        self._reader, self._writer = await asyncio.open_connection("127.0.0.1", port)
+        self._writer.write(b"GET /progress/stream HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n")
+        await self._writer.drain()
+        await self._reader.readuntil(b"\r\n\r\n")
+
+    async def read(self) -> None:
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    return
+                if b"event: progress" in line:
+                    self.received.append(time.perf_counter())
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    per_subscriber = await broker_memory(args.connections)
+    print(f"broker: {per_subscriber / 1024:.2f} KiB per idle subscriber ({args.connections} subscribers)")
+
+    repo = InMemoryRepository()
+    main.app.dependency_overrides[main.get_repo] = lambda: repo
+    main.progress_events = Broker(max_pending=args.max_pending)
+    port = _free_port()
+    config = uvicorn.Config(main.app, port=port, log_level="warning", backlog=args.connections, lifespan="off")
+    server = uvicorn.Server(config)
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        habit = (
+            await client.post("/habits", json={"name": "reading", "time_block": "any", "target_minutes": 1000})
+        ).json()
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        streams = [Stream() for _ in range(args.connections)]
+        for offset in range(0, len(streams), 200):
+            await asyncio.gather(*(stream.connect(port) for stream in streams[offset : offset + 200]))
+        while main.progress_events.subscribers < args.connections:
+            await asyncio.sleep(0.01)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(
+            f"http:   {(after - before) / args.connections / 1024:.2f} KiB per open stream "
+            f"(server and client side, {args.connections} streams)"
+        )
+
+        readers = [asyncio.ensure_future(stream.read()) for stream in streams]
+        latencies: List[float] = []
+        sent: List[float] = []
+        today = date.today().isoformat()
+        for write in range(args.writes):
+            sent.append(time.perf_counter())
+            await client.post("/progress", json={"habit_id": habit["id"], "date": today, "minutes": write + 1})
+            while any(len(stream.received) <= write for stream in streams):
+                await asyncio.sleep(0.001)
+            latencies.extend((stream.received[write] - sent[write]) * 1000 for stream in streams)
+            await asyncio.sleep(args.pause)
+
+    for stream in streams:
+        stream.close()
+    await asyncio.gather(*readers)
+    server.should_exit = True
+    await serving
+
+    latencies.sort()
+    print(
+        f"fan-out to {args.connections} streams over {args.writes} writes: "
+        f"p50 {statistics.median(latencies):.1f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} ms  max {latencies[-1]:.1f} ms  "
+        f"dropped {main.progress_events.dropped}"
+    )
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds between writes.")
+    parser.add_argument("--max-pending", type=int, default=32)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
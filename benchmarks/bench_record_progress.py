@@ -0,0 +1,66 @@
+"""
+Round trips and latency of `MongoRepository.record_progress` with and without the habit cache.
+
+With `habit_cache_ttl=0` every write first looks its habit up in the
+`habits` collection, as the repository used to; with the cache enabled
+the habit comes from memory and the write costs two sequential round
+trips: the `findAndModify` upsert, then the `daily_summary` update that
+also advances the date's version token (statistics are only touched,
+alongside it, when a write flips the day's completion). Counts the
+commands sent per call and the mean latency against a local mongod.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_record_progress --writes 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import date
+
+from pymongo import monitoring
+
+from app.repository import MongoRepository
+from app.schemas import HabitCreate, ProgressCreate
+from benchmarks.bench_progress_bars import CommandCounter
+
+
+async def run(label: str, repo: MongoRepository, writes: int, counter: CommandCounter) -> None:
+    habits = [
+        await repo.create_habit(HabitCreate(name=f"habit {i}", time_block="morning", target_minutes=1000))
+        for i in range(10)
+    ]
+    day = date.today()
+    await repo.record_progress(ProgressCreate(habit_id=habits[0].id, date=day, minutes=1))  # warm-up
+    counter.reset()
+    start = time.perf_counter()
+    for i in range(writes):
+        await repo.record_progress(ProgressCreate(habit_id=habits[i % len(habits)].id, date=day, minutes=i % 60))
+    elapsed = (time.perf_counter() - start) / writes
+    commands = {name: round(count / writes, 2) for name, count in counter.counts.items()}
+    print(f"{label:<14} {elapsed * 1000:7.3f} ms/write  commands/write={commands}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writes", type=int, default=500)
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    monitoring.register(counter)
+    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    for label, ttl in (("no cache", 0.0), ("habit cache", 30.0)):
+        repo = MongoRepository(mongo_uri, db_name="habit_app_bench", habit_cache_ttl=ttl)
+        await repo._client.drop_database("habit_app_bench")
+        await repo.ensure_indexes()
+        await run(label, repo, args.writes, counter)
+        print(f"{'':<14} habit cache hits {repo.habit_cache.hits}, misses {repo.habit_cache.misses}")
+        await repo._client.drop_database("habit_app_bench")
+        await repo.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
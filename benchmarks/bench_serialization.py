@@ -0,0 +1,80 @@
+"""
+Cost of encoding list responses: FastAPI's validated path against direct encoding.
+
+For each row count, builds `HabitRead`, `ProgressRead` and `ProgressBar`
+lists as a repository would, then times FastAPI's response handling
+(`response_model` validation, JSON-compatible conversion and
+`JSONResponse` rendering) against `app.serialization`, checking that both
+produce the same bytes.
+
+Usage:
+    python -m benchmarks.bench_serialization --rows 10 100 1000 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.schemas import HabitRead, ProgressBar, ProgressRead
+from app.serialization import encode_bars, encode_habits, encode_progress
+
+
+async def timed(fn: Callable, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await fn()
+    return (time.perf_counter() - start) / rounds
+
+
+async def compare(label: str, model, items: List, encode: Callable, rounds: int) -> None:
+    field = create_response_field(name="response", type_=model)
+
+    async def validated() -> bytes:
+        return JSONResponse(await serialize_response(field=field, response_content=items)).body
+
+    async def direct() -> bytes:
+        return encode(items)
+
+    assert await validated() == await direct(), f"{label}: bodies differ"
+    before = await timed(validated, rounds)
+    after = await timed(direct, rounds)
+    print(
+        f"{label:<13} {len(items):6d} rows  validated {before * 1e6:10.1f} us  "
+        f"direct {after * 1e6:10.1f} us  x{before / after:.1f}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    start = date(2024, 1, 1)
+    for count in args.rows:
+        rounds = max(3, 20000 // count)
+        habits = [
+            HabitRead(id=f"{i:024x}", name=f"habit {i}", time_block="morning", target_minutes=30)
+            for i in range(count)
+        ]
+        entries = [
+            ProgressRead(habit_id=f"{i:024x}", date=start + timedelta(days=i % 366), minutes=i % 60, completed=i % 60 >= 30)
+            for i in range(count)
+        ]
+        bars = [ProgressBar(habit_id=f"{i:024x}", progress_ratio=min((i % 45) / 30, 1.0)) for i in range(count)]
+        await compare("HabitRead", List[HabitRead], habits, encode_habits, rounds)
+        await compare("ProgressRead", List[ProgressRead], entries, encode_progress, rounds)
+        await compare("ProgressBar", List[ProgressBar], bars, encode_bars, rounds)
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
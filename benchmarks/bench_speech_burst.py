@@ -0,0 +1,84 @@
+"""
+A burst of `/speech` requests against the mock LLM: upstream calls and 429s.
+
+Fires `--requests` concurrent voice notes, drawn from `--distinct`
+different transcripts, at the application (in process, in-memory
+repository) while the mock model answers with `--latency` seconds of
+delay. Reports how many model calls were made once identical parses were
+coalesced, how many requests were turned away with 429, and the latency
+of the accepted ones. The local parsing tier is disabled so that every
+parse needs the model; repeated transcripts may still be answered by
+the parse cache once the first copy has finished.
+
+Usage:
+    python -m benchmarks.bench_speech_burst --requests 300 --distinct 20 --latency 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from typing import List, Tuple
+
+import httpx
+
+from app import agents, main
+from app.jobs import JobQueue
+from app.repository import InMemoryRepository
+from benchmarks.mock_llm import MockLLMServer
+
+
+async def post(client: httpx.AsyncClient, text: str) -> Tuple[int, float]:
+    start = time.perf_counter()
+    resp = await client.post("/speech", json={"text": text})
+    return resp.status_code, (time.perf_counter() - start) * 1000
+
+
+async def run(args: argparse.Namespace) -> None:
+    repo = InMemoryRepository()
+    main.app.dependency_overrides[main.get_repo] = lambda: repo
+    main.speech_jobs = JobQueue(max_concurrency=args.concurrency, max_queue=args.queue)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in ("reading", "meditation", "deep work"):
+            await client.post("/habits", json={"name": name, "time_block": "any", "target_minutes": 10_000})
+        texts = [f"did some reading and felt good, take {n}" for n in range(args.distinct)]
+        await agents.open_llm_client()
+        rng = random.Random(0)
+        results: List[Tuple[int, float]] = await asyncio.gather(
+            *(post(client, rng.choice(texts)) for _ in range(args.requests))
+        )
+        await agents.close_llm_client()
+    ok = [ms for status, ms in results if status == 200]
+    rejected = sum(1 for status, _ in results if status == 429)
+    print(
+        f"requests {args.requests}  accepted {len(ok)}  rejected(429) {rejected}  "
+        f"coalesced parses {main.speech_parses.coalesced}  cache hits {agents.parse_cache.hits}"
+    )
+    if ok:
+        print(f"accepted latency median {statistics.median(ok):.1f} ms  max {max(ok):.1f} ms")
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--distinct", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--queue", type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["LLM_LOCAL_FIRST"] = "0"
+    with MockLLMServer(latency=args.latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        asyncio.run(run(args))
+        print(f"upstream model calls {server.requests}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,104 @@
+"""
+Micro-benchmark of `parse_speech_text` against the per-habit scan it replaced.
+
+The legacy parser walked the whole transcript once per habit and ran an
+uncompiled regular expression on every candidate number, so its cost was
+O(habits x words). The current parser tokenizes once and finds every
+habit name in a single pass of a cached Aho-Corasick automaton. This
+script times both over habit lists of 1 to 500 names and short and long
+transcripts, and reports the one-off cost of building the automaton.
+
+Usage:
+    python -m benchmarks.bench_speech_parser --habits 1 10 50 100 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, Dict, List
+
+from app.schemas import HabitRead
+from app.utils import HabitMatcher, habit_matcher, parse_speech_text
+
+WORDS = "did some then and for about minutes mins today also quick session after lunch".split()
+
+
+def legacy_parse_speech_text(text: str, habits: List[HabitRead]) -> Dict[str, int]:
+    """The pre-automaton implementation, kept here for comparison."""
+    result: Dict[str, int] = {}
+    tokens = re.split(r"\s+", text.lower())
+    for habit in habits:
+        name_tokens = habit.name.lower().split()
+        for idx, token in enumerate(tokens):
+            if token == name_tokens[0]:
+                end_idx = idx + len(name_tokens)
+                if tokens[idx:end_idx] == name_tokens:
+                    minutes = None
+                    for t in tokens[end_idx : end_idx + 5]:
+                        m = re.match(r"(\d+)(?:min|mins|minutes)?", t)
+                        if m:
+                            minutes = int(m.group(1))
+                            break
+                    if minutes is None:
+                        for t in reversed(tokens[max(idx - 5, 0) : idx]):
+                            m = re.match(r"(\d+)(?:min|mins|minutes)?", t)
+                            if m:
+                                minutes = int(m.group(1))
+                                break
+                    result[habit.id] = minutes if minutes is not None else habit.target_minutes
+                    break
+    return result
+
+
+def make_habits(count: int) -> List[HabitRead]:
+    return [
+        HabitRead(id=str(i), name=f"habit{i} practice", time_block="morning", target_minutes=30)
+        for i in range(count)
+    ]
+
+
+def make_transcript(habits: List[HabitRead], words: int, rng: random.Random) -> str:
+    tokens: List[str] = []
+    while len(tokens) < words:
+        if rng.random() < 0.2:
+            tokens += [rng.choice(habits).name, str(rng.randint(5, 60)), "minutes"]
+        else:
+            tokens.append(rng.choice(WORDS))
+    return " ".join(tokens)
+
+
+def per_call(fn: Callable[[], object], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--habits", type=int, nargs="+", default=[1, 10, 50, 100, 500])
+    parser.add_argument("--words", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'habits':>6} {'words':>6} {'legacy us':>10} {'current us':>11} {'speedup':>8} {'build us':>9}")
+    for count in args.habits:
+        habits = make_habits(count)
+        names = tuple(habit.name for habit in habits)
+        build = per_call(lambda: HabitMatcher(names), max(1, args.rounds // 20))
+        habit_matcher(names)  # warm the cache, as a running server would
+        for words in args.words:
+            text = make_transcript(habits, words, rng)
+            # Stemming broadens matches; on this corpus both parsers agree.
+            assert legacy_parse_speech_text(text, habits) == parse_speech_text(text, habits)
+            legacy = per_call(lambda: legacy_parse_speech_text(text, habits), args.rounds)
+            current = per_call(lambda: parse_speech_text(text, habits), args.rounds)
+            print(f"{count:>6} {words:>6} {legacy:>10.1f} {current:>11.1f} {legacy / current:>7.1f}x {build:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
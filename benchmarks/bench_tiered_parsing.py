@@ -0,0 +1,104 @@
+"""
+Model calls, latency and accuracy of tiered speech parsing.
+
+Replays a labelled corpus of transcripts through `parse_habits_with_ai`
+twice against the mock LLM server: once with every transcript sent to
+the model (`LLM_LOCAL_FIRST=0`) and once with the local parser answering
+the unambiguous ones. The mock server acts as an oracle that returns the
+labelled answer, so the model-only run is 100% accurate by construction
+and any drop in the tiered run is a transcript the local tier got wrong.
+The parse cache is cleared before every call so it does not hide calls.
+
+Usage:
+    python -m benchmarks.bench_tiered_parsing --latency 0.4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from app import agents
+from app.schemas import HabitRead
+from benchmarks.mock_llm import MockLLMServer
+
+HABITS = [
+    HabitRead(id="1", name="meditation", time_block="morning", target_minutes=15),
+    HabitRead(id="2", name="reading", time_block="evening", target_minutes=30),
+    HabitRead(id="3", name="deep work", time_block="afternoon", target_minutes=90),
+    HabitRead(id="4", name="yoga", time_block="morning", target_minutes=20),
+]
+
+# (transcript, expected minutes by habit name); unnamed habits expect 0.
+CORPUS: List[Tuple[str, Dict[str, int]]] = [
+    ("meditation 10 minutes", {"meditation": 10}),
+    ("Did 25 minutes of yoga.", {"yoga": 25}),
+    ("reading for 30 mins", {"reading": 30}),
+    ("deep work 45 minutes and reading 20 minutes", {"deep work": 45, "reading": 20}),
+    ("yoga 15 minutes, meditation 5 minutes", {"yoga": 15, "meditation": 5}),
+    ("spent 60 minutes on deep work today", {"deep work": 60}),
+    ("another 10 minutes of reading", {"reading": 10}),
+    ("20min yoga", {"yoga": 20}),
+    ("meditation for 12 minutes then yoga for 18 minutes", {"meditation": 12, "yoga": 18}),
+    ("i did deep work for 90 minutes", {"deep work": 90}),
+    ("reading 40 minutes", {"reading": 40}),
+    ("yoga 30 minutes", {"yoga": 30}),
+    # Ambiguous: these need the model.
+    ("finished meditation", {"meditation": 15}),
+    ("meditated for ten minutes", {"meditation": 10}),
+    ("read a couple of chapters for half an hour", {"reading": 30}),
+    ("done with yoga and 20 minutes of reading", {"yoga": 20, "reading": 20}),
+    ("worked deeply for two hours", {"deep work": 120}),
+    ("some yoga and meditation, about 10 minutes each", {"yoga": 10, "meditation": 10}),
+    ("reading 30", {"reading": 30}),
+    ("went for a run", {}),
+]
+
+
+def expected_ids(expected: Dict[str, int]) -> Dict[str, int]:
+    return {habit.id: expected.get(habit.name, 0) for habit in HABITS}
+
+
+async def replay(local_first: bool) -> Tuple[List[float], int]:
+    os.environ["LLM_LOCAL_FIRST"] = "1" if local_first else "0"
+    latencies: List[float] = []
+    correct = 0
+    for text, expected in CORPUS:
+        agents.parse_cache.clear()
+        start = time.perf_counter()
+        result = await agents.parse_habits_with_ai(text, HABITS, {})
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += result == expected_ids(expected)
+    return latencies, correct
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.4, help="Mock model latency in seconds.")
+    args = parser.parse_args()
+
+    answers = {text: expected for text, expected in CORPUS}
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    with MockLLMServer(latency=args.latency, answers=answers) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        await agents.open_llm_client()
+        for label, local_first in (("model only", False), ("tiered", True)):
+            server.reset_counters()
+            before = dict(agents.tier_counts)
+            latencies, correct = await replay(local_first)
+            tiers = {name: agents.tier_counts[name] - before[name] for name in before}
+            print(
+                f"{label:<11} calls {server.requests:3d}/{len(CORPUS)}  "
+                f"tokens {server.prompt_tokens + server.completion_tokens:6d}  "
+                f"median {statistics.median(latencies):7.2f} ms  mean {statistics.mean(latencies):7.2f} ms  "
+                f"accuracy {correct}/{len(CORPUS)}  tiers {tiers}"
+            )
+        await agents.close_llm_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""
+A local stand-in for the OpenAI chat completions endpoint.
+
+Runs a small ASGI app under uvicorn on a background thread. It answers
+`POST /v1/chat/completions` the way the real model is prompted to: the
+user message's `summary` (or list of `summaries`) is parsed with the
+local heuristic parser and returned as JSON keyed by habit name. An
+artificial latency and an outage mode make it usable for latency and
+resilience benchmarks; request and token counters make it usable for
+cost comparisons. Passing `answers` (summary -> {habit name: minutes})
+turns it into an oracle for accuracy benchmarks: known summaries get the
+given answer instead of the heuristic one.
+
+Usage from a benchmark:
+
+    with MockLLMServer(latency=0.2) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+
+from app.schemas import HabitRead
+from app.utils import parse_speech_text
+
+
+def _count_tokens(text: str) -> int:
+    """Rough token count (about four characters per token, as for English)."""
+    return max(1, len(text) // 4)
+
+
+class MockLLMServer:
+    """Threaded uvicorn server imitating the chat completions API."""
+
+    def __init__(
+        self, latency: float = 0.0, fail: bool = False, answers: Optional[Dict[str, Dict[str, int]]] = None
+    ) -> None:
+        self.latency = latency
+        self.answers = answers or {}
+        # When set, every request hangs for `latency` and then fails with 503.
+        self.fail = fail
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        config = uvicorn.Config(
+            self._app, interface="asgi3", lifespan="off", log_level="warning", access_log=False
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._sock]}, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._sock.getsockname()
+        return f"http://{host}:{port}/v1"
+
+    def reset_counters(self) -> None:
+        self.requests = self.prompt_tokens = self.completion_tokens = 0
+
+    def __enter__(self) -> "MockLLMServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+    def _answer(self, payload: Dict[str, Any]) -> str:
+        user = json.loads(payload["messages"][-1]["content"])
+        habits = [
+            HabitRead(id=habit["name"], name=habit["name"], time_block="any", target_minutes=habit["target_minutes"])
+            for habit in user["habits"]
+        ]
+
+        def parse(text: str) -> Dict[str, int]:
+            if text in self.answers:
+                return self.answers[text]
+            return parse_speech_text(text, habits)
+
+        if "summaries" in user:
+            results: List[Dict[str, int]] = [parse(text) for text in user["summaries"]]
+            return json.dumps({"results": results})
+        return json.dumps(parse(user["summary"]))
+
+    async def _app(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail:
+            await send({"type": "http.response.start", "status": 503, "headers": []})
+            await send({"type": "http.response.body", "body": b"upstream unavailable"})
+            return
+        payload = json.loads(body)
+        content = self._answer(payload)
+        prompt_tokens = sum(_count_tokens(message["content"]) for message in payload["messages"])
+        completion_tokens = _count_tokens(content)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        response = json.dumps(
+            {
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+            }
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": response})
@@ -3,7 +3,8 @@
  *
  * This script handles fetching and creating habits, displaying progress
  * bars, and sending speech or text summaries to the API. The UI
- * updates automatically after each operation.
+ * updates automatically after each operation, and progress recorded from
+ * any device is pushed over `/progress/stream` (Server-Sent Events).
  */
 
 const habitContainer = document.getElementById('habits-container');
@@ -64,6 +65,7 @@ async function renderHabits() {
     progressBar.className = 'progress-bar';
     const progressFill = document.createElement('div');
     progressFill.className = 'progress-fill';
+    progressFill.dataset.habitId = habit.id;
     progressFill.style.width = `${ratio * 100}%`;
     progressBar.appendChild(progressFill);
     item.appendChild(header);
@@ -72,6 +74,41 @@ async function renderHabits() {
   });
 }
 
+// Live progress updates. The browser reconnects on its own when the
+// stream drops; a `reset` event means updates were missed, so refetch.
+let progressStream = null;
+
+function connectProgressStream() {
+  if (!window.EventSource) return;
+  progressStream = new EventSource('/progress/stream');
+  progressStream.addEventListener('progress', (event) => {
+    const delta = JSON.parse(event.data);
+    const today = new Date().toISOString().split('T')[0];
+    if (delta.date !== today) return;
+    delta.bars.forEach((bar) => {
+      const fill = habitContainer.querySelector(`.progress-fill[data-habit-id="${bar.habit_id}"]`);
+      if (fill) {
+        fill.style.width = `${bar.progress_ratio * 100}%`;
+      } else {
+        // A habit created elsewhere; render it.
+        renderHabits();
+      }
+    });
+  });
+  progressStream.addEventListener('reset', () => renderHabits());
+  // Refetch after reconnecting, in case updates were missed meanwhile. The
+  // first connection needs no refetch: the page has just rendered.
+  let connected = false;
+  progressStream.addEventListener('open', () => {
+    if (connected) renderHabits();
+    connected = true;
+  });
+}
+
+function progressStreamOpen() {
+  return progressStream !== null && progressStream.readyState === EventSource.OPEN;
+}
+
 // Handle habit form submission
 habitForm.addEventListener('submit', async (e) => {
   e.preventDefault();
@@ -260,8 +297,12 @@ submitSpeechBtn.addEventListener('click', async () => {
   await submitSpeech(text);
   speechTextArea.value = '';
   speechStatus.textContent = 'Progress updated!';
-  await renderHabits();
+  // With the stream open, the new bars arrive as a push.
+  if (!progressStreamOpen()) {
+    await renderHabits();
+  }
 });
 
-// Initial render
-renderHabits();
\ No newline at end of file
+// Initial render (repeated when the progress stream opens)
+renderHabits();
+connectProgressStream();
\ No newline at end of file
@@ -10,8 +10,10 @@
 
 const CACHE_NAME = 'habit-tracker-cache-v1';
 
-// List of assets to cache. We include the root path, CSS/JS,
-// manifest and icons. When adding new static files, update this list.
+// List of assets to cache. Both constants are regenerated from the
+// asset manifest when this file is served (see app/assets.py): the list
+// names the content-hashed URLs of the current deploy, and the cache name
+// changes whenever any asset does.
 const ASSETS_TO_CACHE = [
   '/',
   '/static/styles.css',
@@ -47,6 +49,10 @@ self.addEventListener('activate', (event) => {
 
 // Intercept fetch requests and respond with cache when available
 self.addEventListener('fetch', (event) => {
+  // Leave the live progress stream to the network.
+  if (new URL(event.request.url).pathname === '/progress/stream') {
+    return;
+  }
   event.respondWith(
     caches.match(event.request).then((response) => {
       // Cache hit - return response or fetch from network
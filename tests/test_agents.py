@@ -0,0 +1,122 @@
+"""
+Tests for the LLM client plumbing in `app.agents`.
+
+The upstream API is replaced with `httpx.MockTransport`, so no network
+access is needed.
+"""
+
+import asyncio
+import json
+import os
+import unittest
+
+import httpx
+
+from app import agents
+from app.schemas import HabitRead
+
+HABITS = [HabitRead(id="1", name="reading", time_block="evening", target_minutes=30)]
+
+
+def completion(content: dict) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(content)}}]})
+
+
+class PooledClientTests(unittest.IsolatedAsyncioTestCase):
+    """The shared client is reused across calls and closed on shutdown."""
+
+    async def asyncSetUp(self):
+        os.environ["OPENAI_API_KEY"] = "test"
+        self.requests = []
+        self.answer = {"reading": 12}
+        self.status = 200
+        self.delay = 0.0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            await asyncio.sleep(self.delay)
+            if self.status != 200:
+                return httpx.Response(self.status)
+            return completion(self.answer)
+
+        agents.parse_cache.clear()
+        agents.breaker.reset()
+        await agents.open_llm_client()
+        # Swap the transport so the pooled client talks to the handler.
+        agents._client._transport = httpx.MockTransport(handler)
+
+    async def asyncTearDown(self):
+        await agents.close_llm_client()
+        os.environ.pop("OPENAI_API_KEY", None)
+        os.environ.pop("LLM_HEDGE_SECONDS", None)
+        agents.breaker.reset()
+
+    async def test_calls_share_the_pooled_client(self):
+        client = agents._client
+        for attempt in range(3):
+            text = f"read 12 minutes, attempt {attempt}"
+            self.assertEqual(await agents.parse_habits_with_ai(text, HABITS, {}), {"1": 12})
+        self.assertEqual(len(self.requests), 3)
+        self.assertIs(agents._client, client)
+        self.assertTrue(str(self.requests[0].url).endswith("/chat/completions"))
+        await agents.open_llm_client()  # idempotent
+        self.assertIs(agents._client, client)
+        await agents.close_llm_client()
+        self.assertTrue(client.is_closed)
+
+
+    async def test_repeated_transcripts_are_served_from_cache(self):
+        hits = agents.parse_cache.hits
+        for _ in range(3):
+            self.assertEqual(await agents.parse_habits_with_ai("Read 12 minutes!", HABITS, {}), {"1": 12})
+        self.assertEqual(await agents.parse_habits_with_ai("read  12 minutes", HABITS, {}), {"1": 12})
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(agents.parse_cache.hits - hits, 3)
+
+    async def test_unambiguous_transcripts_skip_the_model(self):
+        local = agents.tier_counts["local"]
+        self.assertEqual(await agents.parse_habits_with_ai("reading for 20 minutes", HABITS, {}), {"1": 20})
+        self.assertEqual(self.requests, [])
+        self.assertEqual(agents.tier_counts["local"] - local, 1)
+        # An inflected name needs the model.
+        self.assertEqual(await agents.parse_habits_with_ai("read a bit", HABITS, {}), {"1": 12})
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_batch_uses_one_call_and_accumulates_in_order(self):
+        self.answer = {"results": [{"reading": 5}, {"reading": 18}, {"reading": 2}]}
+        texts = ["reading for 10 minutes", "read a bit", "finished reading", "reading for 3 minutes"]
+        results = await agents.parse_habits_batch_with_ai(texts, HABITS, {"1": 1})
+        # The first note is answered locally; the rest go out together and
+        # the last one's confident local answer wins over the model's.
+        self.assertEqual(results, [{"1": 10}, {"1": 5}, {"1": 18}, {"1": 3}])
+        self.assertEqual(len(self.requests), 1)
+        sent = json.loads(json.loads(self.requests[0].content)["messages"][-1]["content"])
+        self.assertEqual(sent["summaries"], texts[1:])
+        self.assertEqual(sent["existing_progress"], {"reading": 11})
+
+    async def test_batch_falls_back_on_malformed_answers(self):
+        self.answer = {"results": [{"reading": 5}]}
+        results = await agents.parse_habits_batch_with_ai(["read 4", "finished reading"], HABITS, {})
+        self.assertEqual(results, [{"1": 4}, {"1": 30}])
+
+    async def test_open_breaker_skips_the_model(self):
+        self.status = 503
+        for attempt in range(agents.breaker.min_calls):
+            await agents.parse_habits_with_ai(f"read {attempt}", HABITS, {})
+        self.assertEqual(agents.breaker.state, "open")
+        calls = len(self.requests)
+        self.assertEqual(await agents.parse_habits_with_ai("read 7", HABITS, {}), {"1": 7})
+        self.assertEqual(len(self.requests), calls)
+
+    async def test_slow_model_is_hedged_with_the_heuristic(self):
+        os.environ["LLM_HEDGE_SECONDS"] = "0.01"
+        self.delay = 0.2
+        self.assertEqual(await agents.parse_habits_with_ai("read 4", HABITS, {}), {"1": 4})
+        self.assertEqual(len(self.requests), 1)
+        # The abandoned call still completes and fills the cache.
+        await asyncio.sleep(0.3)
+        self.assertEqual(await agents.parse_habits_with_ai("read 4", HABITS, {}), {"1": 12})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,12 +7,16 @@ external dependencies. The asynchronous endpoints are exercised via
 """
 
 import asyncio
+import json
 import unittest
 from datetime import date
 import os
 
 import httpx
 
+from app import main
+from app.events import Broker
+from app.jobs import JobQueue
 from app.main import app, get_repo
 from app.repository import InMemoryRepository
 
@@ -71,6 +75,119 @@ class HabitTrackerTests(unittest.IsolatedAsyncioTestCase):
         expected_ratio = 20 / 30
         self.assertAlmostEqual(bars[0]["progress_ratio"], expected_ratio, places=3)
 
+    async def test_conditional_reads(self):
+        resp = await self.client.post(
+            "/habits", json={"name": "Reading", "time_block": "evening", "target_minutes": 30}
+        )
+        habit_id = resp.json()["id"]
+        today = date.today().isoformat()
+        for path in ("/habits", f"/progress/{today}", f"/progress/bars/{today}"):
+            first = await self.client.get(path)
+            etag = first.headers["etag"]
+            self.assertEqual(first.headers["cache-control"], "no-cache")
+            unchanged = await self.client.get(path, headers={"If-None-Match": etag})
+            self.assertEqual(unchanged.status_code, 304)
+            self.assertEqual(unchanged.content, b"")
+            self.assertEqual(unchanged.headers["etag"], etag)
+        bars_etag = (await self.client.get(f"/progress/bars/{today}")).headers["etag"]
+        await self.client.post("/progress", json={"habit_id": habit_id, "date": today, "minutes": 15})
+        resp = await self.client.get(f"/progress/bars/{today}", headers={"If-None-Match": bars_etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), [{"habit_id": habit_id, "progress_ratio": 0.5}])
+
+    async def test_bulk_progress(self):
+        resp = await self.client.post(
+            "/habits",
+            json={"name": "Stretch", "time_block": "morning", "target_minutes": 10},
+        )
+        habit_id = resp.json()["id"]
+        items = [
+            {"habit_id": habit_id, "date": "2024-01-01", "minutes": 10},
+            {"habit_id": "nope", "date": "2024-01-01", "minutes": 10},
+            {"habit_id": habit_id, "date": "2024-01-02", "minutes": 3},
+        ]
+        resp = await self.client.post("/progress/bulk", json=items)
+        self.assertEqual(resp.status_code, 200)
+        results = resp.json()
+        self.assertTrue(results[0]["progress"]["completed"])
+        self.assertIsNone(results[1]["progress"])
+        self.assertIn("not found", results[1]["error"])
+        self.assertEqual(results[2]["progress"]["minutes"], 3)
+        resp = await self.client.post("/progress/bulk", json=items[:1] * 1001)
+        self.assertEqual(resp.status_code, 400)
+
+    async def test_progress_range_grouped_by_day(self):
+        resp = await self.client.post(
+            "/habits",
+            json={"name": "Yoga", "time_block": "morning", "target_minutes": 20},
+        )
+        habit_id = resp.json()["id"]
+        for day, minutes in (("2024-03-01", 10), ("2024-03-03", 25), ("2024-04-01", 5)):
+            await self.client.post(
+                "/progress",
+                json={"habit_id": habit_id, "date": day, "minutes": minutes},
+            )
+        resp = await self.client.get("/progress", params={"from": "2024-03-01", "to": "2024-03-31"})
+        self.assertEqual(resp.status_code, 200)
+        days = resp.json()
+        self.assertEqual(len(days), 31)
+        self.assertEqual(days[0]["date"], "2024-03-01")
+        self.assertEqual([e["minutes"] for e in days[0]["entries"]], [10])
+        self.assertEqual(days[1]["entries"], [])
+        self.assertTrue(days[2]["entries"][0]["completed"])
+        self.assertEqual(sum(len(day["entries"]) for day in days), 2)
+        # Reversed and oversized ranges are rejected
+        resp = await self.client.get("/progress", params={"from": "2024-03-31", "to": "2024-03-01"})
+        self.assertEqual(resp.status_code, 400)
+        resp = await self.client.get("/progress", params={"from": "2023-01-01", "to": "2024-12-31"})
+        self.assertEqual(resp.status_code, 400)
+
+    async def test_habit_stats(self):
+        resp = await self.client.post(
+            "/habits",
+            json={"name": "Journal", "time_block": "night", "target_minutes": 10},
+        )
+        habit_id = resp.json()["id"]
+        for day in ("2024-05-01", "2024-05-02", "2024-05-03", "2024-05-05", "2024-05-06"):
+            await self.client.post(
+                "/progress",
+                json={"habit_id": habit_id, "date": day, "minutes": 10},
+            )
+        resp = await self.client.get(f"/habits/{habit_id}/stats", params={"as_of": "2024-05-06"})
+        self.assertEqual(resp.status_code, 200)
+        stats = resp.json()
+        self.assertEqual(stats["current_streak"], 2)
+        self.assertEqual(stats["longest_streak"], 3)
+        self.assertAlmostEqual(stats["completion_rate_7d"], 5 / 7)
+        resp = await self.client.get("/habits/unknown/stats")
+        self.assertEqual(resp.status_code, 404)
+
+    async def test_progress_heatmap_matches_bars(self):
+        ids = []
+        for name, target in (("Piano", 20), ("Run", 40)):
+            resp = await self.client.post(
+                "/habits",
+                json={"name": name, "time_block": "evening", "target_minutes": target},
+            )
+            ids.append(resp.json()["id"])
+        writes = (("2024-01-01", 0, 10), ("2024-02-29", 1, 50), ("2024-12-31", 0, 20), ("2024-12-31", 1, 13))
+        for day, habit, minutes in writes:
+            await self.client.post(
+                "/progress",
+                json={"habit_id": ids[habit], "date": day, "minutes": minutes},
+            )
+        resp = await self.client.get("/progress/heatmap/2024")
+        self.assertEqual(resp.status_code, 200)
+        heatmap = resp.json()
+        self.assertEqual(heatmap["habit_ids"], ids)
+        self.assertEqual(len(heatmap["ratios"]), 366)  # leap year
+        start = date(2024, 1, 1)
+        for day, _, _ in writes:
+            row = (date.fromisoformat(day) - start).days
+            bars = (await self.client.get(f"/progress/bars/{day}")).json()
+            self.assertEqual(heatmap["ratios"][row], [bar["progress_ratio"] for bar in bars])
+        self.assertEqual(heatmap["ratios"][1], [0.0, 0.0])
+
     async def test_speech_parsing(self):
         # Create two habits
         resp1 = await self.client.post(
@@ -110,6 +227,18 @@ class HabitTrackerTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(resp_sw.status_code, 200)
         self.assertIn("javascript", resp_sw.headers.get("content-type"))
 
+    async def test_static_assets_answer_head(self):
+        """HEAD returns the headers of a GET without the body."""
+        get = await self.client.get("/service-worker.js")
+        head = await self.client.head("/service-worker.js")
+        self.assertEqual(head.status_code, 200)
+        self.assertEqual(head.content, b"")
+        self.assertEqual(head.headers["etag"], get.headers["etag"])
+        self.assertEqual(head.headers["content-length"], get.headers["content-length"])
+        ranged = await self.client.head("/service-worker.js", headers={"Range": "bytes=0-9"})
+        self.assertEqual(ranged.status_code, 206)
+        self.assertEqual((ranged.content, ranged.headers["content-length"]), (b"", "10"))
+
     async def test_ai_parser_fallback(self):
         """Test that the AI parser falls back to heuristic when no API key is set."""
         # No OPENAI_API_KEY set in environment; ensure fallback output matches utils parser
@@ -154,8 +283,9 @@ class HabitTrackerTests(unittest.IsolatedAsyncioTestCase):
         for i, phrase in enumerate(completion_phrases):
             # Reset progress for each test
             today = date.today()
-            if habit_id in self.repo._progress:
-                self.repo._progress[habit_id].pop(today, None)
+            await self.client.post(
+                "/progress", json={"habit_id": habit_id, "date": today.isoformat(), "minutes": 0}
+            )
             
             resp = await self.client.post("/speech", json={"text": phrase})
             self.assertEqual(resp.status_code, 200)
@@ -205,6 +335,110 @@ class HabitTrackerTests(unittest.IsolatedAsyncioTestCase):
         self.assertGreaterEqual(entries[0]["minutes"], 60)  # At least target completed
         self.assertTrue(entries[0]["completed"])
 
+    async def test_concurrent_speech_submissions_accumulate(self):
+        """Concurrent voice notes must not overwrite each other's minutes."""
+        os.environ.pop("OPENAI_API_KEY", None)
+        await self.client.post(
+            "/habits",
+            json={"name": "Deep work", "time_block": "morning", "target_minutes": 600},
+        )
+        responses = await asyncio.gather(
+            *(self.client.post("/speech", json={"text": "deep work 5 minutes"}) for _ in range(20))
+        )
+        self.assertTrue(all(resp.status_code == 200 for resp in responses))
+        entries = (await self.client.get(f"/progress/{date.today().isoformat()}")).json()
+        self.assertEqual(entries[0]["minutes"], 100)
+
+    async def test_async_speech_job(self):
+        os.environ.pop("OPENAI_API_KEY", None)
+        await self.client.post(
+            "/habits",
+            json={"name": "Deep work", "time_block": "morning", "target_minutes": 60},
+        )
+        resp = await self.client.post("/speech", params={"async": "1"}, json={"text": "deep work 20 minutes"})
+        self.assertEqual(resp.status_code, 202)
+        job_id = resp.json()["id"]
+        for _ in range(100):
+            job = (await self.client.get(f"/speech/jobs/{job_id}")).json()
+            if job["status"] == "done":
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"][0]["minutes"], 20)
+        self.assertEqual((await self.client.get("/speech/jobs/unknown")).status_code, 404)
+
+    async def test_speech_batch_applies_notes_in_order(self):
+        os.environ.pop("OPENAI_API_KEY", None)
+        await self.client.post(
+            "/habits",
+            json={"name": "Deep work", "time_block": "morning", "target_minutes": 60},
+        )
+        resp = await self.client.post(
+            "/speech/batch", json={"texts": ["deep work 20 minutes", "nothing", "deep work 45 minutes"]}
+        )
+        self.assertEqual(resp.status_code, 200)
+        batches = resp.json()
+        self.assertEqual([[entry["minutes"] for entry in entries] for entries in batches], [[20], [], [65]])
+        self.assertTrue(batches[2][0]["completed"])
+        resp = await self.client.post("/speech/batch", json={"texts": ["x"] * (main.MAX_BATCH_TRANSCRIPTS + 1)})
+        self.assertEqual(resp.status_code, 400)
+
+    async def test_speech_backpressure(self):
+        queue = JobQueue(max_concurrency=1, max_queue=0)
+        original, main.speech_jobs = main.speech_jobs, queue
+        release = asyncio.Event()
+        try:
+            blocker = queue.submit(release.wait)
+            resp = await self.client.post("/speech", json={"text": "deep work 20 minutes"})
+            self.assertEqual(resp.status_code, 429)
+            self.assertGreaterEqual(int(resp.headers["retry-after"]), 1)
+            release.set()
+            await blocker.wait()
+            resp = await self.client.post("/speech", json={"text": "deep work 20 minutes"})
+            self.assertEqual(resp.status_code, 200)
+        finally:
+            main.speech_jobs = original
+
+    async def test_progress_stream_pushes_changed_bars(self):
+        broker = Broker()
+        original, main.progress_events = main.progress_events, broker
+        try:
+            resp = await self.client.post(
+                "/habits", json={"name": "Reading", "time_block": "evening", "target_minutes": 40}
+            )
+            habit_id = resp.json()["id"]
+            stream = asyncio.ensure_future(self.client.get("/progress/stream"))
+            while not broker.subscribers:
+                await asyncio.sleep(0.01)
+            today = date.today().isoformat()
+            await self.client.post("/progress", json={"habit_id": habit_id, "date": today, "minutes": 10})
+            await self.client.post("/speech", json={"text": "reading 30 minutes"})
+            broker.close()
+            resp = await stream
+        finally:
+            main.progress_events = original
+        self.assertEqual(resp.headers["content-type"], "text/event-stream; charset=utf-8")
+        events = [block.splitlines() for block in resp.text.split("\n\n") if block]
+        self.assertEqual([lines[0] for lines in events], ["event: progress"] * 2)
+        deltas = [json.loads(lines[1][len("data: "):]) for lines in events]
+        self.assertEqual(
+            deltas,
+            [
+                {"date": today, "bars": [{"habit_id": habit_id, "progress_ratio": 0.25}]},
+                {"date": today, "bars": [{"habit_id": habit_id, "progress_ratio": 1.0}]},
+            ],
+        )
+        self.assertEqual(broker.subscribers, 0)
+
+    async def test_metrics_exposes_request_latency_by_route(self):
+        await self.client.get("/habits")
+        resp = await self.client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["content-type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/habits",status="200"}', resp.text)
+        self.assertIn('cache_hit_ratio{cache="parse"}', resp.text)
+        self.assertIn("# TYPE speech_parse_tier_total counter", resp.text)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
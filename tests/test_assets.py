@@ -0,0 +1,105 @@
+"""
+Tests for the hashed, precompressed frontend assets in `app.assets`.
+"""
+
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from starlette.requests import Request
+
+from app.assets import IMMUTABLE, REVALIDATE, _default_build_dir, build_assets, serve
+
+INDEX = '<link rel="stylesheet" href="/static/app.css" /><script src="/static/app.js"></script>'
+SERVICE_WORKER = "const CACHE_NAME = 'habit-tracker-cache-v1';\nconst ASSETS_TO_CACHE = [\n  '/'\n];\n"
+
+
+def request(**headers):
+    scope_headers = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": scope_headers})
+
+
+class AssetTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmpdir.name, "frontend")
+        os.makedirs(os.path.join(self.source, "models"))
+        files = {
+            "index.html": INDEX,
+            "manifest.json": "{}",
+            "service-worker.js": SERVICE_WORKER,
+            "app.css": "body { margin: 0; }\n" * 50,
+            "app.js": "console.log('hello');\n" * 50,
+            "models/model.conf": "--min-active=200\n",
+        }
+        for name, content in files.items():
+            with open(os.path.join(self.source, name), "w") as handle:
+                handle.write(content)
+        self.manifest = build_assets(self.source, os.path.join(self.tmpdir.name, "build"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def body(self, response):
+        with open(response.path, "rb") as handle:
+            return handle.read()
+
+    def test_hashed_urls_are_immutable_and_compressed(self):
+        asset, _ = self.manifest.lookup("/static/app.css")
+        self.assertRegex(asset.hashed_url, r"^/static/app\.[0-9a-f]{10}\.css$")
+        response = serve(*self.manifest.lookup(asset.hashed_url), request(accept_encoding="gzip, deflate"))
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(self.body(response)), b"body { margin: 0; }\n" * 50)
+        plain = serve(asset, False, request())
+        self.assertEqual(plain.headers["cache-control"], REVALIDATE)
+        self.assertNotIn("content-encoding", plain.headers)
+        # Too small to be worth compressing.
+        self.assertEqual(list(self.manifest.lookup("/static/models/model.conf")[0].variants), ["identity"])
+
+    def test_index_and_service_worker_reference_hashed_urls(self):
+        css = self.manifest.lookup("/static/app.css")[0].hashed_url
+        js = self.manifest.lookup("/static/app.js")[0].hashed_url
+        index = self.body(serve(*self.manifest.lookup("/"), request())).decode()
+        self.assertEqual(index, f'<link rel="stylesheet" href="{css}" /><script src="{js}"></script>')
+        worker = self.body(serve(*self.manifest.lookup("/service-worker.js"), request())).decode()
+        self.assertIn(f"'{css}'", worker)
+        self.assertIn("'/manifest.json'", worker)
+        self.assertNotIn("models", worker)
+        self.assertNotIn("cache-v1", worker)
+
+    def test_conditional_and_range_requests(self):
+        asset, immutable = self.manifest.lookup("/static/app.js")
+        etag = asset.variants["identity"].etag
+        self.assertEqual(serve(asset, immutable, request(if_none_match=etag)).status_code, 304)
+        listed = serve(asset, immutable, request(if_none_match=f'"other",{etag}'))
+        self.assertEqual(listed.status_code, 304)
+        partial = serve(asset, immutable, request(range="bytes=8-10", accept_encoding="gzip"))
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.body, b"log")
+        self.assertEqual(partial.headers["content-range"], f"bytes 8-10/{asset.variants['identity'].size}")
+        self.assertEqual(serve(asset, immutable, request(range="bytes=-3")).body, b");\n")
+        self.assertEqual(serve(asset, immutable, request(range="bytes=99999-")).status_code, 416)
+        stale = serve(asset, immutable, request(range="bytes=0-1", if_range='"old"'))
+        self.assertEqual(stale.status_code, 200)
+        # Invalid ranges are ignored rather than refused.
+        for invalid in ("bytes=--5", "bytes=5-3", "bytes=-", "bytes=+1-2"):
+            self.assertEqual(serve(asset, immutable, request(range=invalid)).status_code, 200, invalid)
+
+    def test_default_build_dir_is_private(self):
+        root = os.path.join(self.tmpdir.name, "tmp")
+        shared = os.path.join(root, f"habit_app_assets-{os.getuid()}")
+        os.makedirs(shared)
+        os.chmod(shared, 0o777)
+        with mock.patch("app.assets.tempfile.gettempdir", return_value=root), mock.patch(
+            "app.assets.tempfile.mkdtemp", return_value=os.path.join(root, "fresh")
+        ):
+            self.assertEqual(_default_build_dir(), os.path.join(root, "fresh"))
+            os.chmod(shared, 0o700)
+            self.assertEqual(_default_build_dir(), shared)
+
+
+if __name__ == "__main__":
+    unittest.main()
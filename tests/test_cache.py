@@ -0,0 +1,113 @@
+"""
+Tests for `app.cache`.
+"""
+
+import os
+import tempfile
+import unittest
+
+from app.cache import HabitCache, ParseCache, TTLCache
+from app.schemas import HabitRead
+
+MEDITATION = HabitRead(id="1", name="meditation", time_block="morning", target_minutes=30)
+READING = HabitRead(id="2", name="reading", time_block="evening", target_minutes=20)
+HABITS = [MEDITATION, READING]
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_lru_eviction_and_expiry(self):
+        now = [0.0]
+        cache = TTLCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)  # evicts "b", the least recently used
+        self.assertIsNone(cache.get("b"))
+        now[0] = 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+
+class ParseCacheTests(unittest.TestCase):
+    def test_completion_phrases_resolve_against_current_progress(self):
+        cache = ParseCache()
+        # The model answered "finished meditation" with the 30 minutes left.
+        cache.store("Finished meditation", HABITS, {}, {"1": 30, "2": 0})
+        self.assertEqual(cache.lookup("finished meditation", HABITS, {"1": 20}), {"1": 10, "2": 0})
+        self.assertEqual(cache.lookup("finished meditation.", HABITS, {"1": 30}), {"1": 0, "2": 0})
+
+    def test_explicit_minutes_do_not_depend_on_progress(self):
+        cache = ParseCache()
+        cache.store("reading 15 minutes", HABITS, {"2": 5}, {"1": 0, "2": 15})
+        self.assertEqual(cache.lookup("reading 15 minutes", HABITS, {"2": 19}), {"1": 0, "2": 15})
+
+    def test_ambiguous_results_are_pinned_to_progress(self):
+        cache = ParseCache()
+        # Meditation is already done, so its 0 says nothing about the phrase.
+        cache.store("finished reading", HABITS, {"1": 30}, {"1": 0, "2": 20})
+        self.assertEqual(cache.lookup("finished reading", HABITS, {"1": 30}), {"1": 0, "2": 20})
+        self.assertIsNone(cache.lookup("finished reading", HABITS, {"1": 30, "2": 5}))
+
+    def test_unstated_minutes_are_pinned_to_progress(self):
+        cache = ParseCache()
+        # A bare mention answered with what was left of the target.
+        cache.store("meditation", HABITS, {"1": 20}, {"1": 10, "2": 0})
+        self.assertIsNone(cache.lookup("meditation", HABITS, {}))
+        self.assertEqual(cache.lookup("meditation", HABITS, {"1": 20}), {"1": 10, "2": 0})
+        cache.store("wrapped up reading", HABITS, {"2": 5}, {"1": 0, "2": 15})
+        self.assertIsNone(cache.lookup("wrapped up reading", HABITS, {}))
+
+    def test_habit_changes_invalidate(self):
+        cache = ParseCache()
+        cache.store("reading 15 minutes", HABITS, {}, {"1": 0, "2": 15})
+        renamed = [MEDITATION, READING.model_copy(update={"target_minutes": 45})]
+        self.assertIsNone(cache.lookup("reading 15 minutes", renamed, {}))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_persistent_store_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cache.db")
+            ParseCache(path=path).store("finished meditation", HABITS, {}, {"1": 30, "2": 0})
+            self.assertEqual(ParseCache(path=path).lookup("finished meditation", HABITS, {"1": 25}), {"1": 5, "2": 0})
+            cache = ParseCache(path=path)
+            cache.clear()
+            self.assertIsNone(cache.lookup("finished meditation", HABITS, {}))
+            self.assertIsNone(ParseCache(path=path).lookup("finished meditation", HABITS, {}))
+
+
+class HabitCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = HabitCache(ttl=10, clock=lambda: self.now)
+
+    def test_read_through_and_expiry(self):
+        self.assertIsNone(self.cache.snapshot())
+        self.cache.fill([MEDITATION], self.cache.version)
+        self.assertEqual(self.cache.snapshot(), [MEDITATION])
+        self.assertIs(self.cache.get("1"), MEDITATION)
+        self.assertIsNone(self.cache.get("2"))
+        self.now = 10.0
+        self.assertIsNone(self.cache.get("1"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 3))
+
+    def test_created_habits_are_added_and_stale_loads_dropped(self):
+        self.cache.fill([MEDITATION], self.cache.version)
+        version = self.cache.version
+        self.cache.add(READING)
+        self.assertEqual(self.cache.snapshot(), HABITS)
+        self.cache.invalidate()
+        # A load that started before the invalidation must not be cached.
+        self.cache.fill([MEDITATION], version)
+        self.assertIsNone(self.cache.snapshot())
+
+    def test_token_follows_the_snapshot(self):
+        self.cache.fill([MEDITATION], self.cache.version, "t1")
+        self.cache.add(READING, "t2")
+        self.cache.add(READING, "t3")
+        self.assertEqual((self.cache.snapshot(), self.cache.token), (HABITS, "t3"))
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.token)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Tests for the circuit breaker in `app.circuit`.
+"""
+
+import unittest
+
+from app.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker(
+            window=4, min_calls=4, failure_rate=0.5, slow_call_seconds=2, open_seconds=10, clock=lambda: self.now
+        )
+
+    def test_opens_on_error_rate_and_probes_after_cooldown(self):
+        for success in (True, False, True):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(success, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.now = 10.0
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())  # one probe at a time
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.now = 20.0
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.trips, 2)
+
+    def test_slow_calls_count_as_failures(self):
+        for _ in range(4):
+            self.breaker.allow()
+            self.breaker.record(True, 3.0)
+        self.assertEqual(self.breaker.state, OPEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
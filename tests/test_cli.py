@@ -0,0 +1,87 @@
+"""
+Unit tests for the query-plan checks in `app.cli`.
+
+The explain documents below are trimmed versions of real MongoDB output,
+so these tests run without a database.
+"""
+
+import unittest
+from datetime import date
+
+from app.cli import _repository_queries, find_collection_scans
+from app.repository import MongoRepository
+from app.schemas import HabitRead
+
+
+class FindCollectionScansTests(unittest.TestCase):
+    """Tests for `find_collection_scans`."""
+
+    def test_index_scan_passes(self):
+        explain = {
+            "queryPlanner": {
+                "winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "date"}},
+                "rejectedPlans": [{"stage": "COLLSCAN"}],
+            }
+        }
+        self.assertEqual(find_collection_scans(explain), [])
+
+    def test_collection_scan_is_reported(self):
+        explain = {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN", "direction": "forward"}}}
+        problems = find_collection_scans(explain)
+        self.assertEqual(len(problems), 1)
+        self.assertIn("COLLSCAN", problems[0])
+        self.assertEqual(find_collection_scans(explain, allow_collscan=True), [])
+
+    def test_unindexed_lookup_is_reported_even_when_collscan_allowed(self):
+        slot_engine = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "queryPlan": {
+                        "stage": "EQ_LOOKUP",
+                        "strategy": "NestedLoopJoin",
+                        "inputStage": {"stage": "COLLSCAN"},
+                    }
+                }
+            }
+        }
+        classic_engine = {
+            "stages": [
+                {"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}},
+                {"$lookup": {"from": "progress"}, "collectionScans": 3, "indexesUsed": []},
+            ]
+        }
+        self.assertEqual(len(find_collection_scans(slot_engine, allow_collscan=True)), 1)
+        self.assertEqual(len(find_collection_scans(classic_engine, allow_collscan=True)), 1)
+
+    def test_indexed_lookup_passes(self):
+        explain = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "queryPlan": {"stage": "EQ_LOOKUP", "strategy": "IndexedLoopJoin", "inputStage": {"stage": "IXSCAN"}}
+                }
+            }
+        }
+        self.assertEqual(find_collection_scans(explain), [])
+
+
+class RepositoryQueriesTests(unittest.TestCase):
+    """Tests for the queries `check-query-plans` explains."""
+
+    def test_every_collection_is_covered(self):
+        repo = MongoRepository("mongodb://localhost:1")
+        habit = HabitRead(id="a" * 24, name="Read", time_block="morning", target_minutes=20)
+        queries = _repository_queries(repo, habit, date(2024, 6, 1))
+        names = [name for name, _, _ in queries]
+        self.assertEqual(len(names), len(set(names)))
+        collections = {command.get("find") or command.get("aggregate") for _, command, _ in queries}
+        self.assertEqual(
+            collections, {"habits", "progress", "daily_summary", "versions", "habit_stats", "completion_runs"}
+        )
+        # Only queries that want every habit may scan.
+        self.assertEqual(
+            [name for name, _, allow in queries if allow], ["list_habits", "compute_progress_bars"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Tests for the progress event fan-out in `app.events`.
+"""
+
+import asyncio
+import unittest
+
+from app.events import KEEPALIVE, RESET, Broker, encode_event
+
+
+async def collect(subscription, keepalive=5.0):
+    return [message async for message in subscription.messages(keepalive)]
+
+
+class BrokerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_every_subscriber_receives_each_event(self):
+        broker = Broker()
+        readers = [asyncio.ensure_future(collect(broker.subscribe())) for _ in range(3)]
+        broker.publish("progress", '{"n": 1}')
+        broker.publish("progress", '{"n": 2}')
+        broker.close()
+        expected = [encode_event("progress", '{"n": 1}'), encode_event("progress", '{"n": 2}')]
+        self.assertEqual(await asyncio.gather(*readers), [expected] * 3)
+        self.assertEqual(broker.subscribers, 0)
+
+    async def test_slow_subscriber_is_dropped_with_a_reset(self):
+        broker = Broker(max_pending=2)
+        slow = broker.subscribe()
+        fast = broker.subscribe()
+        fast_messages = []
+        for n in range(3):
+            broker.publish("progress", str(n))
+            fast_messages.append(await fast._queue.get())
+        self.assertEqual(broker.dropped, 1)
+        self.assertEqual(broker.subscribers, 1)
+        self.assertEqual(await collect(slow), [RESET])
+        self.assertEqual(fast_messages[-1], encode_event("progress", "2"))
+
+    async def test_idle_stream_sends_keepalives(self):
+        broker = Broker()
+        messages = broker.subscribe().messages(keepalive=0.01)
+        self.assertEqual(await messages.__anext__(), KEEPALIVE)
+        broker.publish("progress", "{}")
+        self.assertEqual(await messages.__anext__(), encode_event("progress", "{}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests for the bounded job queue and request coalescing in `app.jobs`.
+"""
+
+import asyncio
+import unittest
+
+from app.jobs import JobQueue, QueueFull, SingleFlight
+
+
+class JobQueueTests(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrency_and_backlog_are_bounded(self):
+        queue = JobQueue(max_concurrency=2, max_queue=1)
+        release = asyncio.Event()
+        running = []
+
+        async def work(n):
+            running.append(n)
+            await release.wait()
+            return n
+
+        jobs = [queue.submit(lambda n=n: work(n)) for n in range(3)]
+        await asyncio.sleep(0)
+        self.assertEqual(running, [0, 1])
+        self.assertEqual([job.status for job in jobs], ["running", "running", "queued"])
+        self.assertEqual(len(queue._tasks), 2)
+        with self.assertRaises(QueueFull) as ctx:
+            queue.submit(lambda: work(3))
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        release.set()
+        self.assertEqual([await job.wait() for job in jobs], [0, 1, 2])
+        self.assertEqual(queue.pending, 0)
+        await asyncio.sleep(0)
+        self.assertEqual(queue._tasks, set())
+        self.assertIs(queue.get(jobs[2].id), jobs[2])
+
+    async def test_failures_are_kept_on_the_job(self):
+        queue = JobQueue()
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        job = queue.submit(fail)
+        with self.assertRaises(RuntimeError):
+            await job.wait()
+        self.assertEqual(job.status, "failed")
+
+    async def test_finished_jobs_expire(self):
+        now = [0.0]
+        queue = JobQueue(result_ttl=10, clock=lambda: now[0])
+
+        async def work():
+            return 1
+
+        job = queue.submit(work)
+        await job.wait()
+        now[0] = 11.0
+        self.assertIsNone(queue.get(job.id))
+
+
+class SingleFlightTests(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"1": 10}
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        self.assertEqual(results, [{"1": 10}] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.coalesced, 4)
+        # Once finished, the next call runs again.
+        await flight.do("key", fetch)
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
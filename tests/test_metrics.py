@@ -0,0 +1,90 @@
+"""
+Tests for the Prometheus metrics and the slow-request profiler in `app.metrics`.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from app.metrics import (
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    SamplingProfiler,
+    _request_calls,
+    instrument_repository,
+    REPOSITORY_LATENCY,
+)
+from app.repository import InMemoryRepository
+from app.schemas import HabitCreate
+
+
+class RenderTests(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, "/habits")
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:2], ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"])
+        self.assertIn('latency_seconds_bucket{route="/habits",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="/habits",le="1.0"} 3', lines)
+        self.assertIn('latency_seconds_bucket{route="/habits",le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum{route="/habits"} 4.05', lines)
+        self.assertIn('latency_seconds_count{route="/habits"} 4', lines)
+
+    def test_label_values_are_escaped(self):
+        counter = Counter("events_total", "Events.", ("name",))
+        counter.inc('say "hi"\n')
+        self.assertEqual(list(counter.samples()), ['events_total{name="say \\"hi\\"\\n"} 1'])
+
+
+class InstrumentationTests(unittest.IsolatedAsyncioTestCase):
+    async def test_repository_calls_are_timed_and_counted_per_request(self):
+        repo = instrument_repository(InMemoryRepository())
+        before = REPOSITORY_LATENCY.count("InMemoryRepository", "list_habits")
+        calls = [0]
+        token = _request_calls.set(calls)
+        try:
+            await repo.create_habit(HabitCreate(name="reading", time_block="any", target_minutes=10))
+            await repo.list_habits()
+            await repo.list_habits()
+        finally:
+            _request_calls.reset(token)
+        self.assertEqual(calls, [3])
+        self.assertEqual(REPOSITORY_LATENCY.count("InMemoryRepository", "list_habits"), before + 2)
+
+    async def test_slow_request_dumps_folded_stacks(self):
+        async def slow_app(scope, receive, send):
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            pass
+
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = SamplingProfiler(interval=0.001, directory=directory)
+            profiler.start()
+            try:
+                middleware = MetricsMiddleware(slow_app, slow_seconds=0.01, profiler=profiler)
+                with self.assertLogs("app.metrics", "WARNING"):
+                    await middleware({"type": "http", "method": "GET", "path": "/slow"}, None, send)
+            finally:
+                profiler.stop()
+            (name,) = os.listdir(directory)
+            self.assertTrue(name.endswith(".folded"))
+            with open(os.path.join(directory, name)) as handle:
+                lines = handle.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any("slow_app (test_metrics.py:" in line for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
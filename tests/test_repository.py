@@ -0,0 +1,352 @@
+"""
+Repository tests that do not need a running database server.
+
+The same behavioural checks run against every embedded backend.
+`MongoRepository` connects lazily, so it can be constructed against an
+unreachable URI to exercise its query-building helpers.
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+from app.repository import BulkWriteError, DuplicateKeyError, InMemoryRepository, MongoRepository, ObjectId, SQLiteRepository
+from app.schemas import HabitCreate, HabitRead, ProgressBar, ProgressCreate
+
+
+class RepositoryContract:
+    """Behaviour shared by all backends; mixed into a test case per backend."""
+
+    def make_repository(self):
+        raise NotImplementedError
+
+    async def asyncSetUp(self):
+        self.repo = self.make_repository()
+        self.reading = await self.repo.create_habit(
+            HabitCreate(name="Reading", time_block="evening", target_minutes=30)
+        )
+        self.walk = await self.repo.create_habit(HabitCreate(name="Walk", time_block="morning", target_minutes=20))
+
+    async def asyncTearDown(self):
+        await self.repo.close()
+
+    async def test_record_and_read_progress(self):
+        day = date(2024, 6, 1)
+        entry = await self.repo.record_progress(ProgressCreate(habit_id=self.reading.id, date=day, minutes=10))
+        self.assertFalse(entry.completed)
+        # Upserting the same habit and day replaces the minutes
+        entry = await self.repo.record_progress(ProgressCreate(habit_id=self.reading.id, date=day, minutes=35))
+        self.assertTrue(entry.completed)
+        self.assertEqual(await self.repo.get_progress_for_date(day), [entry])
+        self.assertEqual(await self.repo.get_progress_for_date(date(2024, 6, 2)), [])
+        with self.assertRaises(ValueError):
+            await self.repo.record_progress(ProgressCreate(habit_id="999", date=day, minutes=5))
+
+    async def test_progress_bars_include_habits_without_progress(self):
+        day = date(2024, 6, 1)
+        await self.repo.record_progress(ProgressCreate(habit_id=self.walk.id, date=day, minutes=50))
+        bars = await self.repo.compute_progress_bars(day)
+        self.assertEqual(
+            bars,
+            [
+                ProgressBar(habit_id=self.reading.id, progress_ratio=0.0),
+                ProgressBar(habit_id=self.walk.id, progress_ratio=1.0),
+            ],
+        )
+
+    async def test_read_version_changes_only_with_relevant_writes(self):
+        day, other_day = date(2024, 6, 1), date(2024, 6, 2)
+        habits, progress = await self.repo.read_version(), await self.repo.read_version(day)
+        self.assertEqual(await self.repo.read_version(day), progress)
+        await self.repo.record_progress(ProgressCreate(habit_id=self.walk.id, date=other_day, minutes=5))
+        self.assertEqual(await self.repo.read_version(day), progress)
+        await self.repo.increment_progress(self.walk.id, day, 5)
+        after_write = await self.repo.read_version(day)
+        self.assertNotEqual(after_write, progress)
+        self.assertEqual(await self.repo.read_version(), habits)
+        await self.repo.record_progress_bulk([ProgressCreate(habit_id=self.reading.id, date=day, minutes=1)])
+        self.assertNotEqual(await self.repo.read_version(day), after_write)
+        await self.repo.create_habit(HabitCreate(name="Yoga", time_block="morning", target_minutes=10))
+        self.assertNotEqual(await self.repo.read_version(), habits)
+
+    async def test_progress_between_is_ordered_by_date(self):
+        for day, habit in ((3, self.walk), (1, self.reading), (2, self.walk), (9, self.reading)):
+            await self.repo.record_progress(ProgressCreate(habit_id=habit.id, date=date(2024, 6, day), minutes=day))
+        entries = await self.repo.get_progress_between(date(2024, 6, 1), date(2024, 6, 3))
+        self.assertEqual([entry.date.day for entry in entries], [1, 2, 3])
+
+    async def test_bulk_reports_per_item_and_last_write_wins(self):
+        day = date(2024, 6, 1)
+        results = await self.repo.record_progress_bulk(
+            [
+                ProgressCreate(habit_id=self.reading.id, date=day, minutes=10),
+                ProgressCreate(habit_id="999", date=day, minutes=10),
+                ProgressCreate(habit_id=self.walk.id, date=day, minutes=25),
+                ProgressCreate(habit_id=self.reading.id, date=day, minutes=40),
+            ]
+        )
+        self.assertEqual([result.index for result in results], [0, 1, 2, 3])
+        self.assertIsNone(results[0].error)
+        self.assertIn("not found", results[1].error)
+        self.assertIsNone(results[1].progress)
+        self.assertTrue(results[2].progress.completed)
+        stored = {entry.habit_id: entry.minutes for entry in await self.repo.get_progress_for_date(day)}
+        self.assertEqual(stored, {self.reading.id: 40, self.walk.id: 25})
+        stats = await self.repo.get_habit_stats(self.reading.id, day)
+        self.assertEqual(stats.current_streak, 1)
+
+    async def test_concurrent_increments_lose_no_minutes(self):
+        day = date(2024, 6, 1)
+        await self.repo.record_progress(ProgressCreate(habit_id=self.reading.id, date=day, minutes=5))
+        deltas = [1 + i % 7 for i in range(200)]
+        entries = await asyncio.gather(
+            *(self.repo.increment_progress(self.reading.id, day, delta) for delta in deltas)
+        )
+        total = 5 + sum(deltas)
+        self.assertEqual(max(entry.minutes for entry in entries), total)
+        # Every caller observed a distinct running total
+        self.assertEqual(len({entry.minutes for entry in entries}), len(deltas))
+        stored = await self.repo.get_progress_for_date(day)
+        self.assertEqual([entry.minutes for entry in stored], [total])
+        self.assertTrue(stored[0].completed)
+        with self.assertRaises(ValueError):
+            await self.repo.increment_progress("999", day, 1)
+
+    async def test_habit_stats(self):
+        for day in (1, 2, 3):
+            await self.repo.record_progress(
+                ProgressCreate(habit_id=self.walk.id, date=date(2024, 6, day), minutes=20)
+            )
+        stats = await self.repo.get_habit_stats(self.walk.id, date(2024, 6, 3))
+        self.assertEqual((stats.current_streak, stats.longest_streak), (3, 3))
+        self.assertIsNone(await self.repo.get_habit_stats("999", date(2024, 6, 3)))
+
+    async def test_non_canonical_ids_are_not_found(self):
+        day = date(2024, 6, 1)
+        for habit_id in ("99999999999999999999", "0" + self.walk.id, " " + self.walk.id, self.walk.id + "\n"):
+            self.assertIsNone(await self.repo.get_habit(habit_id))
+            self.assertIsNone(await self.repo.get_habit_stats(habit_id, day))
+            with self.assertRaises(ValueError):
+                await self.repo.record_progress(ProgressCreate(habit_id=habit_id, date=day, minutes=5))
+            with self.assertRaises(ValueError):
+                await self.repo.increment_progress(habit_id, day, 5)
+            results = await self.repo.record_progress_bulk([ProgressCreate(habit_id=habit_id, date=day, minutes=5)])
+            self.assertIn("not found", results[0].error)
+        self.assertEqual(await self.repo.get_progress_for_date(day), [])
+
+
+class InMemoryRepositoryTests(RepositoryContract, unittest.IsolatedAsyncioTestCase):
+    def make_repository(self):
+        return InMemoryRepository()
+
+
+class SQLiteRepositoryTests(RepositoryContract, unittest.IsolatedAsyncioTestCase):
+    def make_repository(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        return SQLiteRepository(os.path.join(self.tmpdir.name, "habits.db"))
+
+    async def test_data_survives_reopening(self):
+        await self.repo.record_progress(ProgressCreate(habit_id=self.walk.id, date=date(2024, 6, 1), minutes=5))
+        await self.repo.close()
+        self.repo = SQLiteRepository(os.path.join(self.tmpdir.name, "habits.db"))
+        self.assertEqual(len(await self.repo.list_habits()), 2)
+        self.assertEqual(len(await self.repo.get_progress_for_date(date(2024, 6, 1))), 1)
+
+
+class MongoDateStorageTests(unittest.TestCase):
+    """Tests for the date encodings used by `MongoRepository`."""
+
+    def test_encodings_round_trip(self):
+        day = date(2024, 2, 29)
+        for mode in MongoRepository.DATE_STORAGE_MODES:
+            repo = MongoRepository("mongodb://localhost:1", date_storage=mode)
+            self.assertEqual(MongoRepository._decode_date(repo._encode_date(day)), day)
+        native = MongoRepository("mongodb://localhost:1")
+        self.assertEqual(native._encode_date(day), datetime(2024, 2, 29))
+
+    def test_reads_match_both_encodings(self):
+        repo = MongoRepository("mongodb://localhost:1", date_storage="iso")
+        match = repo._date_match(date(2024, 1, 5))
+        self.assertEqual(match, {"$in": [datetime(2024, 1, 5), "2024-01-05"]})
+
+    def test_unknown_storage_mode_rejected(self):
+        with self.assertRaises(ValueError):
+            MongoRepository("mongodb://localhost:1", date_storage="epoch")
+
+    def test_summary_update_only_replaces_older_entries(self):
+        habit = HabitRead(id="a" * 24, name="Read", time_block="morning", target_minutes=20)
+        query, update = MongoRepository._summary_update(habit, date(2024, 1, 5), 30, 4)
+        self.assertEqual(query, {"_id": "2024-01-05", f"habits.{habit.id}.v": {"$not": {"$gt": 4}}})
+        self.assertEqual(
+            update["$set"],
+            {f"habits.{habit.id}": {"minutes": 30, "ratio": 1.0, "completed": True, "v": 4}},
+        )
+        # The same update advances the date's version counter.
+        self.assertEqual(update["$inc"], {"n": 1})
+        self.assertIn("epoch", update["$setOnInsert"])
+
+
+class MongoUpsertRaceTests(unittest.IsolatedAsyncioTestCase):
+    """A first write that loses the insert race to a concurrent one is retried."""
+
+    async def asyncSetUp(self):
+        self.repo = MongoRepository("mongodb://localhost:1")
+        self.habit = HabitRead(id="a" * 24, name="Read", time_block="morning", target_minutes=20)
+        self.repo.get_habit = mock.AsyncMock(return_value=self.habit)
+        for helper in ("_update_summary", "_bump_version", "_track_completion"):
+            setattr(self.repo, helper, mock.AsyncMock())
+        self.repo._progress = mock.Mock()
+
+    async def test_increment_retries_duplicate_key(self):
+        self.repo._progress.find_one_and_update = mock.AsyncMock(
+            side_effect=[DuplicateKeyError("E11000"), {"minutes": 12, "v": 2}]
+        )
+        entry = await self.repo.increment_progress(self.habit.id, date(2024, 6, 1), 5)
+        self.assertEqual(entry.minutes, 12)
+        self.assertEqual(self.repo._progress.find_one_and_update.await_count, 2)
+        self.repo._update_summary.assert_awaited_once_with(self.habit, date(2024, 6, 1), 12, 2)
+
+    async def test_record_retries_duplicate_key_once(self):
+        self.repo._progress.find_one_and_update = mock.AsyncMock(
+            side_effect=[DuplicateKeyError("E11000"), {"minutes": 7, "v": 1}]
+        )
+        await self.repo.record_progress(ProgressCreate(habit_id=self.habit.id, date=date(2024, 6, 1), minutes=25))
+        # The winner's write was the first; ours follows it.
+        self.repo._update_summary.assert_awaited_once_with(self.habit, date(2024, 6, 1), 25, 2)
+        self.repo._progress.find_one_and_update.side_effect = DuplicateKeyError("E11000")
+        with self.assertRaises(DuplicateKeyError):
+            await self.repo.record_progress(
+                ProgressCreate(habit_id=self.habit.id, date=date(2024, 6, 1), minutes=25)
+            )
+
+    async def test_bulk_retries_duplicate_key_once(self):
+        self.repo.list_habits = mock.AsyncMock(return_value=[self.habit])
+        self.repo._refresh_summaries = mock.AsyncMock()
+        lost = {"code": 11000, "errmsg": "E11000 duplicate key"}
+        self.repo._progress.bulk_write = mock.AsyncMock(
+            side_effect=[
+                BulkWriteError({"writeErrors": [dict(lost, index=1)]}),
+                BulkWriteError({"writeErrors": [dict(lost, index=0)]}),
+            ]
+        )
+        items = [
+            ProgressCreate(habit_id=self.habit.id, date=date(2024, 6, day), minutes=25) for day in (1, 2, 3)
+        ]
+        results = await self.repo.record_progress_bulk(items)
+        # Only the losing write is sent again, and a second loss is reported.
+        self.assertEqual(len(self.repo._progress.bulk_write.await_args_list[1].args[0]), 1)
+        self.assertEqual([result.error for result in results], [None, "E11000 duplicate key", None])
+
+
+class _Cursor:
+    """Stand-in for a Motor cursor over `docs`."""
+
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    async def __aiter__(self):
+        for doc in self._docs:
+            yield doc
+
+
+class MongoVersionTests(unittest.IsolatedAsyncioTestCase):
+    """Responses must not be older than the version token that validates them."""
+
+    async def asyncSetUp(self):
+        self.repo = MongoRepository("mongodb://localhost:1")
+        self.counters = {"habits": {"_id": "habits", "epoch": "e", "n": 1}}
+        self.habit_docs = [{"_id": ObjectId("a" * 24), "name": "Read", "time_block": "morning", "target_minutes": 20}]
+        self.repo._versions = mock.Mock()
+        self.repo._versions.find_one = mock.AsyncMock(side_effect=lambda query: self.counters.get(query["_id"]))
+        self.repo._habits = mock.Mock()
+        self.repo._habits.find.side_effect = lambda query: _Cursor(self.habit_docs)
+
+    async def test_cached_habits_carry_their_token(self):
+        token = await self.repo.read_version()
+        self.assertEqual(len(await self.repo.list_habits()), 1)
+        # Another worker adds a habit: the cached token and body stay together.
+        self.habit_docs.append(dict(self.habit_docs[0], _id=ObjectId("b" * 24)))
+        self.counters["habits"]["n"] = 2
+        self.assertEqual(await self.repo.read_version(), token)
+        self.assertEqual(len(await self.repo.list_habits()), 1)
+        self.assertEqual((self.repo._versions.find_one.await_count, self.repo._habits.find.call_count), (1, 1))
+        self.repo.habit_cache.invalidate()
+        self.assertEqual(await self.repo.read_version(), "e2")
+        self.assertEqual(len(await self.repo.list_habits()), 2)
+
+    async def test_created_habit_keeps_the_snapshot_only_without_other_changes(self):
+        await self.repo.list_habits()
+        self.repo._habits.insert_one = mock.AsyncMock(return_value=mock.Mock(inserted_id=ObjectId("c" * 24)))
+        self.repo._versions.find_one_and_update = mock.AsyncMock(return_value={"epoch": "e", "n": 2})
+        created = await self.repo.create_habit(HabitCreate(name="Yoga", time_block="morning", target_minutes=10))
+        self.assertEqual(self.repo.habit_cache.token, "e2")
+        self.assertIs(self.repo.habit_cache.get(created.id), created)
+        # Someone else changed the habits in between: reload instead.
+        self.repo._versions.find_one_and_update.return_value = {"epoch": "e", "n": 4}
+        await self.repo.create_habit(HabitCreate(name="Run", time_block="morning", target_minutes=10))
+        self.assertIsNone(self.repo.habit_cache.snapshot())
+
+    async def test_date_versions_come_from_the_summary(self):
+        self.repo._daily_summary = mock.Mock()
+        self.repo._daily_summary.find_one = mock.AsyncMock(
+            side_effect=[None, {"_id": "2024-06-01", "epoch": "s", "n": 3}]
+        )
+        self.assertEqual(await self.repo.read_version(date(2024, 6, 1)), "e1.0")
+        self.assertEqual(await self.repo.read_version(date(2024, 6, 1)), "e1.s3")
+
+    async def test_writes_version_dates_through_the_summary(self):
+        habit = HabitRead(id="a" * 24, name="Read", time_block="morning", target_minutes=20)
+        calls = []
+        self.repo.get_habit = mock.AsyncMock(return_value=habit)
+        self.repo._upsert_progress = mock.AsyncMock(return_value={"minutes": 25, "v": 1})
+        self.repo._progress = mock.Mock()
+        self.repo._progress.bulk_write = mock.AsyncMock()
+        for helper in ("_update_summary", "_refresh_summaries", "_track_completion", "_bump_version"):
+            setattr(self.repo, helper, mock.AsyncMock(side_effect=lambda *args, name=helper: calls.append(name)))
+        self.repo.list_habits = mock.AsyncMock(return_value=[habit])
+        day = date(2024, 6, 1)
+        await self.repo.increment_progress(habit.id, day, 25)
+        await self.repo.record_progress(ProgressCreate(habit_id=habit.id, date=day, minutes=10))
+        await self.repo.record_progress_bulk([ProgressCreate(habit_id=habit.id, date=day, minutes=30)])
+        # One round of writes after the upsert; no separate version bump.
+        self.assertEqual(
+            calls, ["_update_summary", "_track_completion"] * 2 + ["_refresh_summaries", "_track_completion"]
+        )
+
+
+class MongoCompletionTrackingTests(unittest.IsolatedAsyncioTestCase):
+    """Runs follow the stored progress, not the state a writer computed before taking the lease."""
+
+    async def asyncSetUp(self):
+        self.repo = MongoRepository("mongodb://localhost:1")
+        self.habit = HabitRead(id="a" * 24, name="Read", time_block="morning", target_minutes=30)
+        self.repo._acquire_stats_lease = mock.AsyncMock(return_value={"_id": ObjectId(self.habit.id), "ready": True})
+        for helper in ("_release_stats_lease", "_apply_run_change", "_rebuild_completion_runs"):
+            setattr(self.repo, helper, mock.AsyncMock())
+        self.repo._progress = mock.Mock()
+
+    async def test_stored_minutes_decide_completion(self):
+        # A write of 40 takes the lease after a later write of 10 landed.
+        self.repo._progress.find.side_effect = lambda query, projection: _Cursor(
+            [{"date": datetime(2024, 6, 1), "minutes": 10}]
+        )
+        day = date(2024, 6, 1).toordinal()
+        await self.repo._track_completion(self.habit, [day, day + 1])
+        self.repo._apply_run_change.assert_has_awaits(
+            [mock.call(self.habit.id, day, False), mock.call(self.habit.id, day + 1, False)]
+        )
+
+    async def test_many_days_rebuild_once(self):
+        start = date(2024, 6, 1).toordinal()
+        await self.repo._track_completion(self.habit, range(start, start + MongoRepository._STATS_PATCH_DAYS + 1))
+        self.repo._rebuild_completion_runs.assert_awaited_once()
+        self.repo._apply_run_change.assert_not_awaited()
+        self.repo._release_stats_lease.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Tests that the direct list encoding in `app.serialization` matches FastAPI's.
+"""
+
+import unittest
+from datetime import date
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.schemas import DailyProgress, HabitRead, ProgressBar, ProgressRead
+from app.serialization import encode_bars, encode_daily_progress, encode_habits, encode_progress
+
+
+async def validated_body(model, content) -> bytes:
+    """The body FastAPI produces for `content` returned from an endpoint with `response_model=model`."""
+    field = create_response_field(name="response", type_=model)
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+class SerializationTests(unittest.IsolatedAsyncioTestCase):
+    async def test_bodies_are_byte_identical_to_validated_responses(self):
+        habits = [
+            HabitRead(id="1", name="Méditation 🧘 \"deep\"\n", time_block="morning", target_minutes=15),
+            HabitRead(id="2", name="Reading", time_block="evening", target_minutes=10**12),
+        ]
+        entries = [
+            ProgressRead(habit_id="1", date=date(2024, 2, 29), minutes=5, completed=False),
+            ProgressRead(habit_id="2", date=date(1, 1, 1), minutes=0, completed=True),
+        ]
+        bars = [
+            ProgressBar(habit_id="1", progress_ratio=1 / 3),
+            ProgressBar(habit_id="2", progress_ratio=1e-7),
+            ProgressBar(habit_id="5", progress_ratio=0.00002),
+            ProgressBar(habit_id="3", progress_ratio=1.0),
+            ProgressBar(habit_id="4", progress_ratio=0.0),
+        ]
+        days = [date(2024, 2, 28), date(2024, 2, 29)]
+        by_day = {date(2024, 2, 29): entries[:1]}
+        self.assertEqual(encode_habits(habits), await validated_body(List[HabitRead], habits))
+        self.assertEqual(
+            encode_progress(entries), await validated_body(List[ProgressRead], entries)
+        )
+        self.assertEqual(encode_bars(bars), await validated_body(List[ProgressBar], bars))
+        ordinary = [bars[0], bars[3], bars[4]]
+        self.assertEqual(encode_bars(ordinary), await validated_body(List[ProgressBar], ordinary))
+        self.assertEqual(
+            encode_daily_progress(days, by_day),
+            await validated_body(
+                List[DailyProgress], [DailyProgress(date=day, entries=by_day.get(day, [])) for day in days]
+            ),
+        )
+        self.assertEqual(encode_habits([]), await validated_body(List[HabitRead], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
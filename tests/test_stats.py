@@ -0,0 +1,143 @@
+"""
+Tests for the incrementally maintained habit statistics.
+
+The incremental counters are checked against a brute-force recomputation
+over the full `ProgressRead` history after every write.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from datetime import date, timedelta
+from typing import List
+
+from app.repository import InMemoryRepository, SQLiteRepository
+from app.schemas import HabitCreate, HabitStats, ProgressCreate, ProgressRead
+from app.stats import CompletionRuns, run_changes
+
+
+def brute_force_stats(habit_id: str, history: List[ProgressRead], today: date) -> HabitStats:
+    completed = {entry.date for entry in history if entry.habit_id == habit_id and entry.completed}
+    longest = run = 0
+    if completed:
+        day = min(completed)
+        while day <= max(completed):
+            run = run + 1 if day in completed else 0
+            longest = max(longest, run)
+            day += timedelta(days=1)
+    current = 0
+    day = today if today in completed else today - timedelta(days=1)
+    while day in completed:
+        current += 1
+        day -= timedelta(days=1)
+
+    def rate(days: int) -> float:
+        return sum(today - timedelta(days=offset) in completed for offset in range(days)) / days
+
+    return HabitStats(
+        habit_id=habit_id,
+        current_streak=current,
+        longest_streak=longest,
+        completion_rate_7d=rate(7),
+        completion_rate_30d=rate(30),
+    )
+
+
+class CompletionRunsTests(unittest.TestCase):
+    """Unit tests for `CompletionRuns`."""
+
+    def test_merge_and_split(self):
+        runs = CompletionRuns()
+        for day in (1, 2, 4, 5, 3):
+            runs.add(day)
+        self.assertEqual(runs.to_list(), [[1, 5]])
+        self.assertEqual(runs.longest_streak, 5)
+        runs.discard(3)
+        self.assertEqual(runs.to_list(), [[1, 2], [4, 5]])
+        self.assertEqual(runs.longest_streak, 2)
+        runs.discard(1)
+        runs.discard(5)
+        self.assertEqual(runs.to_list(), [[2, 2], [4, 4]])
+        self.assertEqual(CompletionRuns(runs.to_list()).longest_streak, 1)
+
+    def test_current_streak_allows_open_today(self):
+        runs = CompletionRuns([[10, 14]])
+        self.assertEqual(runs.current_streak(14), 5)
+        self.assertEqual(runs.current_streak(15), 5)
+        self.assertEqual(runs.current_streak(16), 0)
+        self.assertEqual(runs.current_streak(12), 3)
+
+
+    def test_run_changes_touch_only_neighbouring_runs(self):
+        # Filling the gap merges both neighbours into the earlier one.
+        self.assertEqual(run_changes(5, True, (1, 4), (6, 9)), ([6], [(1, 9)]))
+        self.assertEqual(run_changes(5, True, (1, 3), (6, 9)), ([6], [(5, 9)]))
+        self.assertEqual(run_changes(5, True, (1, 4), None), ([], [(1, 5)]))
+        self.assertEqual(run_changes(5, True, (1, 7), None), ([], []))
+        # Clearing a day splits its run; the first piece keeps the start.
+        self.assertEqual(run_changes(5, False, (1, 9), None), ([], [(1, 4), (6, 9)]))
+        self.assertEqual(run_changes(1, False, (1, 9), None), ([1], [(2, 9)]))
+        self.assertEqual(run_changes(5, False, (5, 5), None), ([5], []))
+        self.assertEqual(run_changes(5, False, (1, 3), None), ([], []))
+
+
+class IncrementalStatsTests(unittest.IsolatedAsyncioTestCase):
+    """Compare repository statistics with a brute-force recomputation."""
+
+    def make_repository(self):
+        return InMemoryRepository()
+
+    async def test_matches_brute_force_after_random_writes(self):
+        rng = random.Random(7)
+        repo = self.make_repository()
+        habits = [
+            await repo.create_habit(HabitCreate(name=f"habit {i}", time_block="morning", target_minutes=30))
+            for i in range(3)
+        ]
+        first_day = date(2023, 1, 1)
+        last_day = date(2023, 4, 30)
+        span = (last_day - first_day).days
+        for _ in range(600):
+            habit = rng.choice(habits)
+            day = first_day + timedelta(days=rng.randint(0, span))
+            # Overwrites flip days between complete and incomplete.
+            minutes = rng.choice([0, 10, 30, 45])
+            await repo.record_progress(ProgressCreate(habit_id=habit.id, date=day, minutes=minutes))
+            history = await repo.get_progress_between(first_day, last_day)
+            for today in (day, last_day, day + timedelta(days=1)):
+                stats = await repo.get_habit_stats(habit.id, today)
+                self.assertEqual(stats, brute_force_stats(habit.id, history, today))
+
+        await repo.close()
+
+    async def test_unknown_habit(self):
+        self.assertIsNone(await InMemoryRepository().get_habit_stats("missing", date.today()))
+
+
+class SQLiteIncrementalStatsTests(IncrementalStatsTests):
+    """The same comparison for the per-run rows of `SQLiteRepository`."""
+
+    def make_repository(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        return SQLiteRepository(os.path.join(tmpdir.name, "habits.db"))
+
+    async def test_runs_are_built_from_existing_progress(self):
+        repo = self.make_repository()
+        habit = await repo.create_habit(HabitCreate(name="walk", time_block="morning", target_minutes=10))
+        for day in (1, 2, 3, 5):
+            await repo.record_progress(ProgressCreate(habit_id=habit.id, date=date(2024, 6, day), minutes=10))
+        # As if the progress predated the per-run rows.
+        await repo._run(lambda conn: conn.execute("DELETE FROM completion_runs_built"))
+        await repo._run(lambda conn: conn.execute("DELETE FROM completion_runs"))
+        stats = await repo.get_habit_stats(habit.id, date(2024, 6, 5))
+        self.assertEqual((stats.current_streak, stats.longest_streak), (1, 3))
+        await repo.record_progress(ProgressCreate(habit_id=habit.id, date=date(2024, 6, 4), minutes=10))
+        stats = await repo.get_habit_stats(habit.id, date(2024, 6, 5))
+        self.assertEqual((stats.current_streak, stats.longest_streak), (5, 5))
+        await repo.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for the local transcript parser in `app.utils`.
+"""
+
+import unittest
+
+from app.schemas import HabitRead
+from app.utils import habit_matcher, parse_speech_text, score_speech_text, tokenize
+
+HABITS = [
+    HabitRead(id="1", name="morning meditation", time_block="morning", target_minutes=20),
+    HabitRead(id="2", name="reading", time_block="evening", target_minutes=30),
+]
+
+
+class ScoreSpeechTextTests(unittest.TestCase):
+    def test_exact_names_with_explicit_minutes_are_confident(self):
+        parse = score_speech_text("Morning meditation for 15 minutes, then reading for 25 mins.", HABITS)
+        self.assertTrue(parse.confident)
+        self.assertEqual(parse.minutes, {"1": 15, "2": 25})
+
+    def test_ambiguous_transcripts_are_escalated(self):
+        for text in [
+            "meditated for 10 minutes",  # inflected name
+            "reading 30",  # no unit
+            "finished reading",  # completion phrase
+            "morning meditation and reading 20 minutes",  # shared duration
+            "15 minutes of morning meditation then reading for 25 mins",  # 25 is nearest to both
+            "reading 20 minutes and yoga 10 minutes",  # unknown activity
+            "nothing today",
+        ]:
+            with self.subTest(text=text):
+                self.assertFalse(score_speech_text(text, HABITS).confident)
+
+    def test_matches_parse_speech_text_when_confident(self):
+        text = "morning meditation 15 minutes reading 30 minutes"
+        parse = score_speech_text(text, HABITS)
+        self.assertTrue(parse.confident)
+        self.assertEqual(parse.minutes, parse_speech_text(text, HABITS))
+
+
+
+class ParseSpeechTextTests(unittest.TestCase):
+    def test_spelled_out_numbers(self):
+        self.assertEqual(
+            parse_speech_text("reading for twenty five minutes, morning meditation twelve minutes", HABITS),
+            {"1": 12, "2": 25},
+        )
+        self.assertEqual(tokenize("thirty-five mins").numbers, [35, None])
+
+    def test_stemmed_names(self):
+        self.assertEqual(parse_speech_text("read 10 minutes", HABITS), {"2": 10})
+        self.assertFalse(score_speech_text("read 10 minutes", HABITS).confident)
+
+    def test_overlapping_names(self):
+        habits = [
+            HabitRead(id="1", name="work", time_block="morning", target_minutes=20),
+            HabitRead(id="2", name="deep work", time_block="morning", target_minutes=90),
+            HabitRead(id="3", name="deep work review", time_block="evening", target_minutes=15),
+        ]
+        self.assertEqual(
+            parse_speech_text("deep work review 10 minutes", habits), {"1": 10, "2": 10, "3": 10}
+        )
+        self.assertEqual(parse_speech_text("work 5, deep work 60", habits), {"1": 5, "2": 60})
+
+    def test_matcher_is_cached_per_habit_list(self):
+        names = tuple(habit.name for habit in HABITS)
+        self.assertIs(habit_matcher(names), habit_matcher(names))
+
+
+if __name__ == "__main__":
+    unittest.main()